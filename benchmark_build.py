@@ -0,0 +1,67 @@
+import copy
+import importlib
+import sys
+
+from schedule_dag import ScheduleDAG
+from hw_spec_iterator import DrmtScheduleSolver
+from solver_options import parse_solver_options, options_usage
+from spec_file import load_spec
+
+def benchmark_build(G, input_spec, latency_spec, period, minute_limit, options):
+  """ Builds the model of one DAG at one period term by term and as
+  sparse matrices (see matrix_builder.py)
+
+  Returns
+  -------
+  rows : list
+      (matrix_build, vars, constrs, nonzeros, build time) for each builder
+  """
+  rows = []
+  for matrix_build in (False, True):
+    run_options = copy.copy(options)
+    run_options.matrix_build = matrix_build
+    solver = DrmtScheduleSolver(G, input_spec, latency_spec, seed_rnd_sieve = False,\
+                                period_duration = period, minute_limit = minute_limit, options = run_options)
+    solver.solve()
+    num_vars, num_constrs, num_nzs = getattr(solver, 'model_size', (0, 0, 0))
+    rows.append((matrix_build, num_vars, num_constrs, num_nzs, getattr(solver, 'build_time', 0.0)))
+  return rows
+
+if __name__ == "__main__":
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) != 8):
+    print ("Usage: ", argv[0], " <DAG file> <HW file> <latency file> <time limit in mins> <first period> <last period> <period step> [options]")
+    print ("Compares the model build time of the term by term and sparse matrix builders at each period")
+    print ("The time limit (which may be a fraction of a minute) only bounds the solves that follow each build")
+    print (options_usage())
+    exit(1)
+  # Cached results and periods rejected by the pre-checks would skip the builds
+  options.cache = ''
+  options.precheck = False
+
+  input_spec   = load_spec(argv[1])
+  hw_spec      = importlib.import_module(argv[2], "*")
+  latency_spec = importlib.import_module(argv[3], "*")
+  minute_limit = float(argv[4])
+  periods      = range(int(argv[5]), int(argv[6]) + 1, int(argv[7]))
+
+  input_spec.action_fields_limit = hw_spec.action_fields_limit
+  input_spec.match_unit_limit    = hw_spec.match_unit_limit
+  input_spec.match_unit_size     = hw_spec.match_unit_size
+  input_spec.action_proc_limit   = hw_spec.action_proc_limit
+  input_spec.match_proc_limit    = hw_spec.match_proc_limit
+
+  G = ScheduleDAG()
+  G.create_dag(input_spec.nodes, input_spec.edges, latency_spec)
+
+  results = []
+  for period in periods:
+    print ('{:*^80}'.format(' Period %d ' % period))
+    results.append((period, benchmark_build(G, input_spec, latency_spec, period, minute_limit, options)))
+
+  print ('\n\n')
+  print ('{:*^80}'.format(' Model build time of ' + argv[1] + ' (' + options.backend + ') '))
+  print ('%6s %9s %9s %10s %12s %12s %8s' % ('period', 'vars', 'constrs', 'nonzeros', 'terms(s)', 'matrix(s)', 'speedup'))
+  for (period, ((_, num_vars, num_constrs, num_nzs, term_time), (_, _, _, _, matrix_time))) in results:
+    print ('%6d %9d %9d %10d %12.2f %12.2f %7.1fx' %\
+           (period, num_vars, num_constrs, num_nzs, term_time, matrix_time, term_time / max(matrix_time, 1e-6)))
@@ -0,0 +1,71 @@
+import importlib
+import math
+import sys
+
+from schedule_dag import ScheduleDAG
+from printers import *
+from hw_spec_iterator import DrmtScheduleSolver
+from cpsat_scheduler import CpSatScheduleSolver
+from solver_options import parse_solver_options, options_usage
+from verifier import verify_schedule
+from period_search import search_period, probes_str
+from spec_file import load_spec
+
+if __name__ == "__main__":
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) != 6):
+    print ("Usage: ", argv[0], " <DAG file> <HW file> <latency file> <time limit in mins> <binary_up_limit> [options]")
+    print ("Options apply to the ILP, e.g. --backend selects its MILP backend")
+    print (options_usage())
+    exit(1)
+  # Cached results would hide the solve times
+  options.cache = ''
+  input_file   = argv[1]
+  hw_file      = argv[2]
+  latency_file = argv[3]
+  minute_limit = int(argv[4])
+  binary_up_limit = int(argv[5])
+
+  input_spec = load_spec(input_file)
+  hw_spec    = importlib.import_module(hw_file, "*")
+  latency_spec=importlib.import_module(latency_file, "*")
+  input_spec.action_fields_limit = hw_spec.action_fields_limit
+  input_spec.match_unit_limit    = hw_spec.match_unit_limit
+  input_spec.match_unit_size     = hw_spec.match_unit_size
+  input_spec.action_proc_limit   = hw_spec.action_proc_limit
+  input_spec.match_proc_limit    = hw_spec.match_proc_limit
+
+  G = ScheduleDAG()
+  G.create_dag(input_spec.nodes, input_spec.edges, latency_spec)
+
+  print ('{:*^80}'.format(' Input DAG '))
+  tpt_upper_bound = print_problem(G, input_spec)
+  print ('\n\n')
+
+  # Same limits as drmt_with_upper_bound.py
+  period_lower_bound = int(math.ceil((1.0) / tpt_upper_bound))
+  period_upper_bound = min(100, binary_up_limit)
+
+  solvers = [('ILP (' + options.backend + ')',\
+              lambda period: DrmtScheduleSolver(G, input_spec, latency_spec, seed_rnd_sieve = False,\
+                                                period_duration = period, minute_limit = minute_limit, options = options)),\
+             ('CP-SAT',\
+              lambda period: CpSatScheduleSolver(G, input_spec, latency_spec, period_duration = period,\
+                                                 minute_limit = minute_limit, options = options))]
+
+  results = []
+  for (name, create_solver) in solvers:
+    print ('{:*^80}'.format(' Period search with ' + name + ' '))
+    best_period, best_solution, probes = search_period(lambda period, best_solution: create_solver(period).solve(),\
+                                                       period_lower_bound, period_upper_bound, options.search)
+    verified = (best_solution != None) and \
+               verify_schedule(input_spec.nodes, input_spec.edges, best_solution.time_of_op,\
+                               hw_spec, latency_spec, best_period)
+    results.append((name, best_period, best_solution, probes, verified))
+
+  print ('\n\n')
+  print ('{:*^80}'.format(' Period search (%s) between %d and %d ' % (options.search, period_lower_bound, period_upper_bound)))
+  for (name, best_period, best_solution, probes, verified) in results:
+    print ('%s: period %s, length %s, verified %s' %\
+           (name, best_period, best_solution.length if best_solution else '-', verified))
+    print (probes_str(probes))
@@ -0,0 +1,79 @@
+import copy
+import importlib
+import itertools
+import sys
+
+from schedule_dag import ScheduleDAG
+from hw_spec_iterator import DrmtScheduleSolver
+from solver_options import FORMULATIONS, ANY_OP_FORMS, parse_solver_options, options_usage
+from solver_backends import available_backends
+from spec_file import load_spec
+
+# DAGs compared when none are given on the command line
+DAG_FILES = ['branch', 'branch1', 'branch2', 'branch3', 'branch4', 'branch-ipv4', 'branch-ipv6']
+
+def benchmark_dag(input_spec, hw_spec, latency_spec, period, minute_limit, options, backends):
+  """ Solves one DAG at one period with every formulation and any_op form on every backend
+
+  Returns
+  -------
+  rows : list
+      (backend, formulation, any_op, vars, constrs, nonzeros, build time, solve time, length)
+      per backend, formulation and any_op form; length is None when no schedule was found
+  """
+  input_spec.action_fields_limit = hw_spec.action_fields_limit
+  input_spec.match_unit_limit    = hw_spec.match_unit_limit
+  input_spec.match_unit_size     = hw_spec.match_unit_size
+  input_spec.action_proc_limit   = hw_spec.action_proc_limit
+  input_spec.match_proc_limit    = hw_spec.match_proc_limit
+
+  G = ScheduleDAG()
+  G.create_dag(input_spec.nodes, input_spec.edges, latency_spec)
+
+  rows = []
+  for (backend, formulation, any_op) in itertools.product(backends, FORMULATIONS, ANY_OP_FORMS):
+    run_options = copy.copy(options)
+    run_options.backend     = backend
+    run_options.formulation = formulation
+    run_options.any_op      = any_op
+    solver = DrmtScheduleSolver(G, input_spec, latency_spec, seed_rnd_sieve = False,\
+                                period_duration = period, minute_limit = minute_limit, options = run_options)
+    solution = solver.solve()
+    num_vars, num_constrs, num_nzs = getattr(solver, 'model_size', (0, 0, 0))
+    rows.append((backend, formulation, any_op, num_vars, num_constrs, num_nzs,\
+                 getattr(solver, 'build_time', 0.0), getattr(solver, 'solve_time', 0.0),\
+                 solution.length if solution else None))
+  return rows
+
+if __name__ == "__main__":
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) < 5):
+    print ("Usage: ", argv[0], " <HW file> <latency file> <time limit in mins> <period> [DAG files] [options]")
+    print ("Every formulation and any_op form is run on every installed backend, or only on --backend when it is given")
+    print (options_usage())
+    exit(1)
+  # Cached results would hide the solve times
+  options.cache = ''
+
+  hw_spec      = importlib.import_module(argv[1], "*")
+  latency_spec = importlib.import_module(argv[2], "*")
+  minute_limit = int(argv[3])
+  period       = int(argv[4])
+  dag_files    = argv[5:] if len(argv) > 5 else DAG_FILES
+  backends     = [options.backend] if any(arg.startswith('--backend') for arg in sys.argv) else available_backends()
+
+  results = []
+  for dag_file in dag_files:
+    print ('{:*^80}'.format(' ' + dag_file + ' '))
+    input_spec = load_spec(dag_file)
+    for row in benchmark_dag(input_spec, hw_spec, latency_spec, period, minute_limit, options, backends):
+      results.append((dag_file,) + row)
+
+  print ('\n\n')
+  print ('{:*^80}'.format(' Formulations and backends at period %d ' % period))
+  print ('%-12s %-7s %-13s %-13s %9s %9s %10s %9s %9s %7s' %\
+         ('DAG', 'backend', 'formulation', 'any_op', 'vars', 'constrs', 'nonzeros', 'build(s)', 'solve(s)', 'length'))
+  for (dag_file, backend, formulation, any_op, num_vars, num_constrs, num_nzs, build_time, solve_time, length) in results:
+    print ('%-12s %-7s %-13s %-13s %9d %9d %10d %9.2f %9.2f %7s' %\
+           (dag_file, backend, formulation, any_op, num_vars, num_constrs, num_nzs, build_time, solve_time,\
+            length if length is not None else '-'))
@@ -0,0 +1,259 @@
+import collections
+import os
+import sys
+from array import array
+
+from spec_file import DagSpec, Records, MappedColumns, dag_columns, json_column, write_columns, record_copies,\
+                      load_spec, spec_hash
+
+# Branch family files, in the layout of compiled specs (see spec_file.write_columns)
+FAMILY_SUFFIX = '.family'
+FAMILY_MAGIC = b'DRMTFAM1'
+
+class BranchFamily:
+  """ DAG specs of the branches of one program, as one base DAG and a
+  mask per branch
+
+  The base DAG has every node and edge of any branch, in sorted order,
+  with the attributes most branches give them. A branch is a bitset over
+  the base nodes and one over the base edges, plus the attributes where
+  it differs from the base (e.g. the condition nodes, which the branch
+  files number differently). The node and edge order of a branch is kept
+  when it is not the base order.
+
+  Since every branch is a mask of the same base, the nodes common to a
+  set of branches, or in any of them, are a bitwise and, or or, of their
+  masks. spec and dags only materialize a branch when asked.
+
+  Parameters
+  ----------
+  members : list
+      Name of each branch
+  names : list
+      Base nodes
+  edges : list
+      Base edges, (u, v)
+  records : list
+      Attribute dicts, by index
+  node_data : list
+      Attributes of each base node, index into records
+  edge_data : list
+      Attributes of each base edge, index into records
+  branches : list
+      Per branch, a dict with node_mask and edge_mask (int bitsets over
+      the base), node_overrides and edge_overrides (base index ->
+      attributes index) and node_order and edge_order (base indices,
+      None for the base order)
+  """
+  def __init__(self, members, names, edges, records, node_data, edge_data, branches):
+    self.members = members
+    self.names = names
+    self.edges = edges
+    self.records = records
+    self.node_data = node_data
+    self.edge_data = edge_data
+    self.branches = branches
+    self.copies = record_copies(records)
+    self.specs = dict()
+
+  def __len__(self):
+    return len(self.members)
+
+  @classmethod
+  def from_specs(cls, members, specs):
+    """ Returns the family of the specs, named members """
+    names = sorted(set(v for spec in specs for v in spec.nodes))
+    edges = sorted(set(e for spec in specs for e in spec.edges))
+    records = Records()
+    node_data = cls.base_data(names, [spec.nodes for spec in specs], records)
+    edge_data = cls.base_data(edges, [spec.edges for spec in specs], records)
+    node_ids = dict((v, i) for (i, v) in enumerate(names))
+    edge_ids = dict((e, i) for (i, e) in enumerate(edges))
+    branches = []
+    for spec in specs:
+      branch = dict()
+      for (kind, items, ids, data) in (('node', spec.nodes, node_ids, node_data),\
+                                       ('edge', spec.edges, edge_ids, edge_data)):
+        order = [ids[x] for x in items]
+        branch[kind + '_mask'] = sum(1 << i for i in order)
+        branch[kind + '_order'] = None if order == sorted(order) else order
+        overrides = dict()
+        for (x, i) in zip(items, order):
+          record = records.intern(items[x])
+          if record != data[i]:
+            overrides[i] = record
+        branch[kind + '_overrides'] = overrides
+      branches.append(branch)
+    return cls(list(members), names, edges, records.records, node_data, edge_data, branches)
+
+  @staticmethod
+  def base_data(keys, attributes, records):
+    """ Returns the attributes most of the dicts in attributes give each
+    of keys (the first of them on ties), index into records """
+    data = []
+    for key in keys:
+      interned = [records.intern(d[key]) for d in attributes if key in d]
+      counts = collections.Counter(interned)
+      best = max(counts.values())
+      data.append(next(r for r in interned if counts[r] == best))
+    return data
+
+  def ids(self, kind, b):
+    """ Base indices of the nodes (kind 'node') or edges ('edge') of branch b, in its order """
+    branch = self.branches[b]
+    if branch[kind + '_order'] is not None:
+      return branch[kind + '_order']
+    return bits(branch[kind + '_mask'])
+
+  def spec(self, b):
+    """ Returns the DagSpec of branch b, created on first use """
+    if b not in self.specs:
+      branch = self.branches[b]
+      (node_overrides, edge_overrides) = (branch['node_overrides'], branch['edge_overrides'])
+      nodes = dict((self.names[i], self.attributes(node_overrides.get(i, self.node_data[i])))\
+                   for i in self.ids('node', b))
+      edges = dict((self.edges[i], self.attributes(edge_overrides.get(i, self.edge_data[i])))\
+                   for i in self.ids('edge', b))
+      self.specs[b] = DagSpec(nodes, edges, None)
+    return self.specs[b]
+
+  def attributes(self, x):
+    return self.copies[x](self.records[x])
+
+  def dags(self, latency_spec, dag_class):
+    """ Returns the DAGs of the branches by index, as the graphs_map of
+    the drivers, each created (with dag_class) on first use """
+    return FamilyDags(self, latency_spec, dag_class)
+
+  def common_nodes(self, branches=None):
+    """ Returns the nodes in every one of branches (all by default), in base order """
+    selected = self.select(branches)
+    if not selected:
+      return []
+    mask = self.branches[selected[0]]['node_mask']
+    for b in selected[1:]:
+      mask &= self.branches[b]['node_mask']
+    return [self.names[i] for i in bits(mask)]
+
+  def unique_nodes(self, branches=None):
+    """ Returns the nodes in any of branches (all by default) once, in
+    base order, as generic_branch.get_total_unique_nodes """
+    mask = 0
+    for b in self.select(branches):
+      mask |= self.branches[b]['node_mask']
+    return [self.names[i] for i in bits(mask)]
+
+  def select(self, branches):
+    return list(range(len(self.members))) if branches is None else list(branches)
+
+  def node_mapping(self, b1, b2):
+    """ Returns, for each node common to branches b1 and b2, its position
+    in the node list of b1 -> its position in that of b2, as
+    ilp.get_common_nodes with their DAGs """
+    position1 = dict((i, k) for (k, i) in enumerate(self.ids('node', b1)))
+    position2 = dict((i, k) for (k, i) in enumerate(self.ids('node', b2)))
+    common = self.branches[b1]['node_mask'] & self.branches[b2]['node_mask']
+    return dict((position1[i], position2[i]) for i in bits(common))
+
+class FamilyDags(dict):
+  """ ScheduleDAGs of the branches of a BranchFamily by index, created
+  on first access """
+  def __init__(self, family, latency_spec, dag_class):
+    dict.__init__(self)
+    self.family = family
+    self.latency_spec = latency_spec
+    self.dag_class = dag_class
+
+  def __missing__(self, b):
+    if not (0 <= b < len(self.family)):
+      raise KeyError(b)
+    spec = self.family.spec(b)
+    G = self.dag_class()
+    G.create_dag(spec.nodes, spec.edges, self.latency_spec)
+    self[b] = G
+    return G
+
+def bits(mask):
+  """ Returns the indices of the bits set in mask, in increasing order """
+  # Least significant bit first, without the 0b prefix
+  return [i for (i, c) in enumerate(bin(mask)[:1:-1]) if c == '1']
+
+def mask_bytes(mask, count):
+  return mask.to_bytes((count + 7) // 8, 'little')
+
+def write_family(family, path):
+  """ Writes family to path, the base DAG as the columns of a compiled
+  spec and the masks of the branches as bytes """
+  records = Records()
+  for r in family.records:
+    records.intern(r)
+  (names, edges) = (family.names, family.edges)
+  columns = dag_columns(names, dict(zip(names, (family.records[x] for x in family.node_data))),\
+                        edges, dict(zip(edges, (family.records[x] for x in family.edge_data))), records)
+  branches = [dict(node_overrides=sorted(b['node_overrides'].items()), edge_overrides=sorted(b['edge_overrides'].items()),\
+                   node_order=b['node_order'], edge_order=b['edge_order']) for b in family.branches]
+  columns += [('records',    json_column(records.records)),\
+              ('branches',   json_column(branches)),\
+              ('node_masks', array('B', b''.join(mask_bytes(b['node_mask'], len(names)) for b in family.branches))),\
+              ('edge_masks', array('B', b''.join(mask_bytes(b['edge_mask'], len(edges)) for b in family.branches)))]
+  write_columns(path, FAMILY_MAGIC, {'members' : family.members}, columns)
+
+def read_family(path):
+  """ Returns the BranchFamily of a family file, memory-mapped as read_spec """
+  with MappedColumns(path, FAMILY_MAGIC) as mapped:
+    members = mapped.header['members']
+    names = mapped.json('names')
+    records = mapped.json('records')
+    edges = [(names[u], names[v]) for (u, v) in zip(mapped.column('src'), mapped.column('dst'))]
+    node_masks = bytes(mapped.column('node_masks', 'B'))
+    edge_masks = bytes(mapped.column('edge_masks', 'B'))
+    (node_bytes, edge_bytes) = ((len(names) + 7) // 8, (len(edges) + 7) // 8)
+    branches = []
+    for (b, branch) in enumerate(mapped.json('branches')):
+      branches.append({'node_mask'      : int.from_bytes(node_masks[b * node_bytes:(b + 1) * node_bytes], 'little'),\
+                       'edge_mask'      : int.from_bytes(edge_masks[b * edge_bytes:(b + 1) * edge_bytes], 'little'),\
+                       'node_overrides' : dict(branch['node_overrides']),\
+                       'edge_overrides' : dict(branch['edge_overrides']),\
+                       'node_order'     : branch['node_order'],\
+                       'edge_order'     : branch['edge_order']})
+    return BranchFamily(members, names, edges, records, list(mapped.column('node_data')),\
+                        list(mapped.column('edge_data')), branches)
+
+def load_branch_specs(files):
+  """ Returns the names and specs of the branches in files, each a DAG
+  spec (see spec_file.load_spec) or a family file for all its branches,
+  and the family when files is a single family file (None otherwise) """
+  if (len(files) == 1) and files[0].endswith(FAMILY_SUFFIX):
+    family = read_family(files[0])
+    return family.members, [family.spec(b) for b in range(len(family))], family
+  return list(files), [load_spec(name) for name in files], None
+
+if __name__ == "__main__":
+  if (len(sys.argv) < 3):
+    print ("Usage: ", sys.argv[0], " <output file> <DAG files>")
+    print ("Writes the DAG specs (modules, .json or .dag files) as one " + FAMILY_SUFFIX + " file, which")
+    print ("generic_branch.py and drmt_4_branch.py accept in place of the DAG files")
+    exit(1)
+
+  path = sys.argv[1]
+  members = sys.argv[2:]
+  specs = [load_spec(name) for name in members]
+  family = BranchFamily.from_specs(members, specs)
+  write_family(family, path)
+
+  loaded = read_family(path)
+  for (b, spec) in enumerate(specs):
+    if (spec_hash(loaded.spec(b)) != spec_hash(spec)) or (list(loaded.spec(b).nodes) != list(spec.nodes)):
+      os.remove(path)
+      raise ValueError('branch %s does not survive the family file' % members[b])
+
+  print ('Wrote ', path, ' (%d base nodes, %d base edges, %d bytes)' %\
+         (len(family.names), len(family.edges), os.path.getsize(path)))
+  print ('%-20s %8s %8s %10s %10s' % ('branch', 'nodes', 'edges', 'node diffs', 'edge diffs'))
+  for (b, name) in enumerate(members):
+    branch = family.branches[b]
+    print ('%-20s %8d %8d %10d %10d' % (name, len(specs[b].nodes), len(specs[b].edges),\
+                                        len(branch['node_overrides']), len(branch['edge_overrides'])))
+  print ('Nodes common to all branches ', len(family.common_nodes()))
+  print ('Nodes in any branch          ', len(family.unique_nodes()))
+
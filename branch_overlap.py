@@ -0,0 +1,72 @@
+class BranchOverlap:
+  """ Which branches each node and edge of a set of branch DAGs is in
+
+  One pass over the nodes and edges of every branch records, per node,
+  the bitset of branches it is in and its position in the node list of
+  each, and per edge the largest delay any branch gives it. Common,
+  unique and pairwise overlaps are then bitset tests and dict lookups
+  rather than scans of node lists.
+
+  Nodes and edges are kept in order of first appearance over the
+  branches, the order of the lists the scans used to build.
+
+  Parameters
+  ----------
+  graphs : list
+      ScheduleDAG of each branch
+  """
+  def __init__(self, graphs):
+    self.count = len(graphs)
+    self.node_branches = dict()  # node -> bitset of the branches it is in
+    self.positions = []          # per branch, node -> position in G.nodes()
+    self.edge_delays = dict()    # (u, v) -> largest delay over the branches
+    for (b, G) in enumerate(graphs):
+      bit = 1 << b
+      nodes = G.nodes()
+      self.positions.append(dict((v, k) for (k, v) in enumerate(nodes)))
+      for v in nodes:
+        self.node_branches[v] = self.node_branches.get(v, 0) | bit
+      for (u, v) in G.edges():
+        delay = G.edge[u][v]['delay']
+        if ((u, v) not in self.edge_delays) or (delay > self.edge_delays[(u, v)]):
+          self.edge_delays[(u, v)] = delay
+
+  def mask(self, branches):
+    """ Returns the bitset of branches (all by default) """
+    if branches is None:
+      return (1 << self.count) - 1
+    mask = 0
+    for b in branches:
+      mask |= 1 << b
+    return mask
+
+  def common_nodes(self, branches=None):
+    """ Returns the nodes in every one of branches (all by default) """
+    mask = self.mask(branches)
+    if mask == 0:
+      return []
+    return [v for (v, m) in self.node_branches.items() if (m & mask) == mask]
+
+  def unique_nodes(self, branches=None):
+    """ Returns the nodes in any of branches (all by default), once each """
+    mask = self.mask(branches)
+    return [v for (v, m) in self.node_branches.items() if m & mask]
+
+  def exclusive_nodes(self, b):
+    """ Returns the nodes of branch b that are in no other branch """
+    return [v for (v, m) in self.node_branches.items() if m == (1 << b)]
+
+  def node_mapping(self, b1, b2):
+    """ Returns, for each node common to branches b1 and b2, its position
+    in the node list of b1 -> its position in that of b2 """
+    positions2 = self.positions[b2]
+    return dict((k, positions2[v]) for (v, k) in self.positions[b1].items() if v in positions2)
+
+  def node_mappings(self):
+    """ Returns node_mapping(i, j) of every pair of branches i < j, as mappings[i][j] """
+    return dict((i, dict((j, self.node_mapping(i, j)) for j in range(i + 1, self.count)))\
+                for i in range(self.count - 1))
+
+  def unique_edges(self):
+    """ Returns the edges of any branch, once each, and the largest delay of each """
+    return list(self.edge_delays), dict(self.edge_delays)
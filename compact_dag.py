@@ -0,0 +1,131 @@
+import math
+from array import array
+
+import networkx as nx
+
+# Node types, kind[i] is an index into NODE_TYPES
+NODE_TYPES = ('match', 'action', 'condition')
+
+# Dependency classes, named after the latency_spec delay of their edges
+DEP_CLASSES = ('dM', 'dA', 'dS')
+
+class CompactDAG:
+  """ Immutable array view of a ScheduleDAG
+
+  Nodes get integer ids in topological order, so that a single pass over
+  range(n) visits predecessors first. Node annotations are typed arrays
+  indexed by id (0 where a node has no such annotation) and the edges
+  are kept twice in CSR form, by head and by tail, with their delays and
+  dependency classes (an index into DEP_CLASSES): the predecessors of
+  node i are pred_idx[pred_ptr[i]:pred_ptr[i + 1]].
+  The arrays support the buffer protocol, so numpy.frombuffer wraps
+  them without a copy.
+
+  The view is built by ScheduleDAG.compact and must not outlive changes
+  to the DAG (create_dag drops it).
+
+  Parameters
+  ----------
+  G : ScheduleDAG
+      DAG with type, key_width/num_fields and delay/dep_class annotations
+  """
+  def __init__(self, G):
+    self.names = tuple(nx.topological_sort(G))
+    self.index = dict((v, i) for (i, v) in enumerate(self.names))
+    n = len(self.names)
+    # Ids in the order of G.nodes(), the order the solvers create variables in
+    self.graph_order = array('l', [self.index[v] for v in nx.DiGraph.nodes(G)])
+
+    self.kind       = array('b', [NODE_TYPES.index(G.node[v]['type']) for v in self.names])
+    self.key_width  = array('l', [G.node[v].get('key_width', 0) for v in self.names])
+    self.num_fields = array('l', [G.node[v].get('num_fields', 0) for v in self.names])
+
+    self.pred_ptr, self.pred_idx, self.pred_delay, self.pred_class =\
+      self.csr(n, [[(self.index[u], G.edge[u][v]) for (u, _) in G.in_edges(v)] for v in self.names])
+    self.succ_ptr, self.succ_idx, self.succ_delay, self.succ_class =\
+      self.csr(n, [[(self.index[w], G.edge[v][w]) for (_, w) in G.out_edges(v)] for v in self.names])
+
+    # Node lists per type, in the order of G.nodes()
+    self.by_type = dict((t, tuple(self.names[i] for i in self.graph_order if NODE_TYPES[self.kind[i]] == t))\
+                        for t in NODE_TYPES)
+    self.units = dict()  # match_unit_size -> match_units
+
+  @staticmethod
+  def csr(n, adjacency):
+    ptr = array('l', [0] * (n + 1))
+    idx = array('l')
+    delay = array('l')
+    dep_class = array('b')
+    for (i, neighbors) in enumerate(adjacency):
+      for (j, data) in neighbors:
+        idx.append(j)
+        delay.append(data['delay'])
+        dep_class.append(DEP_CLASSES.index(data['dep_class']))
+      ptr[i + 1] = len(idx)
+    return ptr, idx, delay, dep_class
+
+  def __len__(self):
+    return len(self.names)
+
+  def nodes(self, select='*'):
+    """ Returns the nodes of type select ('*' for all) in the order of G.nodes() """
+    if select == '*':
+      return tuple(self.names[i] for i in self.graph_order)
+    return self.by_type[select]
+
+  def match_units(self, unit_size):
+    """ Returns the match units of every match node for match_unit_size unit_size """
+    if unit_size not in self.units:
+      self.units[unit_size] = dict((v, int(math.ceil((1.0 * self.key_width[self.index[v]]) / unit_size)))\
+                                   for v in self.by_type['match'])
+    return self.units[unit_size]
+
+  def fields(self, select='action'):
+    """ Returns the action fields of every node of type select """
+    return dict((v, self.num_fields[self.index[v]]) for v in self.by_type[select])
+
+  def longest_paths(self, delays=None):
+    """ Returns (length, predecessor) of the longest path from any root to
+    each node id, with ties broken as ScheduleDAG.critical_path always did
+
+    delays replaces pred_delay, e.g. with the delays of another latency
+    spec (see latency_batch.LatencyBatch)
+    """
+    if delays is None:
+      delays = self.pred_delay
+    dist = [None] * len(self.names)
+    for i in range(len(self.names)):
+      best = (0, self.names[i])
+      for k in range(self.pred_ptr[i], self.pred_ptr[i + 1]):
+        u = self.pred_idx[k]
+        pair = (dist[u][0] + int(delays[k]), self.names[u])
+        if (k == self.pred_ptr[i]) or (pair > best):
+          best = pair
+      dist[i] = best
+    return dist
+
+  def critical_path(self, delays=None):
+    """ Returns the longest path and its latency, see ScheduleDAG.critical_path """
+    dist = self.longest_paths(delays)
+    i = max(range(len(dist)), key=lambda i: dist[i])
+    node = self.names[i]
+    length = dist[i][0]
+    latency = length + 1 # one extra cycle for final operation
+    path = []
+    while length > 0:
+      path.append(node)
+      length, node = dist[self.index[node]]
+    return list(reversed(path)), latency
+
+  def time_windows(self, horizon):
+    """ Returns the ASAP and ALAP times of every node, see ScheduleDAG.time_windows """
+    n = len(self.names)
+    asap = [0] * n
+    for i in range(n):
+      for k in range(self.pred_ptr[i], self.pred_ptr[i + 1]):
+        asap[i] = max(asap[i], asap[self.pred_idx[k]] + self.pred_delay[k])
+    alap = [horizon - 1] * n
+    for i in reversed(range(n)):
+      for k in range(self.succ_ptr[i], self.succ_ptr[i + 1]):
+        alap[i] = min(alap[i], alap[self.succ_idx[k]] - self.succ_delay[k])
+    return dict(zip(self.names, asap)), dict(zip(self.names, alap))
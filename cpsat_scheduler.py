@@ -0,0 +1,244 @@
+import collections
+import importlib
+import math
+import sys
+import time
+from schedule_dag import ScheduleDAG
+from printers import *
+from solution import Solution
+from solver_options import parse_solver_options, options_usage
+from prechecks import PRECHECK_STATS, LENGTH_BOUND_STATS, dag_precheck
+from time_budget import SOLVE_TIMEOUTS
+from telemetry import open_telemetry
+import hw_spec_iterator
+import solver_backends
+from result_cache import open_cache, solve_key
+from spec_file import load_spec
+
+try:
+  from ortools.sat.python import cp_model
+except ImportError:
+  cp_model = None
+
+class CpSatScheduleSolver(hw_spec_iterator.DrmtScheduleSolver):
+    """ dRMT scheduler written directly as a CP-SAT modulo scheduling model
+
+    Unlike the ILP (see DrmtScheduleSolver), no qr[v, q, r] binaries are
+    created. Each node v has a start time t[v] = q[v] * T + r[v] and
+
+      * match units and action fields are cumulative constraints over the
+        ring of T time slots, with a unit length interval at r[v] per node
+      * match/action processor limits use one busy literal per time slot
+        (q * T + r) of the first Q_MAX periods, which t[v] selects through an
+        element constraint, and sum(busy[q * T + r] for q) is bounded per r
+
+    The hw limits are read from input_spec, as for the ILP solvers.
+    """
+    def __init__(self, dag, input_spec, latency_spec, period_duration, minute_limit, options=None):
+        hw_spec_iterator.DrmtScheduleSolver.__init__(self, dag, input_spec, latency_spec,\
+                                                     seed_rnd_sieve = False, period_duration = period_duration,\
+                                                     minute_limit = minute_limit, options = options)
+
+    def solve(self):
+        """ Returns the optimal schedule as a Solution, None if there is none
+
+        None is also returned when the time limit is hit before any
+        schedule is found.
+        """
+        if cp_model is None:
+          raise ImportError('ortools is not installed, needed by CpSatScheduleSolver')
+
+        cpath, cplat = self.G.critical_path()
+        Q_MAX = int(math.ceil(1.5 * cplat / self.period_duration))
+
+        print ('{:*^80}'.format(' Running DRMT CP-SAT solver '))
+        if self.options.precheck and \
+           PRECHECK_STATS.record(dag_precheck(self.G, self.input_spec, self.period_duration, Q_MAX * self.period_duration)):
+          return None
+        cache = open_cache(self.options)
+        if cache:
+          cache_key = solve_key('cpsat', [self.G], self.input_spec, self.period_duration, self.options)
+          cached = cache.lookup(cache_key)
+          if cached:
+            print ('Cached result: %s (solved in %.2f s)' % (cached.verdict, cached.runtime))
+            return cached.solution
+        T = self.period_duration
+        horizon = Q_MAX * T
+        nodes = self.G.nodes()
+        match_nodes = self.G.nodes(select='match')
+        action_nodes = self.G.nodes(select='action')
+        edges = self.G.edges()
+
+        build_start = time.time()
+        asap, alap = self.G.time_windows(horizon)
+        late_nodes = [v for v in nodes if asap[v] > alap[v]]
+        if late_nodes:
+          print ('Infeasible, no start time within Q_MAX periods for ', late_nodes)
+          return None
+
+        m = cp_model.CpModel()
+
+        # Start time, quotient and remainder of each node
+        t = dict()
+        r = dict()
+        for v in nodes:
+          t[v] = m.NewIntVar(asap[v], alap[v], 't[%s]' % v)
+          q = m.NewIntVar(asap[v] // T, alap[v] // T, 'q[%s]' % v)
+          r[v] = m.NewIntVar(0, T - 1, 'r[%s]' % v)
+          m.Add(t[v] == q * T + r[v])
+
+        # The length is the maximum of all t's, no shorter than the critical path
+        # less the extra cycle critical_path counts for the final operation
+        length = m.NewIntVar(cplat - 1, horizon - 1, 'length')
+        for v in nodes:
+          if self.G.out_degree(v) == 0:
+            m.Add(length >= t[v])
+        m.Minimize(length)
+
+        # Respect dependencies in DAG
+        for (u, v) in edges:
+          m.Add(t[v] - t[u] >= self.G.edge[u][v]['delay'])
+
+        # Match units and action fields used in each slot of the ring
+        slot = dict((v, m.NewFixedSizeIntervalVar(r[v], 1, 'slot[%s]' % v)) for v in nodes)
+        m.AddCumulative([slot[v] for v in match_nodes],\
+                        [int(math.ceil((1.0 * self.G.node[v]['key_width']) / self.input_spec.match_unit_size))\
+                         for v in match_nodes],\
+                        self.input_spec.match_unit_limit)
+        m.AddCumulative([slot[v] for v in action_nodes],\
+                        [self.G.node[v]['num_fields'] for v in action_nodes],\
+                        self.input_spec.action_fields_limit)
+
+        # Packets (q) with a match/action in each slot (r) of the ring
+        for (select, proc_limit) in ((match_nodes, self.input_spec.match_proc_limit),\
+                                     (action_nodes, self.input_spec.action_proc_limit)):
+          busy = [m.NewBoolVar('busy[%d]' % s) for s in range(horizon)]
+          for v in select:
+            m.AddElement(t[v], busy, 1)
+          for rr in range(T):
+            m.Add(sum(busy[q * T + rr] for q in range(Q_MAX)) <= proc_limit)
+
+        # Solve model
+        self.build_time = time.time() - build_start
+        print ('Model build time = %.2f s' % self.build_time)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.minute_limit * 60
+        if self.options.threads:
+          solver.parameters.num_workers = self.options.threads
+        telemetry = open_telemetry(self.options, 'cpsat', [self.G], self.input_spec, T)
+        on_solution = None
+        if telemetry:
+          on_solution = lambda cb: telemetry.progress(cb.ObjectiveValue(), cb.BestObjectiveBound(), cb.NumBranches())
+        # Stop once a schedule is as short as the critical path
+        ret = solver.Solve(m, solver_backends.CpSatSolutionCallback(cplat - 1, on_solution = on_solution))
+        self.solve_time = solver.WallTime()
+        if telemetry:
+          found = ret in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+          telemetry.record('done', solver.ObjectiveValue() if found else None,\
+                           solver.BestObjectiveBound() if found else None, solver.NumBranches(),\
+                           status = solver.StatusName(ret), runtime = self.solve_time)
+        print ('Solve time = %.2f s' % self.solve_time)
+
+        if (ret == cp_model.INFEASIBLE):
+          print ('Infeasible')
+          if cache:
+            cache.store(cache_key, None, None, None, self.solve_time)
+          return None
+        elif (ret == cp_model.UNKNOWN):
+          print ('Hit time limit, no solution found yet')
+          SOLVE_TIMEOUTS.record()
+          return None
+        elif (ret == cp_model.FEASIBLE) and (solver.ObjectiveValue() <= cplat - 1):
+          print ('Optimal solution found at the critical path bound')
+        elif (ret == cp_model.FEASIBLE):
+          print ('Hit time limit, suboptimal solution found with bound ', solver.BestObjectiveBound())
+        elif (ret == cp_model.OPTIMAL):
+          print ('Optimal solution found')
+        else:
+          print ('Return code is ', solver.StatusName(ret))
+          assert(False)
+
+        stopped = (solver.ObjectiveValue() <= cplat - 1)
+        LENGTH_BOUND_STATS.record(stopped)
+
+        # Construct and return schedule
+        self.time_of_op = {}
+        self.ops_at_time = collections.defaultdict(list)
+        self.length = solver.Value(length) + 1
+        for v in nodes:
+            tv = solver.Value(t[v])
+            self.time_of_op[v] = tv
+            self.ops_at_time[tv].append(v)
+
+        # Compute periodic schedule to calculate resource usage
+        self.compute_periodic_schedule()
+
+        # Populate solution
+        solution = Solution()
+        solution.time_of_op = self.time_of_op
+        solution.ops_at_time = self.ops_at_time
+        solution.ops_on_ring = self.ops_on_ring
+        solution.length = self.length
+        solution.match_key_usage     = self.match_key_usage
+        solution.action_fields_usage = self.action_fields_usage
+        solution.match_units_usage   = self.match_units_usage
+        solution.match_proc_usage    = self.match_proc_usage
+        solution.action_proc_usage   = self.action_proc_usage
+        if cache and ((ret == cp_model.OPTIMAL) or stopped):
+          cache.store(cache_key, solution, self.time_of_op, 0.0, self.solve_time)
+        return solution
+
+if __name__ == "__main__":
+  # Cmd line args
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) != 6):
+    print ("Usage: ", argv[0], " <DAG file> <HW file> <latency file> <time limit in mins> <period> [options]")
+    print (options_usage())
+    exit(1)
+  elif (len(argv) == 6):
+    input_file   = argv[1]
+    hw_file      = argv[2]
+    latency_file = argv[3]
+    minute_limit = int(argv[4])
+    period       = int(argv[5])
+
+  # Input specification
+  input_spec = load_spec(input_file)
+  hw_spec    = importlib.import_module(hw_file, "*")
+  latency_spec=importlib.import_module(latency_file, "*")
+  input_spec.action_fields_limit = hw_spec.action_fields_limit
+  input_spec.match_unit_limit    = hw_spec.match_unit_limit
+  input_spec.match_unit_size     = hw_spec.match_unit_size
+  input_spec.action_proc_limit   = hw_spec.action_proc_limit
+  input_spec.match_proc_limit    = hw_spec.match_proc_limit
+
+  # Create G
+  G = ScheduleDAG()
+  G.create_dag(input_spec.nodes, input_spec.edges, latency_spec)
+  cpath, cplat = G.critical_path()
+
+  print ('{:*^80}'.format(' Input DAG '))
+  print_problem(G, input_spec)
+  print ('\n\n')
+
+  solver = CpSatScheduleSolver(G, input_spec, latency_spec, period_duration = period,\
+                               minute_limit = minute_limit, options = options)
+  solution = solver.solve()
+  if (solution == None):
+    print ('No schedule with period ', period, ' cycles')
+    exit(1)
+
+  print (LENGTH_BOUND_STATS.summary())
+  print ('Schedule length (thread count) = %d cycles' % solution.length)
+  print ('Critical path length = %d cycles' % cplat)
+
+  print ('\n\n')
+
+  print ('{:*^80}'.format(' First scheduling period on one processor'))
+  print (timeline_str(solution.ops_at_time, white_space=0, timeslots_per_row=4),'\n\n')
+
+  print ('{:*^80}'.format(' Steady state on one processor'))
+  print ('{:*^80}'.format('p[u] is packet from u scheduling periods ago'))
+  print (timeline_str(solution.ops_on_ring, white_space=0, timeslots_per_row=4), '\n\n')
+
+  print_resource_usage(input_spec, solution)
@@ -1,6 +1,7 @@
 import networkx as nx
 import sys
 import importlib
+from spec_file import load_spec
 
 INPUT_SPEC_FILE = 'orig'
 HW = 'large_hw'
@@ -43,7 +44,7 @@ if __name__ == "__main__":
   '''
   
   # Input specification
-  input_spec = importlib.import_module(INPUT_SPEC_FILE, "*")
+  input_spec = load_spec(INPUT_SPEC_FILE)
   hw_spec    = importlib.import_module(HW, "*")
   latency_spec=importlib.import_module(LATENCY, "*")
   cond_block_name = COND_NAME
@@ -0,0 +1,229 @@
+import csv
+import importlib
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+
+from schedule_dag import ScheduleDAG
+from printers import *
+from solver_options import parse_solver_options, options_usage
+from verifier import verify_schedule
+from time_budget import SOLVE_TIMEOUTS
+import hw_spec_iterator
+from spec_file import load_spec
+
+# Dimensions of the design space. Feasibility is monotone in each of them
+# (more of any never hurts) and so is cost. The last one is searched for
+# its lowest feasible value given the others.
+DIMENSIONS = ('match_proc_limit', 'action_proc_limit', 'match_unit_limit', 'match_unit_size',\
+              'action_fields_limit', 'processors')
+
+# Worker processes are forked so that they share the DAG and spec modules
+# of the parent (modules cannot be pickled)
+FORK = multiprocessing.get_context('fork')
+
+# (G, input_spec, latency_spec, minute_limit, options) of the exploration,
+# set before the workers are forked
+problem = None
+
+def solve_design_point(hw):
+  """ Solves the DAG of problem with the hw limits and processor count in hw
+
+  Returns
+  -------
+  feasible : bool
+      None if undecided: the solve hit minute_limit, or its schedule
+      failed verification, which proves nothing about the point
+  length : int
+      Schedule length, None if not feasible
+  seconds : float
+  """
+  (G, input_spec, latency_spec, minute_limit, options) = problem
+  start = time.time()
+  timeouts = SOLVE_TIMEOUTS.count
+  for name in DIMENSIONS[:-1]:
+    setattr(input_spec, name, hw[name])
+  solution = hw_spec_iterator.DrmtScheduleSolver(G, input_spec, latency_spec, seed_rnd_sieve = False,\
+                                                 period_duration = hw['processors'], minute_limit = minute_limit,\
+                                                 options = options).solve()
+  if solution and not verify_schedule(input_spec.nodes, input_spec.edges, solution.time_of_op,\
+                                      input_spec, latency_spec, hw['processors']):
+    print ('Schedule failed verification for ', hw)
+    return (None, None, time.time() - start)
+  if (solution == None) and (SOLVE_TIMEOUTS.count != timeouts):
+    return (None, None, time.time() - start)
+  return (solution != None, solution.length if solution else None, time.time() - start)
+
+class DesignSpace:
+  """ Grid of candidate values per dimension, points are tuples of indices
+
+  Parameters
+  ----------
+  values : list
+      Candidate values of each of DIMENSIONS, in increasing order
+  """
+  def __init__(self, values):
+    self.values = [sorted(set(v)) for v in values]
+    self.feasible   = []  # Solved points
+    self.infeasible = []
+    self.unknown    = []  # Undecided, they dominate nothing
+
+  def hw(self, point):
+    return dict((name, self.values[d][i]) for (d, (name, i)) in enumerate(zip(DIMENSIONS, point)))
+
+  def verdict(self, point):
+    """ Returns True/False if point is known (in)feasible by dominance, None otherwise """
+    if any(all(f <= p for (f, p) in zip(f_point, point)) for f_point in self.feasible):
+      return True
+    if any(all(p <= i for (p, i) in zip(point, i_point)) for i_point in self.infeasible):
+      return False
+    return None
+
+def explore(space, solve_points, batch_size):
+  """ Finds the Pareto frontier (minimal feasible points) of space
+
+  For every combination of the other dimensions, the lowest feasible
+  value of the last one is bisected. Each bisection point is first
+  looked up against the solved points: it is feasible if it dominates a
+  feasible point and infeasible if an infeasible point dominates it.
+  Up to batch_size of the points left are solved at a time (e.g. one per
+  worker), so that every batch prunes the next ones.
+
+  An undecided solve (feasible None) proves nothing, so it prunes no
+  other point. Its bisection passes over it like an infeasible point,
+  so the frontier point of its prefix is proven feasible but may not be
+  minimal; space.unknown lists the points in doubt.
+
+  Parameters
+  ----------
+  space : DesignSpace
+  solve_points : function
+      Returns (feasible, length, seconds) for each point of a list,
+      feasible is None if undecided
+  batch_size : int
+
+  Returns
+  -------
+  frontier : list
+      Minimal feasible points, none of them dominates another
+  solved : dict
+      point -> (feasible, length, seconds) of every solve
+  pruned : int
+      Number of bisection points decided by dominance
+  """
+  n = len(space.values[-1])
+  # [lo, hi) holds the lowest feasible index of the last dimension (n if none)
+  searches = dict((prefix, [0, n]) for prefix in itertools.product(*[range(len(v)) for v in space.values[:-1]]))
+  solved = dict()
+  pruned = 0
+  while True:
+    batch = []
+    for (prefix, bounds) in searches.items():
+      while bounds[0] < bounds[1]:
+        mid = (bounds[0] + bounds[1]) // 2
+        verdict = space.verdict(prefix + (mid,))
+        if verdict is None:
+          if prefix + (mid,) not in batch:
+            batch.append(prefix + (mid,))
+          break
+        pruned += 1
+        if verdict:
+          bounds[1] = mid
+        else:
+          bounds[0] = mid + 1
+      if len(batch) == batch_size:
+        break
+    if not batch:
+      break
+    for (point, result) in zip(batch, solve_points(batch)):
+      solved[point] = result
+      if result[0] is None:
+        space.unknown.append(point)
+        bounds = searches[point[:-1]]
+        bounds[0] = max(bounds[0], point[-1] + 1)
+      else:
+        (space.feasible if result[0] else space.infeasible).append(point)
+
+  points = [prefix + (bounds[0],) for (prefix, bounds) in searches.items() if bounds[0] < n]
+  frontier = [p for p in points\
+              if not any((q != p) and all(a <= b for (a, b) in zip(q, p)) for q in points)]
+  return sorted(frontier), solved, pruned
+
+if __name__ == "__main__":
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) != 8):
+    print ("Usage: ", argv[0], " <DAG file> <space file> <latency file> <time limit in mins> <max processors> <workers> <output prefix> [options]")
+    print ("The space file lists the candidate values of ", ', '.join(DIMENSIONS), " (see large_hw_space.py)")
+    print ("The Pareto frontier is written to <output prefix>.json and <output prefix>.csv")
+    print (options_usage())
+    exit(1)
+  input_file     = argv[1]
+  space_file     = argv[2]
+  latency_file   = argv[3]
+  minute_limit   = int(argv[4])
+  max_processors = int(argv[5])
+  workers        = int(argv[6])
+  output_prefix  = argv[7]
+
+  input_spec   = load_spec(input_file)
+  space_spec   = importlib.import_module(space_file, "*")
+  latency_spec = importlib.import_module(latency_file, "*")
+  values = [list(getattr(space_spec, name)) for name in DIMENSIONS]
+  values[-1] = [p for p in values[-1] if p <= max_processors]
+  space = DesignSpace(values)
+
+  G = ScheduleDAG()
+  G.create_dag(input_spec.nodes, input_spec.edges, latency_spec)
+  for name in DIMENSIONS[:-1]:
+    setattr(input_spec, name, space.values[DIMENSIONS.index(name)][-1])
+  print ('{:*^80}'.format(' Input DAG '))
+  print_problem(G, input_spec)
+  print ('\n\n')
+
+  # Share the cores among the workers unless --threads is given
+  if not options.threads:
+    options.threads = max(1, multiprocessing.cpu_count() // workers)
+  problem = (G, input_spec, latency_spec, minute_limit, options)
+  start = time.time()
+  if workers > 1:
+    sys.stdout.flush()
+    pool = FORK.Pool(workers)
+    solve_points = lambda points: pool.map(solve_design_point, [space.hw(p) for p in points], chunksize = 1)
+  else:
+    solve_points = lambda points: [solve_design_point(space.hw(p)) for p in points]
+  frontier, solved, pruned = explore(space, solve_points, workers)
+  if workers > 1:
+    pool.close()
+    pool.join()
+
+  print ('\n\n')
+  print ('{:*^80}'.format(' Pareto frontier (at most %d processors) ' % max_processors))
+  print ('  ' + ' '.join('%s' % name for name in DIMENSIONS) + ' length')
+  rows = []
+  for point in frontier:
+    row = space.hw(point)
+    row['length'] = solved[point][1]
+    rows.append(row)
+    print ('  ' + ' '.join('%*d' % (len(name), row[name]) for name in DIMENSIONS) + ' %d' % row['length'])
+  print ('%d solves (%.2f s of solver time), %d points decided by dominance, total time = %.2f s' %\
+         (len(solved), sum(seconds for (feasible, length, seconds) in solved.values()), pruned, time.time() - start))
+  if space.unknown:
+    print ('%d points undecided within the time limit, the frontier may not be minimal above them:' % len(space.unknown))
+    for point in sorted(space.unknown):
+      hw = space.hw(point)
+      print ('  ' + ' '.join('%*d' % (len(name), hw[name]) for name in DIMENSIONS))
+
+  with open(output_prefix + '.json', 'w') as fp:
+    json.dump({'dag' : input_file, 'max_processors' : max_processors, 'frontier' : rows,\
+               'unknown' : [space.hw(p) for p in sorted(space.unknown)],\
+               'solved' : [dict(space.hw(p), feasible = f, length = l, seconds = s)\
+                           for (p, (f, l, s)) in sorted(solved.items())]}, fp, indent = 2)
+  # The frontier, then the undecided points
+  with open(output_prefix + '.csv', 'w') as fp:
+    writer = csv.DictWriter(fp, fieldnames = list(DIMENSIONS) + ['length', 'verdict'])
+    writer.writeheader()
+    writer.writerows([dict(row, verdict = 'feasible') for row in rows])
+    writer.writerows([dict(space.hw(p), length = None, verdict = 'unknown') for p in sorted(space.unknown)])
+  print ('Wrote ', output_prefix + '.json', ' and ', output_prefix + '.csv')
@@ -2,15 +2,19 @@ import collections
 import importlib
 import math
 import sys
+import itertools
 from itertools import *
 
 import networkx as nx
-from gurobipy import *
+from solver_backends import GRB, create_model
 
 from printers import *
 from schedule_dag import ScheduleDAG
 import pprint as pp
 from finalsolution import Finalsolution
+from branch_family import load_branch_specs
+from branch_overlap import BranchOverlap
+from solver_options import SolverOptions, parse_solver_options, options_usage
 
 BRANCH1_SPEC_FILE = 'ipv4_cdffdcombined'
 BRANCH2_SPEC_FILE = 'ipv6_fdkjfdcombined'
@@ -19,18 +23,9 @@ LATENCY = 'drmt_fdlatencies'
 
 
 def get_common_nodes(graph1, graph2):
-    mapping = {}
-    branch1_nodes = graph1.nodes()
-    branch2_nodes = graph2.nodes()
-
-    for i in range(0, len(branch1_nodes)) :
-        for j in range(0, len(branch2_nodes)) :
-            if branch1_nodes[i] == branch2_nodes[j] :
-                mapping[i] = j
-
-    return mapping
+    return BranchOverlap([graph1, graph2]).node_mapping(0, 1)
 
-def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minute_limit):
+def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minute_limit, options=None):
 
     branch1_nodes = graph1.nodes()
     branch2_nodes = graph2.nodes()
@@ -58,8 +53,13 @@ def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minut
     action_nodes1 = graph1.nodes(select='action')
     action_nodes2 = graph2.nodes(select='action')
 
-    m = Model()
+    if options is None:
+        options = SolverOptions()
+
+    m = create_model(options.backend)
     m.setParam("LogToConsole", 0)
+    if options.threads:
+        m.setParam('Threads', options.threads)
 
     t1 = m.addVars(branch1_nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t1")
     qr1 = m.addVars(list(itertools.product(branch1_nodes, range(Q_MAX), range(T))), \
@@ -276,28 +276,27 @@ def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minut
     return final_solution
 
 if __name__ == "__main__":
+    argv, options = parse_solver_options(sys.argv)
+
     # Read specification for each branch
-    if (len(sys.argv) != 9):
-        print ("Usage: ", sys.argv[0], " <DAG file1> <DAG file2> <DAG file3> <DAG file 4>  <HW file> <latency file> <time limit in mins> <binary_up_limit>")
+    if (len(argv) not in (6, 9)):
+        print ("Usage: ", argv[0], " <DAG file1> <DAG file2> <DAG file3> <DAG file 4>  <HW file> <latency file> <time limit in mins> <binary_up_limit> [options]")
+        print ("   or: ", argv[0], " <branch family file>  <HW file> <latency file> <time limit in mins> <binary_up_limit> [options]")
+        print (options_usage())
         exit(1)
-    elif (len(sys.argv) == 9):
-        BRANCH1_SPEC_FILE  = sys.argv[1]
-        BRANCH2_SPEC_FILE  = sys.argv[2]
-
-        BRANCH3_SPEC_FILE  = sys.argv[3]
-        BRANCH4_SPEC_FILE  = sys.argv[4]
-        
-        HW = sys.argv[5]
-        LATENCY = sys.argv[6]
-        minute_limit = int(sys.argv[7])
-        binary_up_limit = int(sys.argv[8])
+    else:
+        DAG_FILES = argv[1:-4]
 
-    branch_spec = {}
-    branch_spec[0] = importlib.import_module(BRANCH1_SPEC_FILE, "*")
-    branch_spec[1] = importlib.import_module(BRANCH2_SPEC_FILE, "*")
+        HW = argv[-4]
+        LATENCY = argv[-3]
+        minute_limit = int(argv[-2])
+        binary_up_limit = int(argv[-1])
 
-    branch_spec[2] = importlib.import_module(BRANCH3_SPEC_FILE, "*")
-    branch_spec[3] = importlib.import_module(BRANCH4_SPEC_FILE, "*")
+    (_, specs, family) = load_branch_specs(DAG_FILES)
+    if len(specs) != 4:
+        print ("Expected 4 branches, found ", len(specs))
+        exit(1)
+    branch_spec = dict(enumerate(specs))
 
     hw_spec = importlib.import_module(HW, "*")
     latency_spec = importlib.import_module(LATENCY, "*")
@@ -310,18 +309,25 @@ if __name__ == "__main__":
         branch_spec[i].match_proc_limit = hw_spec.match_proc_limit    
 
 
-    # Create graphs for all branches
-    graphs_map = {}
-
-    for i in range(0,4):
-        graphs_map[i] = ScheduleDAG()
-        graphs_map[i].create_dag(branch_spec[i].nodes, branch_spec[i].edges, latency_spec)
+    # Create graphs for all branches, on first use for a branch family
+    if family:
+        graphs_map = family.dags(latency_spec, ScheduleDAG)
+    else:
+        graphs_map = {}
+        for i in range(0,4):
+            graphs_map[i] = ScheduleDAG()
+            graphs_map[i].create_dag(branch_spec[i].nodes, branch_spec[i].edges, latency_spec)
     
-    common_nodes_mapping ={}
-    for i in range(0,3):
-        common_nodes_mapping[i] = {}
-        for j in range(i+1,4):
-            common_nodes_mapping[i][j] = get_common_nodes(graphs_map[i], graphs_map[j])
+    # The masks of a branch family give the common nodes without comparing
+    # the DAGs, otherwise one pass over the four DAGs gives every pair
+    if family:
+        common_nodes_mapping ={}
+        for i in range(0,3):
+            common_nodes_mapping[i] = {}
+            for j in range(i+1,4):
+                common_nodes_mapping[i][j] = family.node_mapping(i, j)
+    else:
+        common_nodes_mapping = BranchOverlap([graphs_map[i] for i in range(0,4)]).node_mappings()
     
     match_key_size = {}
     for i in range(0, 4):
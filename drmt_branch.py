@@ -2,15 +2,27 @@ import collections
 import importlib
 import math
 import sys
+import itertools
 from itertools import *
 
 import networkx as nx
-from gurobipy import *
+from solver_backends import GRB, create_model
 
 from printers import *
 from schedule_dag import ScheduleDAG
 import pprint as pp
 from finalsolution import Finalsolution
+from qr_index import QrIndex, add_time_indexed_tie, add_disaggregated_any_op
+from matrix_builder import QrMatrix
+from solver_options import SolverOptions, parse_solver_options, options_usage
+from period_search import search_period, probes_str
+from result_cache import open_cache, solve_key
+from prechecks import PRECHECK_STATS, LENGTH_BOUND_STATS, dag_precheck
+from time_budget import SOLVE_TIMEOUTS, TimeBudget
+from telemetry import open_telemetry, optimize_with_telemetry
+from warm_start import RingResources, add_dag_resources, repair_schedule, set_mip_start
+from spec_file import load_spec
+from branch_overlap import BranchOverlap
 
 BRANCH1_SPEC_FILE = 'ipv4_cdffdcombined'
 BRANCH2_SPEC_FILE = 'ipv6_fdkjfdcombined'
@@ -19,18 +31,9 @@ LATENCY = 'drmt_fdlatencies'
 
 
 def get_common_nodes(graph1, graph2):
-    mapping = {}
-    branch1_nodes = graph1.nodes()
-    branch2_nodes = graph2.nodes()
-
-    for i in range(0, len(branch1_nodes)) :
-        for j in range(0, len(branch2_nodes)) :
-            if branch1_nodes[i] == branch2_nodes[j] :
-                mapping[i] = j
+    return BranchOverlap([graph1, graph2]).node_mapping(0, 1)
 
-    return mapping
-
-def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minute_limit):
+def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minute_limit, options=None, warm_start=None, probe=False):
 
     branch1_nodes = graph1.nodes()
     branch2_nodes = graph2.nodes()
@@ -49,29 +52,92 @@ def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minut
     Q_MAX = int(math.ceil(1.5 * cplat / period))
     T = period
 
+    # Rotate the schedule found at another period (warm_start) onto this one.
+    # When it fits, it seeds the solver and bounds Q_MAX and the length.
+    init_schedule = None
+    if warm_start:
+        resources = RingResources(T)
+        add_dag_resources(resources, graph1, branch1_spec)
+        add_dag_resources(resources, graph2, branch2_spec)
+        init_schedule = repair_schedule([graph1, graph2], resources, warm_start, Q_MAX * T)
+        if init_schedule is None:
+            print ("Warm start schedule does not fit in this period")
+        else:
+            print ("Latency for warm start: ", max(init_schedule.values()))
+            Q_MAX = int(math.ceil((1.0 * (max(init_schedule.values()) + 1)) / T))
+
     print("Q_MAX", Q_MAX)
     print("PERIOD", T)    
 
+    if options is None:
+        options = SolverOptions()
+    time_indexed = (options.formulation == 'time_indexed')
+
+    # Each branch has its own resource limits in the model below
+    if options.precheck and \
+       PRECHECK_STATS.record(dag_precheck(graph1, branch1_spec, T, Q_MAX * T) or\
+                             dag_precheck(graph2, branch2_spec, T, Q_MAX * T)):
+        return None
+
+    cache = open_cache(options)
+    if cache:
+        cache_key = solve_key('branches', [graph1, graph2], branch1_spec, T, options, probe = probe)
+        cached = cache.lookup(cache_key)
+        if cached:
+            print ('Cached result: %s (solved in %.2f s)' % (cached.verdict, cached.runtime))
+            return cached.solution
+
+    # qr binaries, optionally restricted to ASAP/ALAP windows
+    # (always for the time-indexed formulation, which has no t1/t2)
+    windows1 = None
+    windows2 = None
+    if options.windowed or time_indexed:
+        windows1 = graph1.time_windows(Q_MAX * T)
+        windows2 = graph2.time_windows(Q_MAX * T)
+    qr_index1 = QrIndex(branch1_nodes, Q_MAX, T, windows1)
+    qr_index2 = QrIndex(branch2_nodes, Q_MAX, T, windows2)
+    print("Branch1", qr_index1.summary())
+    print("Branch2", qr_index2.summary())
+    if qr_index1.empty_nodes or qr_index2.empty_nodes:
+        print ('Infeasible, no start time within Q_MAX periods for ', qr_index1.empty_nodes + qr_index2.empty_nodes)
+        return None
+
     match_nodes1 = graph1.nodes(select='match')
     match_nodes2 = graph2.nodes(select='match')
 
     action_nodes1 = graph1.nodes(select='action')
     action_nodes2 = graph2.nodes(select='action')
 
-    m = Model()
+    match_set1 = set(match_nodes1)
+    match_set2 = set(match_nodes2)
+    action_set1 = set(action_nodes1)
+    action_set2 = set(action_nodes2)
+    # Match units and action fields of every node, from the compact views of the DAGs
+    units1 = graph1.compact().match_units(branch1_spec.match_unit_size)
+    units2 = graph2.compact().match_units(branch2_spec.match_unit_size)
+    fields1 = graph1.compact().fields()
+    fields2 = graph2.compact().fields()
+
+    m = create_model(options.backend)
     m.setParam("LogToConsole", 0)
-
-    t1 = m.addVars(branch1_nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t1")
-    qr1 = m.addVars(list(itertools.product(branch1_nodes, range(Q_MAX), range(T))), \
-                    vtype=GRB.BINARY, name="qr1")
+    if options.threads:
+        m.setParam('Threads', options.threads)
+
+    if not time_indexed:
+        t1 = m.addVars(branch1_nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t1")
+    qr1 = m.addVars(qr_index1.keys, vtype=GRB.BINARY, name="qr1")
+    # With options.matrix_build the regular families of constraints are
+    # added as sparse matrices (see matrix_builder.py)
+    qm1 = QrMatrix(m, qr_index1, qr1) if options.matrix_build else None
     any_match1 = m.addVars(list(itertools.product(range(Q_MAX), range(T))), \
                     vtype=GRB.BINARY, name="any_match1")
     any_action1 = m.addVars(list(itertools.product(range(Q_MAX), range(T))), \
                     vtype=GRB.BINARY, name="any_action1")
 
-    t2 = m.addVars(branch2_nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t2")
-    qr2 = m.addVars(list(itertools.product(branch2_nodes, range(Q_MAX), range(T))), \
-                    vtype=GRB.BINARY, name="qr2")
+    if not time_indexed:
+        t2 = m.addVars(branch2_nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t2")
+    qr2 = m.addVars(qr_index2.keys, vtype=GRB.BINARY, name="qr2")
+    qm2 = QrMatrix(m, qr_index2, qr2) if options.matrix_build else None
 
     any_match2 = m.addVars(list(itertools.product(range(Q_MAX), range(T))), \
                     vtype=GRB.BINARY, name="any_match2")
@@ -79,118 +145,199 @@ def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minut
                     vtype=GRB.BINARY, name="any_action2")
 
 
-    length = m.addVar(lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="length")
-    m.setObjective(length, GRB.MINIMIZE)
-
-    m.addConstrs((t1[v] <= length for v in branch1_nodes), "constr_length_is_max1")
-    m.addConstrs((t2[v] <= length for v in branch2_nodes), "constr_length_is_max2")
+    length_ub = max(init_schedule.values()) if init_schedule else GRB.INFINITY
+    # length bounds start times, so no schedule is shorter than the critical
+    # path of either DAG less the extra cycle critical_path counts for the final operation
+    length = m.addVar(lb=cplat - 1, ub=length_ub, vtype=GRB.INTEGER, name="length")
+    # A probe only asks whether the period is feasible, so it has no
+    # objective and stops at the first schedule found
+    if probe:
+        m.setObjective(0, GRB.MINIMIZE)
+        m.setParam('SolutionLimit', 1)
+    else:
+        m.setObjective(length, GRB.MINIMIZE)
+        # Stop once an incumbent is as short as the critical path
+        m.setParam('BestObjStop', cplat - 1)
+
+    if time_indexed:
+        # Delays are non-negative, so it is enough to bound the sinks
+        m.addConstrs((qr_index1.start_expr(qr1, v) <= length for v in branch1_nodes if graph1.out_degree(v) == 0),\
+                     "constr_length_is_max1")
+        m.addConstrs((qr_index2.start_expr(qr2, v) <= length for v in branch2_nodes if graph2.out_degree(v) == 0),\
+                     "constr_length_is_max2")
+    else:
+        m.addConstrs((t1[v] <= length for v in branch1_nodes), "constr_length_is_max1")
+        m.addConstrs((t2[v] <= length for v in branch2_nodes), "constr_length_is_max2")
 
-    m.addConstrs((sum(qr1[v, q, r] for q in range(Q_MAX) for r in range(T)) == 1 for v in branch1_nodes),\
-                     "constr_unique_quotient_remainder1")
+    if qm1:
+        qm1.unique_qr("constr_unique_quotient_remainder1")
+        qm2.unique_qr("constr_unique_quotient_remainder2")
+    else:
+        m.addConstrs((sum(qr1[v, q, r] for (q, r) in qr_index1.slots[v]) == 1 for v in branch1_nodes),\
+                         "constr_unique_quotient_remainder1")
 
-    m.addConstrs((sum(qr2[v, q, r] for q in range(Q_MAX) for r in range(T)) == 1 for v in branch2_nodes),\
-                     "constr_unique_quotient_remainder2")
-    
-    # t(v) = Sum ( (q*T+r)indicator(q,r,v) ) for all q, for all v
-    m.addConstrs((t1[v] == \
-                      sum(q * qr1[v, q, r] for q in range(Q_MAX) for r in range(T)) * T + \
-                      sum(r * qr1[v, q, r] for q in range(Q_MAX) for r in range(T)) \
-                      for v in branch1_nodes), "constr_division1")
-    
-    m.addConstrs((t2[v] == \
-                      sum(q * qr2[v, q, r] for q in range(Q_MAX) for r in range(T)) * T + \
-                      sum(r * qr2[v, q, r] for q in range(Q_MAX) for r in range(T)) \
-                      for v in branch2_nodes), "constr_division2")
+        m.addConstrs((sum(qr2[v, q, r] for (q, r) in qr_index2.slots[v]) == 1 for v in branch2_nodes),\
+                         "constr_unique_quotient_remainder2")
     
+    if time_indexed:
+        # Respect dependencies in both DAGs, in aggregated time-indexed form
+        for (u,v) in branch1_edges:
+            qr_index1.add_time_indexed_dependency(m, qr1, u, v, graph1.edge[u][v]['delay'], "constr_dag_dependencies1")
+        for (u,v) in branch2_edges:
+            qr_index2.add_time_indexed_dependency(m, qr2, u, v, graph2.edge[u][v]['delay'], "constr_dag_dependencies2")
+    else:
+        # t(v) = Sum ( (q*T+r)indicator(q,r,v) ) for all q, for all v
+        if qm1:
+            qm1.division(t1, "constr_division1")
+            qm2.division(t2, "constr_division2")
+        else:
+            m.addConstrs((t1[v] == \
+                              sum(q * qr1[v, q, r] for (q, r) in qr_index1.slots[v]) * T + \
+                              sum(r * qr1[v, q, r] for (q, r) in qr_index1.slots[v]) \
+                              for v in branch1_nodes), "constr_division1")
+
+            m.addConstrs((t2[v] == \
+                              sum(q * qr2[v, q, r] for (q, r) in qr_index2.slots[v]) * T + \
+                              sum(r * qr2[v, q, r] for (q, r) in qr_index2.slots[v]) \
+                              for v in branch2_nodes), "constr_division2")
+
+        # Respect dependencies in DAG1
+        if qm1:
+            qm1.dependencies(t1, [(u, v, graph1.edge[u][v]['delay']) for (u,v) in branch1_edges], "constr_dag_dependencies1")
+            qm2.dependencies(t2, [(u, v, graph2.edge[u][v]['delay']) for (u,v) in branch2_edges], "constr_dag_dependencies2")
+        else:
+            m.addConstrs((t1[v] - t1[u] >= graph1.edge[u][v]['delay'] for (u,v) in branch1_edges),\
+                             "constr_dag_dependencies1")
+
+            # Respect dependencies in DAG2
+            m.addConstrs((t2[v] - t2[u] >= graph2.edge[u][v]['delay'] for (u,v) in branch2_edges),\
+                             "constr_dag_dependencies2")
 
-    # Respect dependencies in DAG1
-    m.addConstrs((t1[v] - t1[u] >= graph1.edge[u][v]['delay'] for (u,v) in branch1_edges),\
-                     "constr_dag_dependencies1")
-    
-    # Respect dependencies in DAG2
-    m.addConstrs((t2[v] - t2[u] >= graph2.edge[u][v]['delay'] for (u,v) in branch2_edges),\
-                     "constr_dag_dependencies2")
-    
     # Hardware constraints
     # Number of match units does not exceed match_unit_limit
     # for every time step (j) < T, check the total match unit requirements
     # across all nodes (v) that can be "rotated" into this time slot.
-    m.addConstrs((sum(math.ceil((1.0 * graph1.node[v]['key_width']) / branch1_spec.match_unit_size) * qr1[v, q, r]\
-                      for v in match_nodes1 for q in range(Q_MAX))\
-                      <= branch1_spec.match_unit_limit for r in range(T)),\
-                      "constr_match_units1")
-    
-    m.addConstrs((sum(math.ceil((1.0 * graph2.node[v]['key_width']) / branch2_spec.match_unit_size) * qr2[v, q, r]\
-                      for v in match_nodes2 for q in range(Q_MAX))\
-                      <= branch2_spec.match_unit_limit for r in range(T)),\
-                      "constr_match_units2")
+    if qm1:
+        qm1.resource_limit(units1, branch1_spec.match_unit_limit, "constr_match_units1")
+        qm2.resource_limit(units2, branch2_spec.match_unit_limit, "constr_match_units2")
+    else:
+        m.addConstrs((sum(units1[v] * qr1[v, q, r]\
+                          for q in range(Q_MAX) for v in qr_index1.at(q, r, match_set1))\
+                          <= branch1_spec.match_unit_limit for r in range(T)),\
+                          "constr_match_units1")
+
+        m.addConstrs((sum(units2[v] * qr2[v, q, r]\
+                          for q in range(Q_MAX) for v in qr_index2.at(q, r, match_set2))\
+                          <= branch2_spec.match_unit_limit for r in range(T)),\
+                          "constr_match_units2")
     
     # The action field resource constraint (similar comments to above)
-    m.addConstrs((sum(graph1.node[v]['num_fields'] * qr1[v, q, r]\
-                      for v in action_nodes1 for q in range(Q_MAX))\
-                      <= branch1_spec.action_fields_limit for r in range(T)),\
-                      "constr_action_fields1")
-    
-    m.addConstrs((sum(graph2.node[v]['num_fields'] * qr2[v, q, r]\
-                      for v in action_nodes2 for q in range(Q_MAX))\
-                      <= branch2_spec.action_fields_limit for r in range(T)),\
-                      "constr_action_fields2")
+    if qm1:
+        qm1.resource_limit(fields1, branch1_spec.action_fields_limit, "constr_action_fields1")
+        qm2.resource_limit(fields2, branch2_spec.action_fields_limit, "constr_action_fields2")
+    else:
+        m.addConstrs((sum(fields1[v] * qr1[v, q, r]\
+                          for q in range(Q_MAX) for v in qr_index1.at(q, r, action_set1))\
+                          <= branch1_spec.action_fields_limit for r in range(T)),\
+                          "constr_action_fields1")
+
+        m.addConstrs((sum(fields2[v] * qr2[v, q, r]\
+                          for q in range(Q_MAX) for v in qr_index2.at(q, r, action_set2))\
+                          <= branch2_spec.action_fields_limit for r in range(T)),\
+                          "constr_action_fields2")
 
     # First, detect if there is any (at least one) match/action operation from packet q in time slot r
     # if qr[v, q, r] = 1 for any match node, then any_match[q,r] must = 1 (same for actions)
     # Notice that any_match[q, r] may be 1 even if all qr[v, q, r] are zero
-    m.addConstrs((sum(qr1[v, q, r] for v in match_nodes1) <= (len(match_nodes1) * any_match1[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_match1")
-    
-    m.addConstrs((sum(qr2[v, q, r] for v in match_nodes2) <= (len(match_nodes2) * any_match2[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_match2")
-
-    m.addConstrs((sum(qr1[v, q, r] for v in action_nodes1) <= (len(action_nodes1) * any_action1[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_action1")
-
-    m.addConstrs((sum(qr2[v, q, r] for v in action_nodes2) <= (len(action_nodes2) * any_action2[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_action2")
+    # With options.any_op == 'disaggregated', one row per node and (q, r)
+    # instead, see solver_options.ANY_OP_FORMS
+    disaggregated = (options.any_op == 'disaggregated')
+    if qm1:
+        qm1.any_op(match_nodes1, any_match1, "constr_any_match1", disaggregated)
+        qm2.any_op(match_nodes2, any_match2, "constr_any_match2", disaggregated)
+        qm1.any_op(action_nodes1, any_action1, "constr_any_action1", disaggregated)
+        qm2.any_op(action_nodes2, any_action2, "constr_any_action2", disaggregated)
+    elif disaggregated:
+        add_disaggregated_any_op(m, qr1, qr_index1, match_set1, any_match1, "constr_any_match1")
+        add_disaggregated_any_op(m, qr2, qr_index2, match_set2, any_match2, "constr_any_match2")
+        add_disaggregated_any_op(m, qr1, qr_index1, action_set1, any_action1, "constr_any_action1")
+        add_disaggregated_any_op(m, qr2, qr_index2, action_set2, any_action2, "constr_any_action2")
+    else:
+        m.addConstrs((sum(qr1[v, q, r] for v in qr_index1.at(q, r, match_set1)) <= (len(match_nodes1) * any_match1[q, r]) \
+                          for q in range(Q_MAX)\
+                          for r in range(T)),\
+                          "constr_any_match1")
+
+        m.addConstrs((sum(qr2[v, q, r] for v in qr_index2.at(q, r, match_set2)) <= (len(match_nodes2) * any_match2[q, r]) \
+                          for q in range(Q_MAX)\
+                          for r in range(T)),\
+                          "constr_any_match2")
+
+        m.addConstrs((sum(qr1[v, q, r] for v in qr_index1.at(q, r, action_set1)) <= (len(action_nodes1) * any_action1[q, r]) \
+                          for q in range(Q_MAX)\
+                          for r in range(T)),\
+                          "constr_any_action1")
+
+        m.addConstrs((sum(qr2[v, q, r] for v in qr_index2.at(q, r, action_set2)) <= (len(action_nodes2) * any_action2[q, r]) \
+                          for q in range(Q_MAX)\
+                          for r in range(T)),\
+                          "constr_any_action2")
 
     # Second, check that, for any r, the summation over q of any_match[q, r] is under proc_limits
-    m.addConstrs((sum(any_match1[q, r] for q in range(Q_MAX)) <= branch1_spec.match_proc_limit\
-                      for r in range(T)), "constr_match_proc1")
-    m.addConstrs((sum(any_match2[q, r] for q in range(Q_MAX)) <= branch2_spec.match_proc_limit\
-                      for r in range(T)), "constr_match_proc2")
-  
+    if qm1:
+        qm1.proc_limit(any_match1, branch1_spec.match_proc_limit, "constr_match_proc1")
+        qm2.proc_limit(any_match2, branch2_spec.match_proc_limit, "constr_match_proc2")
+        qm1.proc_limit(any_action1, branch1_spec.action_proc_limit, "constr_action_proc")
+        qm2.proc_limit(any_action2, branch2_spec.action_proc_limit, "constr_action_proc")
+    else:
+        m.addConstrs((sum(any_match1[q, r] for q in range(Q_MAX)) <= branch1_spec.match_proc_limit\
+                          for r in range(T)), "constr_match_proc1")
+        m.addConstrs((sum(any_match2[q, r] for q in range(Q_MAX)) <= branch2_spec.match_proc_limit\
+                          for r in range(T)), "constr_match_proc2")
+
 
-    m.addConstrs((sum(any_action1[q, r] for q in range(Q_MAX)) <= branch1_spec.action_proc_limit\
-                      for r in range(T)), "constr_action_proc")
-    m.addConstrs((sum(any_action2[q, r] for q in range(Q_MAX)) <= branch2_spec.action_proc_limit\
-                      for r in range(T)), "constr_action_proc")
+        m.addConstrs((sum(any_action1[q, r] for q in range(Q_MAX)) <= branch1_spec.action_proc_limit\
+                          for r in range(T)), "constr_action_proc")
+        m.addConstrs((sum(any_action2[q, r] for q in range(Q_MAX)) <= branch2_spec.action_proc_limit\
+                          for r in range(T)), "constr_action_proc")
    
     # add constraints for common things
-    m.addConstrs((t1[ branch1_nodes[v] ] == t2[ branch2_nodes[common_nodes_mapping[v]]] for v in common_nodes_mapping), "common-constarint")
+    if time_indexed:
+        for v in mapping:
+            add_time_indexed_tie(m, qr1, qr_index1, branch1_nodes[v], qr2, qr_index2, branch2_nodes[mapping[v]], 0, "common-constarint")
+    else:
+        m.addConstrs((t1[ branch1_nodes[v] ] == t2[ branch2_nodes[mapping[v]]] for v in mapping), "common-constarint")
+
+    if init_schedule:
+        set_mip_start(qr1, qr_index1, None if time_indexed else t1, init_schedule)
+        set_mip_start(qr2, qr_index2, None if time_indexed else t2, init_schedule)
 
     m.setParam('TimeLimit', minute_limit * 60)
-    m.optimize()
+    optimize_with_telemetry(m, open_telemetry(options, 'branches', [graph1, graph2], branch1_spec, T))
     ret = m.Status
     if (ret == GRB.INFEASIBLE):
         print ('Infeasible')
+        if cache:
+            cache.store(cache_key, None, None, None, m.Runtime)
         return None
     elif ((ret == GRB.TIME_LIMIT) or (ret == GRB.INTERRUPTED)):
         if (m.SolCount == 0):
             print ('Hit time limit or interrupted, no solution found yet')
+            SOLVE_TIMEOUTS.record()
             return None
         else:
             print ('Hit time limit or interrupted, suboptimal solution found with gap ', m.MIPGap)
+    elif (ret == GRB.USER_OBJ_LIMIT):
+        print ('Optimal solution found at the critical path bound')
     elif (ret == GRB.OPTIMAL):
         print ('Optimal solution found with gap ', m.MIPGap)
+    elif (ret == GRB.SOLUTION_LIMIT):
+        print ('Feasible solution found')
     else:
         print ('Return code is ', ret)
         assert(False)
+    if not probe:
+        LENGTH_BOUND_STATS.record(m.ObjVal <= cplat - 1)
     
     
     time_of_op = {}
@@ -201,13 +348,19 @@ def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minut
     final_solution = Finalsolution()
   
     for node in branch1_nodes:
-        tv = int(t1[node].x)
+        if time_indexed:
+            tv = qr_index1.start_time(qr1, node)
+        else:
+            tv = int(t1[node].x)
         time_of_op[node] = tv
         ops_at_time[tv].append(node)
     
     for node in branch2_nodes:
         if node not in time_of_op:
-            tv = int(t2[node].x)
+            if time_indexed:
+                tv = qr_index2.start_time(qr2, node)
+            else:
+                tv = int(t2[node].x)
             time_of_op[node] = tv
             ops_at_time[tv].append(node)
 
@@ -270,26 +423,36 @@ def model_ilp(graph1, graph2, mapping, branch1_spec, branch2_spec, period, minut
     
     final_solution.ops_at_time = ops_at_time
     final_solution.ops_on_ring = ops_on_ring
-    final_solution.length = length
+    if probe:
+        # length is only an upper bound on the start times when it is not minimized
+        final_solution.length = max(time_of_op.values()) + 1
+    else:
+        final_solution.length = int(length.x + 1)
     final_solution.time_of_op = time_of_op
 
+    # Time limited results are not proven, another solve could do better
+    if cache and (ret != GRB.TIME_LIMIT) and (ret != GRB.INTERRUPTED):
+        cache.store(cache_key, final_solution, time_of_op, m.MIPGap, m.Runtime)
+
     return final_solution
 
 if __name__ == "__main__":
     # Read specification for each branch
-    if (len(sys.argv) != 7):
-        print ("Usage: ", sys.argv[0], " <DAG file1> <DAG file2>  <HW file> <latency file> <time limit in mins> <binary_up_limit>")
+    argv, options = parse_solver_options(sys.argv)
+    if (len(argv) != 7):
+        print ("Usage: ", argv[0], " <DAG file1> <DAG file2>  <HW file> <latency file> <time limit in mins> <binary_up_limit> [options]")
+        print (options_usage())
         exit(1)
-    elif (len(sys.argv) == 7):
-        BRANCH1_SPEC_FILE  = sys.argv[1]
-        BRANCH2_SPEC_FILE  = sys.argv[2]
-        HW = sys.argv[3]
-        LATENCY = sys.argv[4]
-        minute_limit = int(sys.argv[5])
-        binary_up_limit = int(sys.argv[6])
-
-    branch1_spec = importlib.import_module(BRANCH1_SPEC_FILE, "*")
-    branch2_spec = importlib.import_module(BRANCH2_SPEC_FILE, "*")
+    elif (len(argv) == 7):
+        BRANCH1_SPEC_FILE  = argv[1]
+        BRANCH2_SPEC_FILE  = argv[2]
+        HW = argv[3]
+        LATENCY = argv[4]
+        minute_limit = int(argv[5])
+        binary_up_limit = int(argv[6])
+
+    branch1_spec = load_spec(BRANCH1_SPEC_FILE)
+    branch2_spec = load_spec(BRANCH2_SPEC_FILE)
     hw_spec = importlib.import_module(HW, "*")
     latency_spec = importlib.import_module(LATENCY, "*")
 
@@ -374,30 +537,43 @@ if __name__ == "__main__":
     period_lower_bound = int(math.ceil((1.0) / tpt_upper_bound))
     period_upper_bound = int(math.ceil((1.0) / tpt_lower_bound))
     
-    period = period_upper_bound
-    last_good_solution = None
-    last_good_period   = None
 
     if period_upper_bound > binary_up_limit :
         period_upper_bound = binary_up_limit
   
     print ('Searching between limits ', period_lower_bound, ' and ', period_upper_bound, ' cycles')
-    low = period_lower_bound
-    high = period_upper_bound
-    while (low <= high):
-        assert(low > 0)
-        assert(high > 0)
-        period = int(math.ceil((low + high)/2.0))
+    # Short time limits first, longer ones for the periods they leave undecided
+    budget = TimeBudget(minute_limit * 60, options.initial_time_limit, options.time_limit_factor,\
+                        options.time_budget * 60)
+    def solve_period(period, last_good_solution):
         print ('\nperiod =', period, ' cycles')
         print ('{:*^80}'.format(' Scheduling DRMT '))
-        solution = model_ilp(G1, G2, common_nodes_mapping, branch1_spec, branch2_spec, period, minute_limit)
-
+        # Seed with the schedule of the last feasible period
+        warm_start = last_good_solution.time_of_op if (last_good_solution and options.warm_start) else None
+        return budget.solve(lambda minutes: model_ilp(G1, G2, common_nodes_mapping, branch1_spec, branch2_spec, period,\
+                                                      minutes, options, warm_start, options.probe))
+
+    last_good_period, last_good_solution, probes = search_period(solve_period, period_lower_bound, period_upper_bound,\
+                                                                 options.search)
+    print ('{:*^80}'.format(' Period search (' + options.search + ') '))
+    print (probes_str(probes))
+    print ('\n' + PRECHECK_STATS.summary())
+    print (budget.summary())
+
+    # The probes only checked feasibility, minimize the latency at the best period
+    if (last_good_solution and options.probe):
+        print ('{:*^80}'.format(' Minimizing latency at period %d ' % last_good_period))
+        solution = budget.solve(lambda minutes: model_ilp(G1, G2, common_nodes_mapping, branch1_spec, branch2_spec,\
+                                                         last_good_period, minutes, options,\
+                                                         last_good_solution.time_of_op),\
+                                budget.max_seconds)
         if (solution):
-            last_good_period   = period
             last_good_solution = solution
-            high = period - 1
-        else:
-            low  = period + 1
+    print (LENGTH_BOUND_STATS.summary())
+
+    if (last_good_solution == None):
+        print ("No feasible period found between ", period_lower_bound, " and ", period_upper_bound, " cycles")
+        exit(1)
 
     print ('{:*^80}'.format(' scheduling period on one processor'))
     print (timeline_str(last_good_solution.ops_at_time, white_space=0, timeslots_per_row=4),'\n\n')
@@ -2,15 +2,28 @@ import collections
 import importlib
 import math
 import sys
+import itertools
 from itertools import *
 
 import networkx as nx
-from gurobipy import *
+from solver_backends import GRB, create_model
 
 from printers import *
 from schedule_dag_for_generic_branch import ScheduleDAG
 import pprint as pp
 from solution import Solution
+from qr_index import QrIndex, add_disaggregated_any_op
+from matrix_builder import QrMatrix
+from solver_options import SolverOptions, parse_solver_options, options_usage
+from period_search import search_period, probes_str
+from journal import journaled, open_journal
+from result_cache import open_cache, solve_key
+from prechecks import PRECHECK_STATS, LENGTH_BOUND_STATS, precheck
+from time_budget import SOLVE_TIMEOUTS, TimeBudget
+from telemetry import open_telemetry, optimize_with_telemetry
+from warm_start import RingResources, repair_schedule, set_mip_start
+from branch_family import load_branch_specs
+from branch_overlap import BranchOverlap
 
 BRANCH1_SPEC_FILE = 'ipv4_cdffdcombined'
 BRANCH2_SPEC_FILE = 'ipv6_fdkjfdcombined'
@@ -18,34 +31,13 @@ HW = 'large_hwfd'
 LATENCY = 'drmt_fdlatencies'
 
 def get_total_unique_nodes(graphs_map, branch_count):
-    unique_node_list = [] 
-    for i in range(0, branch_count):
-        graph_nodes = graphs_map[i].nodes()
-        for j in range(0, len(graph_nodes)):
-            if graph_nodes[j] not in unique_node_list:
-                unique_node_list.append(graph_nodes[j])
-
-    return unique_node_list
+    return BranchOverlap([graphs_map[i] for i in range(0, branch_count)]).unique_nodes()
 
 def get_unique_edges_and_delays(graphs_map, branch_count):
-    edges = []
-    edge_delays = {}
-
-    for i in range(0, branch_count):
-        graph_edges = graphs_map[i].edges()
-        for (u,v) in graph_edges:
-            if (u,v) not in edges:
-                edges.append((u,v))
-                edge_delays[(u,v)] = graphs_map[i].edge[u][v]['delay']
-            
-            else:
-                if graphs_map[i].edge[u][v]['delay'] > edge_delays[(u,v)] :
-                    edge_delays[(u,v)] = graphs_map[i].edge[u][v]['delay']
-    
-    return edges, edge_delays
+    return BranchOverlap([graphs_map[i] for i in range(0, branch_count)]).unique_edges()
 
 
-def model_ilp(graphs_map, hw_spec, period, minute_limit):
+def model_ilp(graphs_map, hw_spec, period, minute_limit, options=None, warm_start=None, probe=False):
 
     max_crit_path_len = 0
     branch_count = len(graphs_map)
@@ -62,105 +54,244 @@ def model_ilp(graphs_map, hw_spec, period, minute_limit):
 
     total_edges = graphs_map[branch_count-1].edges()
 
-    m = Model()
+    # Rotate the schedule of the combined DAG found at another period
+    # (warm_start) onto this one, with the same limits as the model below.
+    # When it fits, it seeds the solver and bounds Q_MAX and the length.
+    init_schedule = None
+    if warm_start:
+        union = graphs_map[branch_count-1]
+        cond_nodes = union.nodes(select='condition')
+        resources = RingResources(T)
+        for i in range(0, branch_count-1):
+            resources.add_cumulative(graphs_map[i].compact().match_units(hw_spec.match_unit_size), hw_spec.match_unit_limit)
+            action_fields = union.compact().fields('condition')
+            for (v, num_fields) in graphs_map[i].compact().fields().items():
+                action_fields.setdefault(v, num_fields)
+            resources.add_cumulative(action_fields, hw_spec.action_fields_limit)
+        resources.add_processor_limit(union.nodes(select='match'), hw_spec.match_proc_limit)
+        resources.add_processor_limit(union.nodes(select='action') + cond_nodes, hw_spec.action_proc_limit)
+        init_schedule = repair_schedule([union], resources, warm_start, Q_MAX * T)
+        if init_schedule is None:
+            print ("Warm start schedule does not fit in this period")
+        else:
+            print ("Latency for warm start: ", max(init_schedule.values()))
+            Q_MAX = int(math.ceil((1.0 * (max(init_schedule.values()) + 1)) / T))
+
+    if options is None:
+        options = SolverOptions()
+    time_indexed = (options.formulation == 'time_indexed')
+
+    # Same limits as the model below: match units and action fields per
+    # branch, processors over the combined DAG
+    if options.precheck:
+        union = graphs_map[branch_count-1]
+        cond_nodes = union.nodes(select='condition')
+        cumulative = []
+        for i in range(0, branch_count-1):
+            cumulative.append(('match units of branch %d' % i,\
+                               graphs_map[i].compact().match_units(hw_spec.match_unit_size), hw_spec.match_unit_limit))
+            action_fields = union.compact().fields('condition')
+            for (v, num_fields) in graphs_map[i].compact().fields().items():
+                action_fields.setdefault(v, num_fields)
+            cumulative.append(('action fields of branch %d' % i, action_fields, hw_spec.action_fields_limit))
+        processors = [('matches', union.nodes(select='match'), hw_spec.match_proc_limit),\
+                      ('actions', union.nodes(select='action') + cond_nodes, hw_spec.action_proc_limit)]
+        if PRECHECK_STATS.record(precheck(union, T, Q_MAX * T, cumulative, processors)):
+            return None
+
+    cache = open_cache(options)
+    if cache:
+        cache_key = solve_key('generic_branches', [graphs_map[i] for i in range(0, branch_count)], hw_spec, T, options,\
+                              probe = probe)
+        cached = cache.lookup(cache_key)
+        if cached:
+            print ('Cached result: %s (solved in %.2f s)' % (cached.verdict, cached.runtime))
+            return cached.solution
+
+    # qr binaries, optionally restricted to ASAP/ALAP windows of the
+    # combined DAG (always for the time-indexed formulation, which has no t)
+    windows = None
+    if options.windowed or time_indexed:
+        windows = graphs_map[branch_count-1].time_windows(Q_MAX * T)
+    qr_index = QrIndex(unique_node_list, Q_MAX, T, windows)
+    print (qr_index.summary())
+    if qr_index.empty_nodes:
+        print ('Infeasible, no start time within Q_MAX periods for ', qr_index.empty_nodes)
+        return None
+
+    m = create_model(options.backend)
     m.setParam("LogToConsole", 0)
+    if options.threads:
+        m.setParam('Threads', options.threads)
 
-    t = m.addVars(unique_node_list, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t")
+    if not time_indexed:
+        t = m.addVars(unique_node_list, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t")
 
-    qr  = m.addVars(list(itertools.product(unique_node_list, range(Q_MAX), range(T))), vtype=GRB.BINARY, name="qr")
+    qr  = m.addVars(qr_index.keys, vtype=GRB.BINARY, name="qr")
+    # With options.matrix_build the regular families of constraints are
+    # added as sparse matrices (see matrix_builder.py)
+    qm = QrMatrix(m, qr_index, qr) if options.matrix_build else None
 
     any_match = m.addVars(list(itertools.product(range(Q_MAX), range(T))), vtype=GRB.BINARY, name = "any_match")
     any_action = m.addVars(list(itertools.product(range(Q_MAX), range(T))), vtype=GRB.BINARY, name = "any_action")
 
-    length = m.addVar(lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="length")
-
-    m.setObjective(length, GRB.MINIMIZE)
-
-    m.addConstrs((t[v]  <= length for v in unique_node_list), "constr_length_is_max")
+    length_ub = max(init_schedule.values()) if init_schedule else GRB.INFINITY
+    # length bounds start times, so no schedule is shorter than the critical
+    # path of the combined DAG less the extra cycle critical_path counts for the final operation
+    cpath, union_cplat = graphs_map[branch_count-1].critical_path()
+    length = m.addVar(lb=union_cplat - 1, ub=length_ub, vtype=GRB.INTEGER, name="length")
+
+    # A probe only asks whether the period is feasible, so it has no
+    # objective and stops at the first schedule found
+    if probe:
+        m.setObjective(0, GRB.MINIMIZE)
+        m.setParam('SolutionLimit', 1)
+    else:
+        m.setObjective(length, GRB.MINIMIZE)
+        # Stop once an incumbent is as short as the critical path
+        m.setParam('BestObjStop', union_cplat - 1)
+
+    if time_indexed:
+        # Delays are non-negative, so it is enough to bound the sinks
+        m.addConstrs((qr_index.start_expr(qr, v) <= length for v in unique_node_list\
+                      if graphs_map[branch_count-1].out_degree(v) == 0), "constr_length_is_max")
+    else:
+        m.addConstrs((t[v]  <= length for v in unique_node_list), "constr_length_is_max")
 
-    m.addConstrs((sum(qr[v, q, r] for q in range(Q_MAX) for r in range(T)) == 1 for v in unique_node_list),\
-                     "constr_unique_quotient_remainder")
-    
-    m.addConstrs((t[v] == \
-                      sum(q * qr[v, q, r] for q in range(Q_MAX) for r in range(T)) * T + \
-                      sum(r * qr[v, q, r] for q in range(Q_MAX) for r in range(T)) \
-                      for v in unique_node_list), "constr_division")
+    if qm:
+        qm.unique_qr("constr_unique_quotient_remainder")
+    else:
+        m.addConstrs((sum(qr[v, q, r] for (q, r) in qr_index.slots[v]) == 1 for v in unique_node_list),\
+                         "constr_unique_quotient_remainder")
     
+    if time_indexed:
+        # Respect dependencies in aggregated time-indexed form
+        for (u,v) in total_edges:
+            qr_index.add_time_indexed_dependency(m, qr, u, v, graphs_map[branch_count-1].edge[u][v]['delay'],\
+                                                 "constr_dag_dependencies")
+    else:
+        if qm:
+            qm.division(t, "constr_division")
+            qm.dependencies(t, [(u, v, graphs_map[branch_count-1].edge[u][v]['delay']) for (u,v) in total_edges],\
+                            "constr_dag_dependencies")
+        else:
+            m.addConstrs((t[v] == \
+                              sum(q * qr[v, q, r] for (q, r) in qr_index.slots[v]) * T + \
+                              sum(r * qr[v, q, r] for (q, r) in qr_index.slots[v]) \
+                              for v in unique_node_list), "constr_division")
 
-    
-    m.addConstrs((t[v] - t[u] >= graphs_map[branch_count-1].edge[u][v]['delay'] for (u,v) in total_edges),\
-                     "constr_dag_dependencies")
+            m.addConstrs((t[v] - t[u] >= graphs_map[branch_count-1].edge[u][v]['delay'] for (u,v) in total_edges),\
+                             "constr_dag_dependencies")
     
 
     cond_nodes = graphs_map[branch_count-1].nodes(select='condition')
+    cond_fields = graphs_map[branch_count-1].compact().fields('condition')
 
 
     for i in range(0, branch_count-1):
         match_nodes = graphs_map[i].nodes(select='match')
         action_nodes = graphs_map[i].nodes(select='action')
+        units = graphs_map[i].compact().match_units(hw_spec.match_unit_size)
+        fields = graphs_map[i].compact().fields()
         total_action_nodes_per_branch = []
         total_action_nodes_per_branch_fields = {}
 
         for j in range(0, len(cond_nodes)):
             if cond_nodes[j] not in total_action_nodes_per_branch:
                 total_action_nodes_per_branch.append(cond_nodes[j])
-                total_action_nodes_per_branch_fields[cond_nodes[j]] = graphs_map[branch_count-1].node[cond_nodes[j]]['num_fields']
+                total_action_nodes_per_branch_fields[cond_nodes[j]] = cond_fields[cond_nodes[j]]
 
         for j in range(0, len(action_nodes)):
             if action_nodes[j] not in total_action_nodes_per_branch:
                 total_action_nodes_per_branch.append(action_nodes[j])
-                total_action_nodes_per_branch_fields[action_nodes[j]] = graphs_map[i].node[action_nodes[j]]['num_fields']
+                total_action_nodes_per_branch_fields[action_nodes[j]] = fields[action_nodes[j]]
         
-        m.addConstrs((sum(math.ceil((1.0 * graphs_map[i].node[v]['key_width']) / hw_spec.match_unit_size) * qr[v, q, r]\
-                      for v in match_nodes for q in range(Q_MAX))\
-                      <= hw_spec.match_unit_limit for r in range(T)),\
-                      "constr_match_units_" + str(i))
-    
-        m.addConstrs((sum(total_action_nodes_per_branch_fields[v] * qr[v, q, r]\
-                      for v in total_action_nodes_per_branch for q in range(Q_MAX))\
-                      <= hw_spec.action_fields_limit for r in range(T)),\
-                      "constr_action_fields_" + str(i))
+        match_set = set(match_nodes)
+        action_set = set(total_action_nodes_per_branch)
+        if qm:
+            qm.resource_limit(units, hw_spec.match_unit_limit, "constr_match_units_" + str(i))
+            qm.resource_limit(total_action_nodes_per_branch_fields, hw_spec.action_fields_limit,\
+                              "constr_action_fields_" + str(i))
+        else:
+            m.addConstrs((sum(units[v] * qr[v, q, r]\
+                          for q in range(Q_MAX) for v in qr_index.at(q, r, match_set))\
+                          <= hw_spec.match_unit_limit for r in range(T)),\
+                          "constr_match_units_" + str(i))
+
+            m.addConstrs((sum(total_action_nodes_per_branch_fields[v] * qr[v, q, r]\
+                          for q in range(Q_MAX) for v in qr_index.at(q, r, action_set))\
+                          <= hw_spec.action_fields_limit for r in range(T)),\
+                          "constr_action_fields_" + str(i))
         
     all_branch_match_nodes = graphs_map[branch_count-1].nodes(select='match')
     all_branch_cond_nodes = graphs_map[branch_count-1].nodes(select='condition')
     all_branch_alu_nodes = graphs_map[branch_count-1].nodes(select='action')
 
     all_branch_action_nodes = all_branch_alu_nodes + all_branch_cond_nodes
+    all_branch_match_set = set(all_branch_match_nodes)
+    all_branch_action_set = set(all_branch_action_nodes)
+
+    # With options.any_op == 'disaggregated', one row per node and (q, r)
+    # instead, see solver_options.ANY_OP_FORMS
+    disaggregated = (options.any_op == 'disaggregated')
+    if qm:
+        qm.any_op(all_branch_match_nodes, any_match, "constr_any_match1_", disaggregated)
+        qm.any_op(all_branch_action_nodes, any_action, "constr_any_action1_", disaggregated)
+    elif disaggregated:
+        add_disaggregated_any_op(m, qr, qr_index, all_branch_match_set, any_match, "constr_any_match1_")
+        add_disaggregated_any_op(m, qr, qr_index, all_branch_action_set, any_action, "constr_any_action1_")
+    else:
+        m.addConstrs((sum(qr[v, q, r] for v in qr_index.at(q, r, all_branch_match_set)) <= (len(all_branch_match_nodes) * any_match[q, r]) \
+                          for q in range(Q_MAX)\
+                          for r in range(T)),\
+                          "constr_any_match1_")
+
+        m.addConstrs((sum(qr[v, q, r] for v in qr_index.at(q, r, all_branch_action_set)) <= (len(all_branch_action_nodes) * any_action[q, r]) \
+                          for q in range(Q_MAX)\
+                          for r in range(T)),\
+                          "constr_any_action1_")
+
+    if qm:
+        qm.proc_limit(any_match, hw_spec.match_proc_limit, "constr_match_proc_")
+        qm.proc_limit(any_action, hw_spec.action_proc_limit, "constr_action_proc_")
+    else:
+        m.addConstrs((sum(any_match[q, r] for q in range(Q_MAX)) <= hw_spec.match_proc_limit\
+                          for r in range(T)), "constr_match_proc_")
+        m.addConstrs((sum(any_action[q, r] for q in range(Q_MAX)) <= hw_spec.action_proc_limit\
+                          for r in range(T)), "constr_action_proc_")
 
-    m.addConstrs((sum(qr[v, q, r] for v in all_branch_match_nodes) <= (len(all_branch_match_nodes) * any_match[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_match1_")
-        
-    m.addConstrs((sum(qr[v, q, r] for v in all_branch_action_nodes) <= (len(all_branch_action_nodes) * any_action[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_action1_")
-
-    m.addConstrs((sum(any_match[q, r] for q in range(Q_MAX)) <= hw_spec.match_proc_limit\
-                      for r in range(T)), "constr_match_proc_")
-    m.addConstrs((sum(any_action[q, r] for q in range(Q_MAX)) <= hw_spec.action_proc_limit\
-                      for r in range(T)), "constr_action_proc_")
 
+    if init_schedule:
+        set_mip_start(qr, qr_index, None if time_indexed else t, init_schedule)
 
     m.setParam('TimeLimit', minute_limit * 60)
-    m.optimize()
+    optimize_with_telemetry(m, open_telemetry(options, 'generic_branches',\
+                                                 [graphs_map[i] for i in range(0, branch_count)], hw_spec, T))
     ret = m.Status
 
     if (ret == GRB.INFEASIBLE):
         print ('Infeasible')
+        if cache:
+            cache.store(cache_key, None, None, None, m.Runtime)
         return None
     elif ((ret == GRB.TIME_LIMIT) or (ret == GRB.INTERRUPTED)):
         if (m.SolCount == 0):
             print ('Hit time limit or interrupted, no solution found yet')
+            SOLVE_TIMEOUTS.record()
             return None
         else:
             print ('Hit time limit or interrupted, suboptimal solution found with gap ', m.MIPGap)
+    elif (ret == GRB.USER_OBJ_LIMIT):
+        print ('Optimal solution found at the critical path bound')
     elif (ret == GRB.OPTIMAL):
         print ('Optimal solution found with gap ', m.MIPGap)
+    elif (ret == GRB.SOLUTION_LIMIT):
+        print ('Feasible solution found')
     else:
         print ('Return code is ', ret)
         assert(False)
+    if not probe:
+        LENGTH_BOUND_STATS.record(m.ObjVal <= union_cplat - 1)
 
     time_of_op = {}
     ops_at_time = {}
@@ -173,10 +304,19 @@ def model_ilp(graphs_map, hw_spec, period, minute_limit):
 
         node_list = graphs_map[i].nodes() 
         for v in node_list:
-            tv = int(t[v].x)
+            if time_indexed:
+                tv = qr_index.start_time(qr, v)
+            else:
+                tv = int(t[v].x)
             time_of_op[i][v] = tv
             ops_at_time[i][tv].append(v)
     
+    if probe:
+        # length is only an upper bound on the start times when it is not minimized
+        schedule_length = max(time_of_op[branch_count-1].values()) + 1
+    else:
+        schedule_length = int(length.x + 1)
+
     final_solution_list = {}
     for i in range(0, branch_count):
         final_solution_list[i] = Solution()
@@ -210,29 +350,35 @@ def model_ilp(graphs_map, hw_spec, period, minute_limit):
                 final_solution_list[i].action_proc_set[r].add(k)
                 final_solution_list[i].action_proc_usage[r]  = len(final_solution_list[i].action_proc_set[r])
         
-        final_solution_list[i].length = length
+        final_solution_list[i].length = schedule_length
         final_solution_list[i].ops_at_time = ops_at_time[i]
         final_solution_list[i].time_of_op = time_of_op[i]
         final_solution_list[i].ops_on_ring = ops_on_ring[i]
+        final_solution_list[i].mip_gap = m.MIPGap
+
+    # Time limited results are not proven, another solve could do better
+    if cache and (ret != GRB.TIME_LIMIT) and (ret != GRB.INTERRUPTED):
+        cache.store(cache_key, final_solution_list, time_of_op[branch_count-1], m.MIPGap, m.Runtime)
 
     return final_solution_list
 
 if __name__ == "__main__":
     # Read specification for each branch
-    branch_spec = []
+    argv, options = parse_solver_options(sys.argv)
 
-    if (len(sys.argv) <= 4):
-        print ("Usage: ", sys.argv[0], " <HW file> <latency file> <time limit in mins> <binary_up_limit> <DAG files> ")
+    if (len(argv) <= 4):
+        print ("Usage: ", argv[0], " <HW file> <latency file> <time limit in mins> <binary_up_limit> <DAG files> [options]")
+        print ("The DAG files may be a single branch family file (see branch_family.py)")
+        print (options_usage())
         exit(1)
     else:
 
-        hw_spec = importlib.import_module(sys.argv[1], "*")
-        latency_spec = importlib.import_module(sys.argv[2], "*")
-        minute_limit = int(sys.argv[3])
-        binary_up_limit = int(sys.argv[4])
+        hw_spec = importlib.import_module(argv[1], "*")
+        latency_spec = importlib.import_module(argv[2], "*")
+        minute_limit = int(argv[3])
+        binary_up_limit = int(argv[4])
 
-        for i in range(5,len(sys.argv)):
-           branch_spec.append(importlib.import_module(sys.argv[i], "*"))
+        (_, branch_spec, family) = load_branch_specs(argv[5:])
 
     branch_count = len(branch_spec)
 
@@ -245,12 +391,14 @@ if __name__ == "__main__":
         branch_spec[i].match_proc_limit = hw_spec.match_proc_limit    
 
 
-    # Create graphs for all branches
-    graphs_map = {}
-
-    for i in range(0, branch_count):
-        graphs_map[i] = ScheduleDAG()
-        graphs_map[i].create_dag(branch_spec[i].nodes, branch_spec[i].edges, latency_spec)
+    # Create graphs for all branches, on first use for a branch family
+    if family:
+        graphs_map = family.dags(latency_spec, ScheduleDAG)
+    else:
+        graphs_map = {}
+        for i in range(0, branch_count):
+            graphs_map[i] = ScheduleDAG()
+            graphs_map[i].create_dag(branch_spec[i].nodes, branch_spec[i].edges, latency_spec)
 
 
     match_key_size = {}
@@ -296,9 +444,6 @@ if __name__ == "__main__":
     period_lower_bound = int(math.ceil((1.0) / tpt_upper_bound))
     period_upper_bound = int(math.ceil((1.0) / tpt_lower_bound))
 
-    period = period_upper_bound
-    last_good_solution = None
-    last_good_period   = None
 
     if period_upper_bound > binary_up_limit :
         period_upper_bound = binary_up_limit
@@ -306,24 +451,45 @@ if __name__ == "__main__":
 
     print ('Searching between limits ', period_lower_bound, ' and ', period_upper_bound, ' cycles')
 
-    low = period_lower_bound
-    high = period_upper_bound
-
-    while (low <= high):
-        assert(low > 0)
-        assert(high > 0)
-        period = int(math.ceil((low + high)/2.0))
+    # Short time limits first, longer ones for the periods they leave undecided
+    budget = TimeBudget(minute_limit * 60, options.initial_time_limit, options.time_limit_factor,\
+                        options.time_budget * 60)
+    def solve_period(period, last_good_solution):
         print ('\nperiod =', period, ' cycles')
         print ('{:*^80}'.format(' Scheduling DRMT '))
-
-        soln = model_ilp(graphs_map, hw_spec, period, minute_limit)
-
+        # Seed with the combined schedule of the last feasible period
+        warm_start = None
+        if last_good_solution and options.warm_start:
+            warm_start = last_good_solution[branch_count-1].time_of_op
+        return budget.solve(lambda minutes: model_ilp(graphs_map, hw_spec, period, minutes, options, warm_start,\
+                                                      options.probe))
+
+    # A restarted run replays the probes of its journal
+    journal = open_journal(argv, options, [graphs_map[i] for i in range(0, branch_count)], hw_spec)
+    last_good_period, last_good_solution, probes = search_period(journaled(journal, solve_period, ('period',),\
+                                                                           probe = options.probe),\
+                                                                 period_lower_bound, period_upper_bound, options.search)
+    print ('{:*^80}'.format(' Period search (' + options.search + ') '))
+    print (probes_str(probes))
+    print ('\n' + PRECHECK_STATS.summary())
+
+    # The probes only checked feasibility, minimize the latency at the best period
+    if (last_good_solution and options.probe):
+        print ('{:*^80}'.format(' Minimizing latency at period %d ' % last_good_period))
+        minimize = lambda period: budget.solve(lambda minutes: model_ilp(graphs_map, hw_spec, period, minutes, options,\
+                                                                         last_good_solution[branch_count-1].time_of_op),\
+                                               budget.max_seconds)
+        soln = journaled(journal, minimize, ('period',), probe = False)(last_good_period)
         if (soln):
-            last_good_period = period
             last_good_solution = soln
-            high = period - 1
-        else:
-            low = period + 1
+    print (budget.summary())
+    print (LENGTH_BOUND_STATS.summary())
+    if journal:
+        print (journal.summary())
+
+    if (last_good_solution == None):
+        print ("No feasible period found between ", period_lower_bound, " and ", period_upper_bound, " cycles")
+        exit(1)
 
 
     for i in range(0, branch_count):
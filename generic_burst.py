@@ -1,4 +1,3 @@
-from gurobipy import *
 import numpy as np
 import collections
 import importlib
@@ -7,6 +6,7 @@ from schedule_dag import ScheduleDAG
 from printers import *
 from solution import Solution
 import sys
+from spec_file import load_spec
 
 if __name__ == '__main__':
     if (len(sys.argv) != 6):
@@ -20,7 +20,7 @@ if __name__ == '__main__':
         burst_size = int(sys.argv[5])
     
     # Input specification
-    input_spec = importlib.import_module(input_file, "*")
+    input_spec = load_spec(input_file)
     hw_spec    = importlib.import_module(hw_file, "*")
     latency_spec=importlib.import_module(latency_file, "*")
     input_spec.action_fields_limit = hw_spec.action_fields_limit
@@ -1,9 +1,12 @@
 import math
-from gurobipy import *
 import sys
 import importlib
+import itertools
 from itertools import *
+from solver_backends import GRB, create_model
 from schedule_dag import ScheduleDAG
+from spec_file import load_spec
+from solver_options import SolverOptions, parse_solver_options, options_usage
 
 def create_compund_graph(nodes, edges, burst_size):
     node_dict = {}
@@ -38,7 +41,7 @@ def get_nodes_per_packet(nodes, packet_id):
     return node_list
 
 
-def model_ilp(graph_map, hw_spec, period, minute_limit, burst_size):
+def model_ilp(graph_map, hw_spec, period, minute_limit, burst_size, options=None):
 
     if (period%burst_size != 0) :
         print("skipping if processor is not multiple of burst_size")
@@ -49,8 +52,13 @@ def model_ilp(graph_map, hw_spec, period, minute_limit, burst_size):
     Q_MAX = int(math.ceil(1.5 * burst_size * cplat / period))
     T = period
 
-    m = Model()
+    if options is None:
+        options = SolverOptions()
+
+    m = create_model(options.backend)
     m.setParam("LogToConsole", 0)
+    if options.threads:
+        m.setParam('Threads', options.threads)
 
     node_list = graph_map.nodes()
 
@@ -121,17 +129,19 @@ def model_ilp(graph_map, hw_spec, period, minute_limit, burst_size):
 
 
 if __name__ == "__main__":
+    argv, options = parse_solver_options(sys.argv)
 
-    if (len(sys.argv)) < 7:
-        print ("Usage: ", sys.argv[0], " <DAGfile> <HW file> <latency file> <time limit in mins> <up_limit> <burst_size>")
+    if (len(argv)) < 7:
+        print ("Usage: ", argv[0], " <DAGfile> <HW file> <latency file> <time limit in mins> <up_limit> <burst_size> [options]")
+        print (options_usage())
         exit(1)
     else :
-        input_spec = importlib.import_module(sys.argv[1], "*")
-        hw_spec = importlib.import_module(sys.argv[2], "*")
-        latency_spec = importlib.import_module(sys.argv[3], "*")
-        minute_limit = int(sys.argv[4])
-        seed = int(sys.argv[5])
-        burst_size = int(sys.argv[6])
+        input_spec = load_spec(argv[1])
+        hw_spec = importlib.import_module(argv[2], "*")
+        latency_spec = importlib.import_module(argv[3], "*")
+        minute_limit = int(argv[4])
+        seed = int(argv[5])
+        burst_size = int(argv[6])
 
     input_spec.action_fields_limit = hw_spec.action_fields_limit
     input_spec.match_unit_limit = hw_spec.match_unit_limit
@@ -151,7 +161,7 @@ if __name__ == "__main__":
     last_good_period = None
 
     for period in range(seed+5, seed-5, -1):
-        soln = model_ilp(graph_map, hw_spec, period, minute_limit, burst_size)
+        soln = model_ilp(graph_map, hw_spec, period, minute_limit, burst_size, options)
 
         if (soln):
             last_good_period = period
@@ -2,6 +2,7 @@ import sys
 import importlib
 import json
 import math
+from spec_file import load_spec
 
 def compute_action_utilization(nodes, time_of_op, latency_spec, proc_count, match_dict):
     
@@ -84,7 +85,7 @@ if __name__ == "__main__" :
         print("Usage: ", sys.argv[0], "<DAG_file> <lt_file> <soln_json> <match_json>")
         exit(1)
     else :
-        input_graph = importlib.import_module(sys.argv[1], "*")
+        input_graph = load_spec(sys.argv[1])
         latency_spec = importlib.import_module(sys.argv[2], "*")
         json_file1 = sys.argv[3]
         json_file2 = sys.argv[4]
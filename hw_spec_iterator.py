@@ -1,12 +1,26 @@
-from gurobipy import *
+from solver_backends import GRB, create_model
+import itertools
+import sys
 import numpy as np
 import collections
 import importlib
 import math
+import time
 from schedule_dag import ScheduleDAG
 from printers import *
 from solution import Solution
+from qr_index import QrIndex, add_disaggregated_any_op
+from build_profiler import BuildProfiler
+from matrix_builder import QrMatrix
+from solver_options import SolverOptions, parse_solver_options, options_usage
+from result_cache import open_cache, solve_key
+from prechecks import PRECHECK_STATS, LENGTH_BOUND_STATS, dag_precheck
+from time_budget import SOLVE_TIMEOUTS, UNKNOWN, is_unknown
+from telemetry import open_telemetry, optimize_with_telemetry
 from verifier import verify_schedule
+from warm_start import set_mip_start
+from journal import journaled, open_journal
+from spec_file import load_spec
 
 RND_SIEVE_TIME = 30
 
@@ -14,13 +28,16 @@ PROC_HIGH = 18
 PROC_LOW = 14
 
 class DrmtScheduleSolver:
-    def __init__(self, dag, input_spec, latency_spec, seed_rnd_sieve, period_duration, minute_limit):
+    def __init__(self, dag, input_spec, latency_spec, seed_rnd_sieve, period_duration, minute_limit, options=None):
         self.G = dag
         self.input_spec = input_spec
         self.latency_spec = latency_spec
         self.seed_rnd_sieve = seed_rnd_sieve
         self.period_duration = period_duration
         self.minute_limit    = minute_limit
+        self.options = options if options else SolverOptions()
+        self.m = None           # Model of the last solve, see resolve
+        self.time_of_op = None
 
     def solve(self):
         """ Returns the optimal schedule
@@ -38,23 +55,60 @@ class DrmtScheduleSolver:
         Q_MAX = int(math.ceil(1.5 * cplat / self.period_duration))
 
         print ('{:*^80}'.format(' Running DRMT ILP solver '))
+        if self.options.precheck and \
+           PRECHECK_STATS.record(dag_precheck(self.G, self.input_spec, self.period_duration, Q_MAX * self.period_duration)):
+          return None
+        cache = open_cache(self.options)
+        cache_key = None
+        if cache:
+          cache_key = solve_key('dag', [self.G], self.input_spec, self.period_duration, self.options)
+          cached = cache.lookup(cache_key)
+          if cached:
+            print ('Cached result: %s (solved in %.2f s)' % (cached.verdict, cached.runtime))
+            return cached.solution
         T = self.period_duration
         nodes = self.G.nodes()
         match_nodes = self.G.nodes(select='match')
         action_nodes = self.G.nodes(select='action')
         edges = self.G.edges()
-
-        m = Model()
+        match_set = set(match_nodes)
+        action_set = set(action_nodes)
+        # Match units and action fields of every node, from the compact view of the DAG
+        units = self.G.compact().match_units(self.input_spec.match_unit_size)
+        fields = self.G.compact().fields()
+
+        build_start = time.time()
+        m = create_model(self.options.backend)
         m.setParam("LogToConsole", 0)
+        if self.options.threads:
+          m.setParam('Threads', self.options.threads)
+        profile = BuildProfiler(m, self.options.profile_build)
 
         # Create variables
-        # t is the start time for each DAG node in the first scheduling period
-        t = m.addVars(nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t")
+        # t is the start time for each DAG node in the first scheduling period.
+        # The time-indexed formulation has no t and works on qr alone.
+        time_indexed = (self.options.formulation == 'time_indexed')
+        if not time_indexed:
+          t = m.addVars(nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t")
 
         # The quotients and remainders when dividing by T (see below)
         # qr[v, q, r] is 1 when t[v]
         # leaves a quotient of q and a remainder of r, when divided by T.
-        qr  = m.addVars(list(itertools.product(nodes, range(Q_MAX), range(T))), vtype=GRB.BINARY, name="qr")
+        # With options.windowed, qr[v, q, r] is only created for start times
+        # between the ASAP and ALAP times of v (see ScheduleDAG.time_windows).
+        # The time-indexed formulation always uses the windows.
+        windows = None
+        if self.options.windowed or time_indexed:
+          windows = self.G.time_windows(Q_MAX * T)
+        qr_index = QrIndex(nodes, Q_MAX, T, windows)
+        print (qr_index.summary())
+        if qr_index.empty_nodes:
+          print ('Infeasible, no start time within Q_MAX periods for ', qr_index.empty_nodes)
+          return None
+        qr  = m.addVars(qr_index.keys, vtype=GRB.BINARY, name="qr")
+        # With options.matrix_build the regular families of constraints are
+        # added as sparse matrices (see matrix_builder.py)
+        qm = QrMatrix(m, qr_index, qr) if self.options.matrix_build else None
 
         # Is there any match/action from packet q in time slot r?
         # This is required to enforce limits on the number of packets that
@@ -63,43 +117,81 @@ class DrmtScheduleSolver:
         any_action = m.addVars(list(itertools.product(range(Q_MAX), range(T))), vtype=GRB.BINARY, name = "any_action")
 
         # The length of the schedule
-        length = m.addVar(lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="length")
+        # length bounds start times, so no schedule is shorter than the critical path
+        # less the extra cycle critical_path counts for the final operation
+        length = m.addVar(lb=cplat - 1, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="length")
 
         # Set objective: minimize length of schedule
         m.setObjective(length, GRB.MINIMIZE)
+        # Stop once an incumbent is as short as the critical path
+        m.setParam('BestObjStop', cplat - 1)
+
+        profile.lap('variables')
 
         # Set constraints
 
         # The length is the maximum of all t's
-        m.addConstrs((t[v]  <= length for v in nodes), "constr_length_is_max")
+        if time_indexed:
+          # Delays are non-negative, so it is enough to bound the sinks
+          m.addConstrs((qr_index.start_expr(qr, v) <= length for v in nodes if self.G.out_degree(v) == 0),\
+                       "constr_length_is_max")
+        else:
+          m.addConstrs((t[v]  <= length for v in nodes), "constr_length_is_max")
+        profile.lap('length')
 
         # Given v, qr[v, q, r] is 1 for exactly one q, r, i.e., there's a unique quotient and remainder
-        m.addConstrs((sum(qr[v, q, r] for q in range(Q_MAX) for r in range(T)) == 1 for v in nodes),\
-                     "constr_unique_quotient_remainder")
-
-        # This is just a way to write dividend = quotient * divisor + remainder
-        m.addConstrs((t[v] == \
-                      sum(q * qr[v, q, r] for q in range(Q_MAX) for r in range(T)) * T + \
-                      sum(r * qr[v, q, r] for q in range(Q_MAX) for r in range(T)) \
-                      for v in nodes), "constr_division")
-
-        # Respect dependencies in DAG
-        m.addConstrs((t[v] - t[u] >= self.G.edge[u][v]['delay'] for (u,v) in edges),\
-                     "constr_dag_dependencies")
+        if qm:
+          qm.unique_qr("constr_unique_quotient_remainder")
+        else:
+          m.addConstrs((sum(qr[v, q, r] for (q, r) in qr_index.slots[v]) == 1 for v in nodes),\
+                       "constr_unique_quotient_remainder")
+        profile.lap('unique_qr')
+
+        if time_indexed:
+          # Respect dependencies in DAG, in aggregated time-indexed form
+          for (u,v) in edges:
+            qr_index.add_time_indexed_dependency(m, qr, u, v, self.G.edge[u][v]['delay'], "constr_dag_dependencies")
+          profile.lap('dependencies')
+        else:
+          # This is just a way to write dividend = quotient * divisor + remainder
+          if qm:
+            qm.division(t, "constr_division")
+          else:
+            m.addConstrs((t[v] == \
+                          sum(q * qr[v, q, r] for (q, r) in qr_index.slots[v]) * T + \
+                          sum(r * qr[v, q, r] for (q, r) in qr_index.slots[v]) \
+                          for v in nodes), "constr_division")
+          profile.lap('division')
+
+          # Respect dependencies in DAG
+          if qm:
+            qm.dependencies(t, [(u, v, self.G.edge[u][v]['delay']) for (u,v) in edges], "constr_dag_dependencies")
+          else:
+            m.addConstrs((t[v] - t[u] >= self.G.edge[u][v]['delay'] for (u,v) in edges),\
+                         "constr_dag_dependencies")
+          profile.lap('dependencies')
 
         # Number of match units does not exceed match_unit_limit
         # for every time step (j) < T, check the total match unit requirements
         # across all nodes (v) that can be "rotated" into this time slot.
-        m.addConstrs((sum(math.ceil((1.0 * self.G.node[v]['key_width']) / self.input_spec.match_unit_size) * qr[v, q, r]\
-                      for v in match_nodes for q in range(Q_MAX))\
-                      <= self.input_spec.match_unit_limit for r in range(T)),\
-                      "constr_match_units")
+        if qm:
+          match_units = qm.resource_limit(units, self.input_spec.match_unit_limit, "constr_match_units")
+        else:
+          match_units = m.addConstrs((sum(units[v] * qr[v, q, r]\
+                        for q in range(Q_MAX) for v in qr_index.at(q, r, match_set))\
+                        <= self.input_spec.match_unit_limit for r in range(T)),\
+                        "constr_match_units")
+        profile.lap('match_units')
 
         # The action field resource constraint (similar comments to above)
-        m.addConstrs((sum(self.G.node[v]['num_fields'] * qr[v, q, r]\
-                      for v in action_nodes for q in range(Q_MAX))\
-                      <= self.input_spec.action_fields_limit for r in range(T)),\
-                      "constr_action_fields")
+        if qm:
+          action_fields = qm.resource_limit(fields, self.input_spec.action_fields_limit, "constr_action_fields")
+        else:
+          action_fields = m.addConstrs((sum(fields[v] * qr[v, q, r]\
+                        for q in range(Q_MAX) for v in qr_index.at(q, r, action_set))\
+                        <= self.input_spec.action_fields_limit for r in range(T)),\
+                        "constr_action_fields")
+        profile.lap('action_fields')
 
         # Any time slot (r) can have match or action operations
         # from only match_proc_limit/action_proc_limit packets
@@ -108,50 +200,156 @@ class DrmtScheduleSolver:
         # First, detect if there is any (at least one) match/action operation from packet q in time slot r
         # if qr[v, q, r] = 1 for any match node, then any_match[q,r] must = 1 (same for actions)
         # Notice that any_match[q, r] may be 1 even if all qr[v, q, r] are zero
-        m.addConstrs((sum(qr[v, q, r] for v in match_nodes) <= (len(match_nodes) * any_match[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_match1");
-
-        m.addConstrs((sum(qr[v, q, r] for v in action_nodes) <= (len(action_nodes) * any_action[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_action1");
+        # With options.any_op == 'disaggregated', one row per node and (q, r)
+        # instead, see solver_options.ANY_OP_FORMS
+        disaggregated = (self.options.any_op == 'disaggregated')
+        if qm:
+          qm.any_op(match_nodes, any_match, "constr_any_match1", disaggregated)
+        elif disaggregated:
+          add_disaggregated_any_op(m, qr, qr_index, match_set, any_match, "constr_any_match1")
+        else:
+          m.addConstrs((sum(qr[v, q, r] for v in qr_index.at(q, r, match_set)) <= (len(match_nodes) * any_match[q, r]) \
+                        for q in range(Q_MAX)\
+                        for r in range(T)),\
+                        "constr_any_match1");
+        profile.lap('any_match')
+
+        if qm:
+          qm.any_op(action_nodes, any_action, "constr_any_action1", disaggregated)
+        elif disaggregated:
+          add_disaggregated_any_op(m, qr, qr_index, action_set, any_action, "constr_any_action1")
+        else:
+          m.addConstrs((sum(qr[v, q, r] for v in qr_index.at(q, r, action_set)) <= (len(action_nodes) * any_action[q, r]) \
+                        for q in range(Q_MAX)\
+                        for r in range(T)),\
+                        "constr_any_action1");
+        profile.lap('any_action')
 
         # Second, check that, for any r, the summation over q of any_match[q, r] is under proc_limits
-        m.addConstrs((sum(any_match[q, r] for q in range(Q_MAX)) <= self.input_spec.match_proc_limit\
-                      for r in range(T)), "constr_match_proc")
-        m.addConstrs((sum(any_action[q, r] for q in range(Q_MAX)) <= self.input_spec.action_proc_limit\
-                      for r in range(T)), "constr_action_proc")
-
+        if qm:
+          qm.proc_limit(any_match, self.input_spec.match_proc_limit, "constr_match_proc")
+          qm.proc_limit(any_action, self.input_spec.action_proc_limit, "constr_action_proc")
+        else:
+          m.addConstrs((sum(any_match[q, r] for q in range(Q_MAX)) <= self.input_spec.match_proc_limit\
+                        for r in range(T)), "constr_match_proc")
+          m.addConstrs((sum(any_action[q, r] for q in range(Q_MAX)) <= self.input_spec.action_proc_limit\
+                        for r in range(T)), "constr_action_proc")
+        profile.lap('proc_limits')
+
+
+        self.build_time = time.time() - build_start
+        print ('Model build time = %.2f s' % self.build_time)
+        if profile.enabled:
+          print (profile.table())
+
+        # Kept for resolve, which only changes the hw limits
+        self.m = m
+        self.qr = qr
+        self.t = None if time_indexed else t
+        self.length_var = length
+        self.qr_index = qr_index
+        self.match_units = match_units
+        self.action_fields = action_fields
+        self.Q_MAX = Q_MAX
+        self.cplat = cplat
+        self.match_unit_size = self.input_spec.match_unit_size
+        return self.optimize_model(cache, cache_key)
+
+    def resolve(self):
+        """ Returns the optimal schedule with the current hw limits of input_spec
+
+        Only the right-hand sides of the match unit and action field
+        constraints (or their coefficients, when match_unit_size changed)
+        are updated in the model built by the last call to solve, which
+        is then optimized again from the last schedule found.
+        This is how hw_spec_iterator.py sweeps a hw limit.
+        """
+        if self.m is None:
+          return self.solve()
+        T = self.period_duration
+        print ('{:*^80}'.format(' Running DRMT ILP solver (updated hw limits) '))
+        if self.options.precheck and \
+           PRECHECK_STATS.record(dag_precheck(self.G, self.input_spec, T, self.Q_MAX * T)):
+          return None
+        cache = open_cache(self.options)
+        cache_key = None
+        if cache:
+          cache_key = solve_key('dag', [self.G], self.input_spec, T, self.options)
+          cached = cache.lookup(cache_key)
+          if cached:
+            print ('Cached result: %s (solved in %.2f s)' % (cached.verdict, cached.runtime))
+            return cached.solution
+
+        build_start = time.time()
+        # Slots without candidate nodes have no constraint (None)
+        for r in range(T):
+          if self.match_units[r] is not None:
+            self.match_units[r].RHS   = self.input_spec.match_unit_limit
+          if self.action_fields[r] is not None:
+            self.action_fields[r].RHS = self.input_spec.action_fields_limit
+        if self.match_unit_size != self.input_spec.match_unit_size:
+          match_set = set(self.G.nodes(select='match'))
+          units = self.G.compact().match_units(self.input_spec.match_unit_size)
+          for r in range(T):
+            if self.match_units[r] is None:
+              continue
+            for q in range(self.Q_MAX):
+              for v in self.qr_index.at(q, r, match_set):
+                self.m.chgCoeff(self.match_units[r], self.qr[v, q, r], units[v])
+          self.match_unit_size = self.input_spec.match_unit_size
+        if self.time_of_op:
+          set_mip_start(self.qr, self.qr_index, self.t, self.time_of_op)
+        self.build_time = time.time() - build_start
+        print ('Model update time = %.2f s' % self.build_time)
+        return self.optimize_model(cache, cache_key)
+
+    def optimize_model(self, cache, cache_key):
+        m = self.m
+        qr = self.qr
+        t = self.t
+        length = self.length_var
+        qr_index = self.qr_index
+        time_indexed = (t is None)
 
         # Solve model
         m.setParam('TimeLimit', self.minute_limit * 60)
-        m.optimize()
+        optimize_with_telemetry(m, open_telemetry(self.options, 'dag', [self.G], self.input_spec, self.period_duration))
+        self.solve_time = m.Runtime
+        self.model_size = (m.NumVars, m.NumConstrs, m.NumNZs)
+        print ('Solve time = %.2f s' % self.solve_time)
         ret = m.Status
 
         if (ret == GRB.INFEASIBLE):
           print ('Infeasible')
+          if cache:
+            cache.store(cache_key, None, None, None, self.solve_time)
           return None
         elif ((ret == GRB.TIME_LIMIT) or (ret == GRB.INTERRUPTED)):
           if (m.SolCount == 0):
             print ('Hit time limit or interrupted, no solution found yet')
+            SOLVE_TIMEOUTS.record()
             return None
           else:
             print ('Hit time limit or interrupted, suboptimal solution found with gap ', m.MIPGap)
+        elif (ret == GRB.USER_OBJ_LIMIT):
+          print ('Optimal solution found at the critical path bound')
         elif (ret == GRB.OPTIMAL):
           print ('Optimal solution found with gap ', m.MIPGap)
         else:
           print ('Return code is ', ret)
           assert(False)
+        LENGTH_BOUND_STATS.record(m.ObjVal <= self.cplat - 1)
 
         # Construct and return schedule
         self.time_of_op = {}
         self.ops_at_time = collections.defaultdict(list)
         self.length = int(length.x + 1)
         assert(self.length == length.x + 1)
-        for v in nodes:
-            tv = int(t[v].x)
+        for v in self.G.nodes():
+            if time_indexed:
+              tv = qr_index.start_time(qr, v)
+            else:
+              tv = int(t[v].x)
             self.time_of_op[v] = tv
             self.ops_at_time[tv].append(v)
 
@@ -170,7 +368,11 @@ class DrmtScheduleSolver:
         solution.match_units_usage   = self.match_units_usage
         solution.match_proc_usage    = self.match_proc_usage
         solution.action_proc_usage   = self.action_proc_usage
+        solution.mip_gap = m.MIPGap
         #print (self.time_of_op)
+        # Time limited results are not proven, another solve could do better
+        if cache and (ret != GRB.TIME_LIMIT) and (ret != GRB.INTERRUPTED):
+          cache.store(cache_key, solution, self.time_of_op, m.MIPGap, self.solve_time)
         return solution
 
     def compute_periodic_schedule(self):
@@ -206,22 +408,103 @@ class DrmtScheduleSolver:
                 self.action_proc_set[r].add(k)
                 self.action_proc_usage[r] = len(self.action_proc_set[r])
 
+def set_hw_limit(spec, hw_parameter, hw_limit):
+  """ Sets the hw field of spec swept by hw_parameter (ACTION_FIELD, MATCH_UNIT_LIMIT or MATCH_UNIT_SIZE) """
+  if hw_parameter == "ACTION_FIELD":
+    spec.action_fields_limit = hw_limit
+  if hw_parameter == "MATCH_UNIT_LIMIT":
+    spec.match_unit_limit = hw_limit
+  if hw_parameter == "MATCH_UNIT_SIZE":
+    spec.match_unit_size = hw_limit
+
+def monotone_sweep(periods, hw_limits, solve_point, certify_point):
+  """ Finds the feasible (period, hw limit) points with few solves
+
+  Feasibility is taken to be monotone in both axes: more processors or a
+  larger hw limit never hurt. So the feasible limits of a period are the
+  ones above its lowest feasible limit, which does not decrease as the
+  period decreases. Walking that frontier, each period starts above the
+  largest limit proven infeasible at the periods above (smaller limits
+  are dominated by that point). The first feasible schedule of a period
+  is then checked against the larger limits of the period instead of
+  solving them, and only points that it fails are solved.
+
+  Only proven infeasibility dominates other points. A point that
+  solve_point leaves undecided (time_budget.UNKNOWN, e.g. on a time
+  limit) proves nothing, the points below it are solved again at the
+  next period rather than ruled out.
+
+  Parameters
+  ----------
+  periods, hw_limits : list
+      Axes of the sweep, in any order
+  solve_point : function
+      solve_point(period, hw_limit) returns a solution, None if infeasible,
+      UNKNOWN if undecided
+  certify_point : function
+      certify_point(period, hw_limit, solution) returns True if the
+      schedule of solution is valid at (period, hw_limit)
+
+  Returns
+  -------
+  outcomes : dict
+      (period, hw_limit) -> 'feasible', 'infeasible' or 'unknown' when
+      solved, 'certified' when an existing schedule was valid, 'dominated'
+      when infeasible by monotonicity
+  lowest : dict
+      period -> (lowest feasible hw limit, its solution), for the periods
+      with a feasible limit
+  """
+  outcomes = dict()
+  lowest = dict()
+  ascending = sorted(hw_limits)
+  start = 0  # ascending[:start] are infeasible at the current period
+  for period in sorted(periods, reverse=True):
+    for hw_limit in ascending[:start]:
+      outcomes[period, hw_limit] = 'dominated'
+    solution = None
+    i = start
+    while (i < len(ascending)) and not solution:
+      solution = solve_point(period, ascending[i])
+      outcomes[period, ascending[i]] = sweep_outcome(solution)
+      i += 1
+      if outcomes[period, ascending[i - 1]] == 'infeasible':
+        # Also infeasible with fewer processors
+        start = i
+    if not solution:
+      continue
+    lowest[period] = (ascending[i - 1], solution)
+    for hw_limit in ascending[i:]:
+      if certify_point(period, hw_limit, solution):
+        outcomes[period, hw_limit] = 'certified'
+      else:
+        outcomes[period, hw_limit] = sweep_outcome(solve_point(period, hw_limit))
+  return outcomes, lowest
+
+def sweep_outcome(solution):
+  """ Returns the outcome of a solve_point result, see monotone_sweep """
+  if is_unknown(solution):
+    return 'unknown'
+  return 'feasible' if solution else 'infeasible'
+
 if __name__ == "__main__":
   # Cmd line args
-  if (len(sys.argv) < 5):
-    print ("Usage: ", sys.argv[0], " <DAG file> <HW file> <latency file> <time limit in mins> <option_name> <option_high> <option_low>")
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) < 5):
+    print ("Usage: ", argv[0], " <DAG file> <HW file> <latency file> <time limit in mins> <option_name> <option_high> <option_low> [options]")
+    print (options_usage())
     exit(1)
-  elif (len(sys.argv) >= 5):
-    input_file   = sys.argv[1]
-    hw_file      = sys.argv[2]
-    latency_file = sys.argv[3]
-    minute_limit = int(sys.argv[4])
-    hw_parameter = sys.argv[5]
-    hw_high = int(sys.argv[6])
-    hw_low = int(sys.argv[7])
+  elif (len(argv) >= 5):
+    input_file   = argv[1]
+    hw_file      = argv[2]
+    latency_file = argv[3]
+    minute_limit = int(argv[4])
+    hw_parameter = argv[5]
+    hw_high = int(argv[6])
+    hw_low = int(argv[7])
 
   # Input specification
-  input_spec = importlib.import_module(input_file, "*")
+  input_spec = load_spec(input_file)
   hw_spec    = importlib.import_module(hw_file, "*")
   latency_spec=importlib.import_module(latency_file, "*")
   input_spec.action_fields_limit = hw_spec.action_fields_limit
@@ -239,48 +522,63 @@ if __name__ == "__main__":
   print_problem(G, input_spec)
   print ('\n\n')
 
-  for period in range(PROC_HIGH, PROC_LOW, -1):
-    last_good_solution = None
-    last_good_hw_limit   = None
-
+  # Points of the sweep and their outcomes (see monotone_sweep)
+  periods = list(range(PROC_HIGH, PROC_LOW, -1))
+  hw_limits = list(range(hw_high, hw_low, -1))
+
+  # With options.reuse_model, one model is built per period and only its
+  # hw limits change from point to point (see DrmtScheduleSolver.resolve)
+  solvers = dict()
+  def solve_point(period, hw_limit):
+    set_hw_limit(input_spec, hw_parameter, hw_limit)
+    print ('{:*^80}'.format(' Scheduling DRMT by changing' + hw_parameter  + " to " + str(hw_limit)))
+    timeouts = SOLVE_TIMEOUTS.count
+    if options.reuse_model and (period in solvers):
+      solution = solvers[period].resolve()
+    else:
+      solvers[period] = DrmtScheduleSolver(G, input_spec, latency_spec,\
+                                           seed_rnd_sieve = True, period_duration = period, minute_limit = minute_limit,\
+                                           options = options)
+      solution = solvers[period].solve()
+    if(solution):
+      if certify_point(period, hw_limit, solution):
+        print("Solution is correct")
+        return solution
+      # A wrong schedule proves nothing about the point
+      print('Schedule fails verification with ' + str(period) + ' processors and ' + hw_parameter + " " + str(hw_limit))
+      return UNKNOWN
+    if SOLVE_TIMEOUTS.count != timeouts:
+      print('Undecided with ' + str(period) + ' processors and ' + hw_parameter + " " + str(hw_limit))
+      return UNKNOWN
+    print('Infesible with ' + str(period) + ' processors and ' + hw_parameter + " " + str(hw_limit))
+    return None
+
+  def certify_point(period, hw_limit, solution):
+    set_hw_limit(hw_spec, hw_parameter, hw_limit)
+    return verify_schedule(input_spec.nodes, input_spec.edges, solution.time_of_op,\
+                           hw_spec, latency_spec, period) == True
+
+  # A restarted sweep replays the points of its journal
+  journal = open_journal(argv, options, [G], input_spec)
+  solve_point = journaled(journal, solve_point, ('period', 'hw_limit'))
+
+  if options.monotone:
+    outcomes, lowest = monotone_sweep(periods, hw_limits, solve_point, certify_point)
+  else:
+    outcomes = dict()
+    lowest = dict()
+    for period in periods:
+      for hw_limit in hw_limits:
+        solution = solve_point(period, hw_limit)
+        outcomes[period, hw_limit] = sweep_outcome(solution)
+        if (solution):
+          lowest[period] = (hw_limit, solution)
+
+  for period in periods:
     print ('{:*^80}'.format(' Processors required ' +  str(period)))
-
-    for hw_limit in range(hw_high, hw_low, -1):
-      if hw_parameter == "ACTION_FIELD":
-        input_spec.action_fields_limit = hw_limit
-      if hw_parameter == "MATCH_UNIT_LIMIT":
-        input_spec.match_unit_limit = hw_limit
-      if hw_parameter == "MATCH_UNIT_SIZE":
-        input_spec.match_unit_size = hw_limit
-
-      print ('{:*^80}'.format(' Scheduling DRMT by changing' + hw_parameter  + " to " + str(hw_limit)))
-      solver = DrmtScheduleSolver(G, input_spec, latency_spec,\
-                                seed_rnd_sieve = True, period_duration = period, minute_limit = minute_limit)
-      solution = solver.solve()
-      if(solution):
-        last_good_solution = solution
-        last_good_hw_limit = hw_limit
-
-        if hw_parameter == "ACTION_FIELD":
-          hw_spec.action_fields_limit = hw_limit
-        if hw_parameter == "MATCH_UNIT_LIMIT":
-          hw_spec.match_unit_limit = hw_limit
-        if hw_parameter == "MATCH_UNIT_SIZE":
-          hw_spec.match_unit_size = hw_limit
-      
-        if verify_schedule(input_spec.nodes, input_spec.edges, last_good_solution.time_of_op,\
-                        hw_spec, latency_spec, period) == True :
-          print("Solution is correct")
-        else:
-          last_good_solution = None
-          last_good_hw_limit = None
-      else:
-        print('Infesible with ' + str(period) + ' processors and ' + hw_parameter + " " + str(hw_limit))
-      
-    #if(last_good_solution):
-      
-      
-    if(last_good_solution):
+    if period in lowest:
+      last_good_hw_limit, last_good_solution = lowest[period]
+      set_hw_limit(input_spec, hw_parameter, last_good_hw_limit)
       print('Last possible good solution with '+ hw_parameter + ' ' + str(last_good_hw_limit))
 
       print ('Schedule length (thread count) = %d cycles' % last_good_solution.length)
@@ -295,4 +593,14 @@ if __name__ == "__main__":
       print ('{:*^80}'.format('p[u] is packet from u scheduling periods ago'))
       print (timeline_str(last_good_solution.ops_on_ring, white_space=0, timeslots_per_row=4), '\n\n')
 
-      print_resource_usage(input_spec, last_good_solution)
\ No newline at end of file
+      print_resource_usage(input_spec, last_good_solution)
+
+  print ('{:*^80}'.format(' Sweep of ' + hw_parameter + ' '))
+  for period in periods:
+    print ('  %3d processors: ' % period + ' '.join('%d:%s' % (hw_limit, outcomes[period, hw_limit])\
+                                                    for hw_limit in hw_limits))
+  avoided = len([o for o in outcomes.values() if o in ('dominated', 'certified')])
+  print ('Solves avoided by monotonicity = %d of %d points' % (avoided, len(outcomes)))
+  print (LENGTH_BOUND_STATS.summary())
+  if journal:
+    print (journal.summary())
@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import json
+import os
+import pickle
+import time
+
+from result_cache import canonical, HW_FIELDS
+from time_budget import is_unknown
+
+class Journal:
+  """ Probes of a driver run, appended to a file as they finish
+
+  Each line is a JSON record of one solve: its parameters (e.g. the
+  period), verdict, schedule, MIP gap and the pickled solution. A run
+  that is restarted with the same command replays the recorded solves
+  instead of solving them again. As the searches of the drivers only
+  depend on the verdicts, the replay takes them through the same bounds
+  to the same best solution, and they carry on from the first solve that
+  was not recorded.
+
+  The first line holds a fingerprint of the inputs; a journal of other
+  inputs (e.g. an edited DAG file) is started over.
+
+  Parameters
+  ----------
+  path : str
+  inputs : str
+      Fingerprint of the inputs, see inputs_fingerprint
+  """
+  def __init__(self, path, inputs):
+    self.path = path
+    self.records = dict()  # canonical(params) -> record
+    self.replayed = 0
+    self.recorded = 0
+    lines = []
+    if os.path.exists(path):
+      with open(path) as fp:
+        lines = fp.readlines()
+    header = json.loads(lines[0]) if lines else None
+    if header and (header.get('inputs') == inputs):
+      for line in lines[1:]:
+        try:
+          record = json.loads(line)
+        except ValueError:
+          # Last line of a run killed while writing it
+          continue
+        self.records[canonical(record['params'])] = record
+      print ('Journal %s: %d solves to replay' % (path, len(self.records)))
+    else:
+      if header:
+        print ('Journal %s is of other inputs, starting over' % path)
+      with open(path, 'w') as fp:
+        fp.write(json.dumps({'inputs' : inputs, 'created' : time.time()}) + '\n')
+
+  def lookup(self, params):
+    """ Returns the solution recorded for params, found is False if there is none """
+    record = self.records.get(canonical(params))
+    if record is None:
+      return False, None
+    self.replayed += 1
+    print ('Replayed from journal: %s %s' % (canonical(params), record['verdict']))
+    if record['solution'] is None:
+      return True, None
+    return True, pickle.loads(base64.b64decode(record['solution']))
+
+  def record(self, params, solution, seconds):
+    """ Appends the result of a solve, solution is None if it found none """
+    record = {'params'     : params,\
+              'verdict'    : 'feasible' if solution else 'infeasible',\
+              'length'     : solution_field(solution, 'length'),\
+              'gap'        : solution_field(solution, 'mip_gap'),\
+              'time_of_op' : solution_field(solution, 'time_of_op'),\
+              'seconds'    : seconds,\
+              'solution'   : base64.b64encode(pickle.dumps(solution)).decode('ascii') if solution else None}
+    self.records[canonical(params)] = record
+    self.recorded += 1
+    # Flushed to disk before the next solve, so a crash loses at most that one
+    with open(self.path, 'a') as fp:
+      fp.write(json.dumps(record) + '\n')
+      fp.flush()
+      os.fsync(fp.fileno())
+
+  def summary(self):
+    return 'Journal %s: %d solves replayed, %d recorded' % (self.path, self.replayed, self.recorded)
+
+def solution_field(solution, name):
+  """ Returns a field of a solution, or of the combined schedule of a
+  branch solution (a dict of Solution per branch, the union last) """
+  if isinstance(solution, dict):
+    solution = solution[max(solution)]
+  value = getattr(solution, name, None) if solution else None
+  if isinstance(value, dict):
+    # JSON object keys are strings
+    value = dict((str(k), v) for (k, v) in value.items())
+  return value
+
+def journaled(journal, solve, names, **fixed):
+  """ Returns solve, replaying and recording its calls in journal
+
+  Parameters
+  ----------
+  journal : Journal
+      None to return solve unchanged
+  solve : function
+      Returns a solution, None if it found none
+  names : tuple
+      Names of the leading arguments of solve that identify a solve, e.g.
+      ('period',). Other arguments (e.g. a warm start) are not recorded.
+  fixed :
+      Other parameters of every solve, e.g. probe = True
+  """
+  if journal is None:
+    return solve
+  def solve_journaled(*args):
+    params = dict(zip(names, args))
+    params.update(fixed)
+    found, solution = journal.lookup(params)
+    if found:
+      return solution
+    start = time.time()
+    solution = solve(*args)
+    # Undecided solves are not recorded, a restart tries them again
+    if not is_unknown(solution):
+      journal.record(params, solution, time.time() - start)
+    return solution
+  return solve_journaled
+
+def inputs_fingerprint(graphs, hw_spec):
+  """ Returns a fingerprint of the DAGs and hw limits of a run """
+  return hashlib.sha256(canonical([[(G.nodes(data=True), G.edges(data=True)) for G in graphs],\
+                                   dict((f, getattr(hw_spec, f)) for f in HW_FIELDS)]).encode('utf-8')).hexdigest()
+
+def open_journal(argv, options, graphs, hw_spec):
+  """ Returns the Journal of a driver command, None if journaling is off
+
+  The journal file is named after the command: the script, its
+  positional arguments and its options.
+
+  Parameters
+  ----------
+  argv : list
+      Positional arguments, as returned by parse_solver_options
+  options : SolverOptions
+  graphs : list
+      DAGs of the run
+  hw_spec : module
+      Any module with the result_cache.HW_FIELDS
+  """
+  if not options.journal:
+    return None
+  if not os.path.isdir(options.journal):
+    os.makedirs(options.journal)
+  command = canonical([os.path.basename(argv[0]), argv[1:],\
+                       dict((k, v) for (k, v) in vars(options).items() if k != 'journal')])
+  path = os.path.join(options.journal, hashlib.sha256(command.encode('utf-8')).hexdigest()[:16] + '.jsonl')
+  return Journal(path, inputs_fingerprint(graphs, hw_spec))
@@ -0,0 +1,8 @@
+# Design space around large_hw.py, explored by design_space.py
+# Candidate values of each hw limit and of the processor count
+match_proc_limit    = [1, 2]
+action_proc_limit   = [1, 2]
+match_unit_limit    = [2, 4, 8]
+match_unit_size     = [40, 80]
+action_fields_limit = [8, 16, 32]
+processors          = range(1, 33)
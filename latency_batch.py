@@ -0,0 +1,92 @@
+# The batch engine is optional, it needs numpy
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from compact_dag import DEP_CLASSES
+
+def latency_batch_available():
+  return numpy is not None
+
+class LatencyBatch:
+  """ Longest paths of one DAG under many latency specs at once
+
+  The delay of an edge only depends on its dependency class (dM, dA or
+  dS, see ScheduleDAG.create_dag), so the delays of every edge under B
+  latency specs are a (B, edges) gather of the (B, 3) spec matrix by
+  the class vector of the edges. A single pass over the topological
+  order of the compact view then computes the ASAP time of every node
+  for the whole batch, one numpy max per node, and a backward pass the
+  ALAP times. Nothing is rebuilt per spec.
+
+  Rows are latency specs, in the order given, and columns are the node
+  ids of the compact view (names[i] is the node of column i).
+
+  Parameters
+  ----------
+  G : ScheduleDAG
+  latencies : list
+      (dM, dA, dS) of each latency spec
+  """
+  def __init__(self, G, latencies):
+    if numpy is None:
+      raise ImportError('numpy is not installed, needed by LatencyBatch')
+    self.view = G.compact()
+    self.names = self.view.names
+    self.latencies = numpy.array(latencies, dtype=numpy.int64).reshape(-1, len(DEP_CLASSES))
+    # Delays of every edge under every spec, (B, edges)
+    self.pred_delay = self.latencies[:, numpy.frombuffer(self.view.pred_class, dtype=numpy.int8)]
+    self.succ_delay = self.latencies[:, numpy.frombuffer(self.view.succ_class, dtype=numpy.int8)]
+    self.pred_idx = numpy.frombuffer(self.view.pred_idx, dtype=self.view.pred_idx.typecode)
+    self.succ_idx = numpy.frombuffer(self.view.succ_idx, dtype=self.view.succ_idx.typecode)
+    self.asap = self.forward()
+
+  def __len__(self):
+    return len(self.latencies)
+
+  def forward(self):
+    """ Returns the longest path from any root to each node, (B, nodes) """
+    (ptr, idx, delay) = (self.view.pred_ptr, self.pred_idx, self.pred_delay)
+    asap = numpy.zeros((len(self.latencies), len(self.names)), dtype=numpy.int64)
+    for i in range(len(self.names)):
+      if ptr[i] < ptr[i + 1]:
+        edges = slice(ptr[i], ptr[i + 1])
+        asap[:, i] = (asap[:, idx[edges]] + delay[:, edges]).max(axis=1)
+    return asap
+
+  def latency(self):
+    """ Returns the critical path latency under each spec, as
+    ScheduleDAG.critical_path (one extra cycle for the final operation) """
+    return self.asap.max(axis=1) + 1
+
+  def alap(self, horizon=None):
+    """ Returns horizon - 1 minus the longest path from each node to any
+    sink, (B, nodes), see ScheduleDAG.time_windows
+
+    Parameters
+    ----------
+    horizon : int or array
+        Same horizon for every spec or one per spec, the critical path
+        latency of each spec by default
+    """
+    if horizon is None:
+      horizon = self.latency()
+    (ptr, idx, delay) = (self.view.succ_ptr, self.succ_idx, self.succ_delay)
+    alap = numpy.empty_like(self.asap)
+    alap[:] = numpy.reshape(numpy.asarray(horizon, dtype=numpy.int64) - 1, (-1, 1))
+    for i in reversed(range(len(self.names))):
+      if ptr[i] < ptr[i + 1]:
+        edges = slice(ptr[i], ptr[i + 1])
+        alap[:, i] = numpy.minimum(alap[:, i], (alap[:, idx[edges]] - delay[:, edges]).min(axis=1))
+    return alap
+
+  def slack(self, horizon=None):
+    """ Returns ALAP - ASAP of every node, (B, nodes); with the default
+    horizon the nodes of the critical paths have no slack """
+    return self.alap(horizon) - self.asap
+
+  def critical_path(self, b):
+    """ Returns the longest path under spec b and its latency, the same
+    path as ScheduleDAG.critical_path with that spec """
+    return self.view.critical_path(self.pred_delay[b])
@@ -0,0 +1,61 @@
+import itertools
+import sys
+import time
+
+from schedule_dag import ScheduleDAG
+from latency_batch import LatencyBatch
+from spec_file import load_spec
+
+class LatencySpec:
+  """ Latency spec with the fields of drmt_latencies.py """
+  def __init__(self, dM, dA, dS):
+    self.dM = dM
+    self.dA = dA
+    self.dS = dS
+
+def rebuild_latencies(input_spec, latencies):
+  """ Critical path latency of each spec by rebuilding the DAG with it,
+  as the drivers do for each latency file """
+  result = []
+  for (dM, dA, dS) in latencies:
+    G = ScheduleDAG()
+    G.create_dag(input_spec.nodes, input_spec.edges, LatencySpec(dM, dA, dS))
+    result.append(G.critical_path()[1])
+  return result
+
+if __name__ == "__main__":
+  if (len(sys.argv) != 5):
+    print ("Usage: ", sys.argv[0], " <DAG file> <dM values> <dA values> <dS values>")
+    print ("Critical path latency and slack of the DAG for every (dM, dA, dS), values are comma separated")
+    print ("e.g. ", sys.argv[0], " branch 11,22,44 1,2,4 0")
+    exit(1)
+
+  input_spec = load_spec(sys.argv[1])
+  values     = [[int(x) for x in arg.split(',')] for arg in sys.argv[2:5]]
+  latencies  = list(itertools.product(*values))
+
+  G = ScheduleDAG()
+  G.create_dag(input_spec.nodes, input_spec.edges, LatencySpec(*latencies[0]))
+
+  start = time.time()
+  batch = LatencyBatch(G, latencies)
+  latency = batch.latency()
+  slack = batch.slack()
+  batch_time = time.time() - start
+
+  start = time.time()
+  rebuilt = rebuild_latencies(input_spec, latencies)
+  rebuild_time = time.time() - start
+
+  print ('{:*^80}'.format(' Latency sweep of ' + sys.argv[1] + ' '))
+  print ('%6s %6s %6s %9s %9s %11s %11s' % ('dM', 'dA', 'dS', 'latency', 'critical', 'mean slack', 'max slack'))
+  for (b, (dM, dA, dS)) in enumerate(latencies):
+    print ('%6d %6d %6d %9d %9d %11.1f %11d' %\
+           (dM, dA, dS, latency[b], (slack[b] == 0).sum(), slack[b].mean(), slack[b].max()))
+  print ('critical : nodes without slack, slack is ALAP - ASAP within the critical path latency')
+
+  mismatches = [latencies[b] for b in range(len(latencies)) if latency[b] != rebuilt[b]]
+  if mismatches:
+    print ('Latency differs from create_dag + critical_path for ', mismatches)
+  print ('%d specs: batch %.3f s, create_dag + critical_path per spec %.3f s' %\
+         (len(latencies), batch_time, rebuild_time))
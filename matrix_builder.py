@@ -0,0 +1,147 @@
+# The matrix builder is optional, it needs numpy and scipy
+try:
+  import numpy
+  import scipy.sparse
+except ImportError:
+  numpy = None
+
+from solver_backends import GRB
+
+def matrix_build_available():
+  return numpy is not None
+
+class QrMatrix:
+  """ Builds the regular constraint families of a dRMT model as sparse matrices
+
+  Most families apply the same coefficients over the qr[v, q, r]
+  binaries, one row per v, per r or per (q, r): e.g. the match unit row
+  of slot r sums the match units of v times qr[v, q, r] over every v and
+  q. Writing them as Python sums of qr terms is what dominates the build
+  time of large models. QrMatrix keeps the (v, q, r) of every binary as
+  numpy arrays, computes the rows, columns and coefficients of a whole
+  family at once and adds it with a single addMConstr call (see
+  OrToolsModel.addMConstr for the other backends).
+
+  The methods return the constraints of the family as a list, one per
+  row, with None for the rows left without variables (as addConstr does
+  for constraints that are always satisfied).
+
+  Parameters
+  ----------
+  m : Model
+  qr_index : QrIndex
+  qr : dict
+      The qr[v, q, r] binaries, created for qr_index.keys
+  """
+  def __init__(self, m, qr_index, qr):
+    if numpy is None:
+      raise ImportError('numpy and scipy are not installed, needed by --matrix-build')
+    self.m = m
+    self.T = qr_index.T
+    self.Q_MAX = qr_index.Q_MAX
+    # qr_index.keys are grouped by node, in the order of qr_index.slots
+    self.nodes = list(qr_index.slots)
+    self.position = dict((v, i) for (i, v) in enumerate(self.nodes))
+    self.qr_vars = [qr[key] for key in qr_index.keys]
+    counts = [len(qr_index.slots[v]) for v in self.nodes]
+    slots = numpy.array([s for v in self.nodes for s in qr_index.slots[v]], dtype=numpy.int64).reshape(-1, 2)
+    self.node_of = numpy.repeat(numpy.arange(len(self.nodes)), counts)
+    self.q = slots[:, 0]
+    self.r = slots[:, 1]
+    self.columns = numpy.arange(len(self.qr_vars))
+
+  def add(self, rows, cols, coefs, x, sense, rhs, name):
+    """ Adds sum(coefs * x[cols]) (sense) rhs for each row, summing
+    repeated (row, col) pairs, and returns the constraints by row """
+    rhs = numpy.asarray(rhs, dtype=numpy.float64)
+    A = scipy.sparse.csr_matrix((numpy.asarray(coefs, dtype=numpy.float64), (rows, cols)),\
+                                shape=(len(rhs), len(x)))
+    A.eliminate_zeros()
+    # Rows without variables that hold are left out
+    empty = numpy.diff(A.indptr) == 0
+    if sense == GRB.LESS_EQUAL:
+      holds = 0 <= rhs
+    elif sense == GRB.GREATER_EQUAL:
+      holds = 0 >= rhs
+    else:
+      holds = 0 == rhs
+    kept = numpy.flatnonzero(~(empty & holds))
+    constrs = [None] * len(rhs)
+    if len(kept) == 0:
+      return constrs
+    added = self.m.addMConstr(A[kept], x, sense, rhs[kept], name)
+    if not isinstance(added, list):
+      added = added.tolist()
+    for (i, c) in zip(kept.tolist(), added):
+      constrs[i] = c
+    return constrs
+
+  def weights(self, weight):
+    """ Returns the coefficient of each qr binary, weight[v] for the
+    nodes v in weight and 0 for the others """
+    by_node = numpy.array([weight.get(v, 0) for v in self.nodes], dtype=numpy.float64)
+    return by_node[self.node_of]
+
+  def unique_qr(self, name):
+    """ sum(qr[v, q, r] for every q, r) == 1 for every v """
+    return self.add(self.node_of, self.columns, numpy.ones(len(self.qr_vars)), self.qr_vars,\
+                    GRB.EQUAL, numpy.ones(len(self.nodes)), name)
+
+  def division(self, t, name):
+    """ t[v] == sum((q * T + r) * qr[v, q, r]) for every v """
+    n = len(self.nodes)
+    rows = numpy.concatenate([self.node_of, numpy.arange(n)])
+    cols = numpy.concatenate([self.columns, len(self.qr_vars) + numpy.arange(n)])
+    coefs = numpy.concatenate([-(self.q * self.T + self.r), numpy.ones(n)])
+    return self.add(rows, cols, coefs, self.qr_vars + [t[v] for v in self.nodes],\
+                    GRB.EQUAL, numpy.zeros(n), name)
+
+  def dependencies(self, t, delays, name):
+    """ t[v] - t[u] >= delay for every (u, v, delay) in delays """
+    e = len(delays)
+    rows = numpy.concatenate([numpy.arange(e), numpy.arange(e)])
+    cols = numpy.array([self.position[v] for (u, v, delay) in delays] +\
+                       [self.position[u] for (u, v, delay) in delays], dtype=numpy.int64)
+    coefs = numpy.concatenate([numpy.ones(e), -numpy.ones(e)])
+    return self.add(rows, cols, coefs, [t[v] for v in self.nodes],\
+                    GRB.GREATER_EQUAL, [delay for (u, v, delay) in delays], name)
+
+  def resource_limit(self, weight, limit, name):
+    """ sum(weight[v] * qr[v, q, r] for every v in weight and q) <= limit for every r
+
+    The match unit (weight is the match units of each match) and action
+    field (the fields of each action) constraints.
+    """
+    coefs = self.weights(weight)
+    used = numpy.flatnonzero(coefs)
+    return self.add(self.r[used], used, coefs[used], self.qr_vars,\
+                    GRB.LESS_EQUAL, numpy.full(self.T, limit), name)
+
+  def any_op(self, nodes, any_op, name, disaggregated=False):
+    """ sum(qr[v, q, r] for v in nodes) <= len(nodes) * any_op[q, r] for every q, r
+
+    With disaggregated, qr[v, q, r] <= any_op[q, r] for every v in nodes
+    and any_op[q, r] <= sum(qr[v, q, r] for v in nodes) instead (see
+    qr_index.add_disaggregated_any_op).
+    """
+    slots = self.Q_MAX * self.T
+    used = numpy.flatnonzero(self.weights(dict((v, 1) for v in nodes)))
+    slot_of = self.q[used] * self.T + self.r[used]
+    any_vars = [any_op[q, r] for q in range(self.Q_MAX) for r in range(self.T)]
+    if disaggregated:
+      k = len(used)
+      rows = numpy.concatenate([numpy.arange(k), numpy.arange(k), k + slot_of, k + numpy.arange(slots)])
+      cols = numpy.concatenate([used, len(self.qr_vars) + slot_of, used, len(self.qr_vars) + numpy.arange(slots)])
+      coefs = numpy.concatenate([numpy.ones(k), -numpy.ones(k), -numpy.ones(k), numpy.ones(slots)])
+      return self.add(rows, cols, coefs, self.qr_vars + any_vars, GRB.LESS_EQUAL, numpy.zeros(k + slots), name)
+    rows = numpy.concatenate([slot_of, numpy.arange(slots)])
+    cols = numpy.concatenate([used, len(self.qr_vars) + numpy.arange(slots)])
+    coefs = numpy.concatenate([numpy.ones(len(used)), numpy.full(slots, -len(nodes))])
+    return self.add(rows, cols, coefs, self.qr_vars + any_vars, GRB.LESS_EQUAL, numpy.zeros(slots), name)
+
+  def proc_limit(self, any_op, limit, name):
+    """ sum(any_op[q, r] for every q) <= limit for every r """
+    slots = self.Q_MAX * self.T
+    any_vars = [any_op[q, r] for q in range(self.Q_MAX) for r in range(self.T)]
+    return self.add(numpy.arange(slots) % self.T, numpy.arange(slots), numpy.ones(slots), any_vars,\
+                    GRB.LESS_EQUAL, numpy.full(self.T, limit), name)
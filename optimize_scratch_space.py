@@ -1,24 +1,37 @@
-from gurobipy import *
+from solver_backends import GRB, create_model
+import itertools
+import sys
 import numpy as np
 import collections
 import importlib
 import math
+import time
 from schedule_dag import ScheduleDAG
 from printers import *
 from solution import Solution
+from qr_index import QrIndex, add_disaggregated_any_op
+from build_profiler import BuildProfiler
+from matrix_builder import QrMatrix
+from solver_options import SolverOptions, parse_solver_options, options_usage
+from result_cache import open_cache, solve_key
+from prechecks import PRECHECK_STATS, LENGTH_BOUND_STATS, dag_precheck
+from time_budget import SOLVE_TIMEOUTS
+from telemetry import open_telemetry, optimize_with_telemetry
 import json
+from spec_file import load_spec
 
 RND_SIEVE_TIME = 30
 BIG_M = 500
 
 class DrmtScheduleSolver:
-    def __init__(self, dag, input_spec, latency_spec, seed_rnd_sieve, period_duration, minute_limit, scratch_max):
+    def __init__(self, dag, input_spec, latency_spec, seed_rnd_sieve, period_duration, minute_limit, scratch_max, options=None):
         self.G = dag
         self.input_spec = input_spec
         self.latency_spec = latency_spec
         self.seed_rnd_sieve = seed_rnd_sieve
         self.period_duration = period_duration
         self.minute_limit    = minute_limit
+        self.options = options if options else SolverOptions()
         self.scratch_max = scratch_max
 
     def get_match_action_pairs(self, edges):
@@ -47,21 +60,44 @@ class DrmtScheduleSolver:
         Q_MAX = int(math.ceil(1.5 * cplat / self.period_duration))
 
         print ('{:*^80}'.format(' Running DRMT ILP solver '))
+        if self.options.precheck and \
+           PRECHECK_STATS.record(dag_precheck(self.G, self.input_spec, self.period_duration, Q_MAX * self.period_duration)):
+          return None
+        cache = open_cache(self.options)
+        if cache:
+          cache_key = solve_key('scratch', [self.G], self.input_spec, self.period_duration, self.options,\
+                                scratch_max = self.scratch_max)
+          cached = cache.lookup(cache_key)
+          if cached:
+            print ('Cached result: %s (solved in %.2f s)' % (cached.verdict, cached.runtime))
+            return cached.solution
         T = self.period_duration
         nodes = self.G.nodes()
         match_nodes = self.G.nodes(select='match')
         action_nodes = self.G.nodes(select='action')
         edges = self.G.edges()
+        match_set = set(match_nodes)
+        action_set = set(action_nodes)
+        # Match units and action fields of every node, from the compact view of the DAG
+        units = self.G.compact().match_units(self.input_spec.match_unit_size)
+        fields = self.G.compact().fields()
 
         match_action_pairs = self.get_match_action_pairs(edges)
 
 
-        m = Model()
+        build_start = time.time()
+        m = create_model(self.options.backend)
         m.setParam("LogToConsole", 0)
+        if self.options.threads:
+          m.setParam('Threads', self.options.threads)
+        profile = BuildProfiler(m, self.options.profile_build)
 
         # Create variables
-        # t is the start time for each DAG node in the first scheduling period
-        t = m.addVars(nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t")
+        # t is the start time for each DAG node in the first scheduling period.
+        # The time-indexed formulation has no t and works on qr alone.
+        time_indexed = (self.options.formulation == 'time_indexed')
+        if not time_indexed:
+          t = m.addVars(nodes, lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="t")
 
         # The quotients and remainders when dividing by T (see below)
         # qr[v, q, r] is 1 when t[v]
@@ -69,7 +105,21 @@ class DrmtScheduleSolver:
 
 
 
-        qr  = m.addVars(list(itertools.product(nodes, range(Q_MAX), range(T))), vtype=GRB.BINARY, name="qr")
+        # With options.windowed, qr[v, q, r] is only created for start times
+        # between the ASAP and ALAP times of v (see ScheduleDAG.time_windows).
+        # The time-indexed formulation always uses the windows.
+        windows = None
+        if self.options.windowed or time_indexed:
+          windows = self.G.time_windows(Q_MAX * T)
+        qr_index = QrIndex(nodes, Q_MAX, T, windows)
+        print (qr_index.summary())
+        if qr_index.empty_nodes:
+          print ('Infeasible, no start time within Q_MAX periods for ', qr_index.empty_nodes)
+          return None
+        qr  = m.addVars(qr_index.keys, vtype=GRB.BINARY, name="qr")
+        # With options.matrix_build the regular families of constraints are
+        # added as sparse matrices (see matrix_builder.py)
+        qm = QrMatrix(m, qr_index, qr) if self.options.matrix_build else None
         qra  = m.addVars(list(itertools.product(match_action_pairs, range(Q_MAX), range(T))), vtype=GRB.BINARY, name="qra")
         qrm  = m.addVars(list(itertools.product(match_action_pairs, range(Q_MAX), range(T))), vtype=GRB.BINARY, name="qrm")
         qru  = m.addVars(list(itertools.product(match_action_pairs, range(Q_MAX), range(T))), vtype=GRB.BINARY, name="qru")
@@ -81,30 +131,64 @@ class DrmtScheduleSolver:
         any_action = m.addVars(list(itertools.product(range(Q_MAX), range(T))), vtype=GRB.BINARY, name = "any_action")
 
         # The length of the schedule
-        length = m.addVar(lb=0, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="length")
+        # length bounds start times, so no schedule is shorter than the critical path
+        # less the extra cycle critical_path counts for the final operation
+        length = m.addVar(lb=cplat - 1, ub=GRB.INFINITY, vtype=GRB.INTEGER, name="length")
 
         # Set objective: minimize length of schedule
         m.setObjective(length, GRB.MINIMIZE)
+        # Stop once an incumbent is as short as the critical path
+        m.setParam('BestObjStop', cplat - 1)
+
+        profile.lap('variables')
 
         # Set constraints
 
         # The length is the maximum of all t's
-        m.addConstrs((t[v]  <= length for v in nodes), "constr_length_is_max")
+        if time_indexed:
+          # Delays are non-negative, so it is enough to bound the sinks
+          m.addConstrs((qr_index.start_expr(qr, v) <= length for v in nodes if self.G.out_degree(v) == 0),\
+                       "constr_length_is_max")
+        else:
+          m.addConstrs((t[v]  <= length for v in nodes), "constr_length_is_max")
+        profile.lap('length')
 
         # Given v, qr[v, q, r] is 1 for exactly one q, r, i.e., there's a unique quotient and remainder
-        m.addConstrs((sum(qr[v, q, r] for q in range(Q_MAX) for r in range(T)) == 1 for v in nodes),\
-                     "constr_unique_quotient_remainder")
+        if qm:
+          qm.unique_qr("constr_unique_quotient_remainder")
+        else:
+          m.addConstrs((sum(qr[v, q, r] for (q, r) in qr_index.slots[v]) == 1 for v in nodes),\
+                       "constr_unique_quotient_remainder")
+        profile.lap('unique_qr')
+
+        if time_indexed:
+          # Respect dependencies in DAG, in aggregated time-indexed form
+          for (u,v) in edges:
+            qr_index.add_time_indexed_dependency(m, qr, u, v, self.G.edge[u][v]['delay'], "constr_dag_dependencies")
+          profile.lap('dependencies')
+        else:
+          # This is just a way to write dividend = quotient * divisor + remainder
+          if qm:
+            qm.division(t, "constr_division")
+          else:
+            m.addConstrs((t[v] == \
+                          sum(q * qr[v, q, r] for (q, r) in qr_index.slots[v]) * T + \
+                          sum(r * qr[v, q, r] for (q, r) in qr_index.slots[v]) \
+                          for v in nodes), "constr_division")
+          profile.lap('division')
+
+          if qm:
+            qm.dependencies(t, [(u, v, self.G.edge[u][v]['delay']) for (u,v) in edges], "constr_dag_dependencies")
+          else:
+            m.addConstrs((t[v] - t[u] >= self.G.edge[u][v]['delay'] for (u,v) in edges),\
+                         "constr_dag_dependencies")
+          profile.lap('dependencies')
 
-        # This is just a way to write dividend = quotient * divisor + remainder
-        m.addConstrs((t[v] == \
-                      sum(q * qr[v, q, r] for q in range(Q_MAX) for r in range(T)) * T + \
-                      sum(r * qr[v, q, r] for q in range(Q_MAX) for r in range(T)) \
-                      for v in nodes), "constr_division")
+        # The scratch space constraints below need start times. The
+        # time-indexed formulation has no t, so use expressions over qr.
+        if time_indexed:
+          t = dict((v, qr_index.start_expr(qr, v)) for pair in match_action_pairs for v in pair)
 
-        
-        m.addConstrs((t[v] - t[u] >= self.G.edge[u][v]['delay'] for (u,v) in edges),\
-                     "constr_dag_dependencies")
-        
         # add constraints for monitoring scratch space
         for (u,v) in match_action_pairs:
             for q in range(Q_MAX):
@@ -117,21 +201,30 @@ class DrmtScheduleSolver:
         #m.addConstrs((sum(qru[(u,v) q, r] for (u,v) in match_action_pairs for q in range(Q_MAX)) <= scratch_max for r in range(T)), "constr_scratch")
         m.addConstrs((sum(qru[(u,v), q, r] for (u,v) in match_action_pairs) <= self.scratch_max for q in range(Q_MAX) for r in range(T) ),
                       "scratch_util")
+        profile.lap('scratch')
 
 
         # Number of match units does not exceed match_unit_limit
         # for every time step (j) < T, check the total match unit requirements
         # across all nodes (v) that can be "rotated" into this time slot.
-        m.addConstrs((sum(math.ceil((1.0 * self.G.node[v]['key_width']) / self.input_spec.match_unit_size) * qr[v, q, r]\
-                      for v in match_nodes for q in range(Q_MAX))\
-                      <= self.input_spec.match_unit_limit for r in range(T)),\
-                      "constr_match_units")
+        if qm:
+          qm.resource_limit(units, self.input_spec.match_unit_limit, "constr_match_units")
+        else:
+          m.addConstrs((sum(units[v] * qr[v, q, r]\
+                        for q in range(Q_MAX) for v in qr_index.at(q, r, match_set))\
+                        <= self.input_spec.match_unit_limit for r in range(T)),\
+                        "constr_match_units")
+        profile.lap('match_units')
 
         # The action field resource constraint (similar comments to above)
-        m.addConstrs((sum(self.G.node[v]['num_fields'] * qr[v, q, r]\
-                      for v in action_nodes for q in range(Q_MAX))\
-                      <= self.input_spec.action_fields_limit for r in range(T)),\
-                      "constr_action_fields")
+        if qm:
+          qm.resource_limit(fields, self.input_spec.action_fields_limit, "constr_action_fields")
+        else:
+          m.addConstrs((sum(fields[v] * qr[v, q, r]\
+                        for q in range(Q_MAX) for v in qr_index.at(q, r, action_set))\
+                        <= self.input_spec.action_fields_limit for r in range(T)),\
+                        "constr_action_fields")
+        profile.lap('action_fields')
 
         # Any time slot (r) can have match or action operations
         # from only match_proc_limit/action_proc_limit packets
@@ -140,46 +233,86 @@ class DrmtScheduleSolver:
         # First, detect if there is any (at least one) match/action operation from packet q in time slot r
         # if qr[v, q, r] = 1 for any match node, then any_match[q,r] must = 1 (same for actions)
         # Notice that any_match[q, r] may be 1 even if all qr[v, q, r] are zero
-        m.addConstrs((sum(qr[v, q, r] for v in match_nodes) <= (len(match_nodes) * any_match[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_match1");
-
-        m.addConstrs((sum(qr[v, q, r] for v in action_nodes) <= (len(action_nodes) * any_action[q, r]) \
-                      for q in range(Q_MAX)\
-                      for r in range(T)),\
-                      "constr_any_action1");
+        # With options.any_op == 'disaggregated', one row per node and (q, r)
+        # instead, see solver_options.ANY_OP_FORMS
+        disaggregated = (self.options.any_op == 'disaggregated')
+        if qm:
+          qm.any_op(match_nodes, any_match, "constr_any_match1", disaggregated)
+        elif disaggregated:
+          add_disaggregated_any_op(m, qr, qr_index, match_set, any_match, "constr_any_match1")
+        else:
+          m.addConstrs((sum(qr[v, q, r] for v in qr_index.at(q, r, match_set)) <= (len(match_nodes) * any_match[q, r]) \
+                        for q in range(Q_MAX)\
+                        for r in range(T)),\
+                        "constr_any_match1");
+        profile.lap('any_match')
+
+        if qm:
+          qm.any_op(action_nodes, any_action, "constr_any_action1", disaggregated)
+        elif disaggregated:
+          add_disaggregated_any_op(m, qr, qr_index, action_set, any_action, "constr_any_action1")
+        else:
+          m.addConstrs((sum(qr[v, q, r] for v in qr_index.at(q, r, action_set)) <= (len(action_nodes) * any_action[q, r]) \
+                        for q in range(Q_MAX)\
+                        for r in range(T)),\
+                        "constr_any_action1");
+        profile.lap('any_action')
 
         # Second, check that, for any r, the summation over q of any_match[q, r] is under proc_limits
-        m.addConstrs((sum(any_match[q, r] for q in range(Q_MAX)) <= self.input_spec.match_proc_limit\
-                      for r in range(T)), "constr_match_proc")
-        m.addConstrs((sum(any_action[q, r] for q in range(Q_MAX)) <= self.input_spec.action_proc_limit\
-                      for r in range(T)), "constr_action_proc")
+        if qm:
+          qm.proc_limit(any_match, self.input_spec.match_proc_limit, "constr_match_proc")
+          qm.proc_limit(any_action, self.input_spec.action_proc_limit, "constr_action_proc")
+        else:
+          m.addConstrs((sum(any_match[q, r] for q in range(Q_MAX)) <= self.input_spec.match_proc_limit\
+                        for r in range(T)), "constr_match_proc")
+          m.addConstrs((sum(any_action[q, r] for q in range(Q_MAX)) <= self.input_spec.action_proc_limit\
+                        for r in range(T)), "constr_action_proc")
+        profile.lap('proc_limits')
 
         # Seed initial values
         if init_drmt_schedule:
           for i in nodes:
-            t[i].start = init_drmt_schedule[i]
+            if time_indexed:
+              tv = init_drmt_schedule[i]
+              if (i, tv // T, tv % T) in qr:
+                qr[i, tv // T, tv % T].start = 1
+            else:
+              t[i].start = init_drmt_schedule[i]
+
+        profile.lap('mip_start')
 
         # Solve model
+        self.build_time = time.time() - build_start
+        print ('Model build time = %.2f s' % self.build_time)
+        if profile.enabled:
+          print (profile.table())
         m.setParam('TimeLimit', self.minute_limit * 60)
-        m.optimize()
+        optimize_with_telemetry(m, open_telemetry(self.options, 'scratch', [self.G], self.input_spec, self.period_duration))
+        self.solve_time = m.Runtime
+        self.model_size = (m.NumVars, m.NumConstrs, m.NumNZs)
+        print ('Solve time = %.2f s' % self.solve_time)
         ret = m.Status
 
         if (ret == GRB.INFEASIBLE):
           print ('Infeasible')
+          if cache:
+            cache.store(cache_key, None, None, None, self.solve_time)
           return None
         elif ((ret == GRB.TIME_LIMIT) or (ret == GRB.INTERRUPTED)):
           if (m.SolCount == 0):
             print ('Hit time limit or interrupted, no solution found yet')
+            SOLVE_TIMEOUTS.record()
             return None
           else:
             print ('Hit time limit or interrupted, suboptimal solution found with gap ', m.MIPGap)
+        elif (ret == GRB.USER_OBJ_LIMIT):
+          print ('Optimal solution found at the critical path bound')
         elif (ret == GRB.OPTIMAL):
           print ('Optimal solution found with gap ', m.MIPGap)
         else:
           print ('Return code is ', ret)
           assert(False)
+        LENGTH_BOUND_STATS.record(m.ObjVal <= cplat - 1)
 
         # Construct and return schedule
         self.time_of_op = {}
@@ -187,7 +320,10 @@ class DrmtScheduleSolver:
         self.length = int(length.x + 1)
         assert(self.length == length.x + 1)
         for v in nodes:
-            tv = int(t[v].x)
+            if time_indexed:
+              tv = qr_index.start_time(qr, v)
+            else:
+              tv = int(t[v].x)
             self.time_of_op[v] = tv
             self.ops_at_time[tv].append(v)
 
@@ -205,6 +341,9 @@ class DrmtScheduleSolver:
         solution.match_units_usage   = self.match_units_usage
         solution.match_proc_usage    = self.match_proc_usage
         solution.action_proc_usage   = self.action_proc_usage
+        # Time limited results are not proven, another solve could do better
+        if cache and (ret != GRB.TIME_LIMIT) and (ret != GRB.INTERRUPTED):
+          cache.store(cache_key, solution, self.time_of_op, m.MIPGap, self.solve_time)
         return solution
 
     def compute_periodic_schedule(self):
@@ -242,17 +381,19 @@ class DrmtScheduleSolver:
 
 if __name__ == "__main__":
   # Cmd line args
-  if (len(sys.argv) != 5):
-    print ("Usage: ", sys.argv[0], " <DAG file> <HW file> <latency file> <time limit in mins>")
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) != 5):
+    print ("Usage: ", argv[0], " <DAG file> <HW file> <latency file> <time limit in mins> [options]")
+    print (options_usage())
     exit(1)
-  elif (len(sys.argv) == 5):
-    input_file   = sys.argv[1]
-    hw_file      = sys.argv[2]
-    latency_file = sys.argv[3]
-    minute_limit = int(sys.argv[4])
+  elif (len(argv) == 5):
+    input_file   = argv[1]
+    hw_file      = argv[2]
+    latency_file = argv[3]
+    minute_limit = int(argv[4])
 
   # Input specification
-  input_spec = importlib.import_module(input_file, "*")
+  input_spec = load_spec(input_file)
   hw_spec    = importlib.import_module(hw_file, "*")
   latency_spec=importlib.import_module(latency_file, "*")
   input_spec.action_fields_limit = hw_spec.action_fields_limit
@@ -288,7 +429,7 @@ if __name__ == "__main__":
     print ('\nperiod =', period, ' cycles')
     print ('{:*^80}'.format(' Scheduling DRMT '))
     solver = DrmtScheduleSolver(G, input_spec, latency_spec,\
-                                seed_rnd_sieve = False, period_duration = period, minute_limit = minute_limit, scratch_max=16)
+                                seed_rnd_sieve = False, period_duration = period, minute_limit = minute_limit, scratch_max=16, options = options)
     solution = solver.solve()
     if (solution):
       last_good_period   = period
@@ -301,6 +442,8 @@ if __name__ == "__main__":
     print ("Best throughput so far is below ", tpt_lower_bound, " packets/cycle.")
     exit(1)
 
+  print ('\n' + PRECHECK_STATS.summary())
+  print (LENGTH_BOUND_STATS.summary())
   print ('\nBest achieved throughput = 1 packet every %d cycles' % (last_good_period))
   print ('Schedule length (thread count) = %d cycles' % last_good_solution.length)
   print ('Critical path length = %d cycles' % cplat)
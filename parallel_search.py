@@ -0,0 +1,212 @@
+import importlib
+import math
+import multiprocessing
+import multiprocessing.connection
+import sys
+import time
+
+import schedule_dag
+import schedule_dag_for_generic_branch
+from printers import *
+from solver_options import parse_solver_options, options_usage
+import hw_spec_iterator
+import generic_branch
+from spec_file import load_spec
+
+# Worker processes are forked so that they share the DAGs and spec modules
+# of the parent (modules cannot be pickled)
+FORK = multiprocessing.get_context('fork')
+
+def speculative_periods(low, high, running, count):
+  """ Returns up to count periods to probe next, none of them in running
+
+  The periods are the ceil-midpoints of [low, high], then of its two
+  halves and so on, i.e., the probes of the next bisection levels.
+  """
+  periods = []
+  intervals = [(low, high)]
+  while intervals and (len(periods) < count):
+    (l, h) = intervals.pop(0)
+    if l > h:
+      continue
+    mid = int(math.ceil((l + h)/2.0))
+    if mid not in running:
+      periods.append(mid)
+    intervals.append((l, mid - 1))
+    intervals.append((mid + 1, h))
+  return periods
+
+# Solves of a period whose worker died before they are given up
+PROBE_ATTEMPTS = 2
+
+def run_probe(solve_period, period, conn):
+  conn.send(solve_period(period))
+  conn.close()
+
+def parallel_period_search(solve_period, low, high, workers):
+  """ Searches for the smallest feasible period with concurrent solves
+
+  Like the binary searches of the drivers, this assumes that a period
+  above a feasible one is feasible. Each result narrows [low, high] and
+  solves for periods that fall outside of it are terminated. A period
+  whose worker died proves nothing, it leaves [low, high] as it is and
+  is solved again, up to PROBE_ATTEMPTS times, then left unresolved.
+
+  Parameters
+  ----------
+  solve_period : function
+      Returns a solution for a period, None if none was found
+  low, high : int
+      Limits of the search
+  workers : int
+      Number of concurrent solves
+
+  Returns
+  -------
+  best_period : int
+      None if no period in [low, high] is feasible
+  best_solution : object
+      What solve_period returned for best_period
+  probes : list
+      (period, outcome, seconds) per solve, in completion order, where
+      outcome is 'feasible', 'infeasible', 'cancelled' or 'failed'
+  unresolved : list
+      Periods in the final [low, high] given up after PROBE_ATTEMPTS
+      failed solves; best_period is only the smallest feasible period
+      if there are none below it
+  """
+  best_period   = None
+  best_solution = None
+  probes  = []
+  running = dict()  # period -> (process, connection, start time)
+  failures = dict() # period -> failed solves
+  while True:
+    given_up = set(p for (p, count) in failures.items() if count >= PROBE_ATTEMPTS)
+    for period in speculative_periods(low, high, set(running) | given_up, workers - len(running)):
+      recv_conn, send_conn = FORK.Pipe(duplex=False)
+      process = FORK.Process(target=run_probe, args=(solve_period, period, send_conn))
+      # Buffered output would otherwise be printed again by the child
+      sys.stdout.flush()
+      process.start()
+      send_conn.close()
+      running[period] = (process, recv_conn, time.time())
+      print ('Started period ', period)
+    if not running:
+      break
+
+    ready = multiprocessing.connection.wait([conn for (process, conn, start) in running.values()])
+    for period in [p for p in running if running[p][1] in ready]:
+      process, conn, start = running.pop(period)
+      try:
+        solution = conn.recv()
+        outcome = 'feasible' if solution else 'infeasible'
+      except EOFError:
+        # The worker died without a result, e.g. on an exception
+        solution = None
+        outcome = 'failed'
+      process.join()
+      probes.append((period, outcome, time.time() - start))
+      print ('Period ', period, ' is ', outcome)
+      if (outcome == 'failed'):
+        failures[period] = failures.get(period, 0) + 1
+      elif (solution):
+        if (best_period == None) or (period < best_period):
+          best_period   = period
+          best_solution = solution
+        high = min(high, period - 1)
+      else:
+        low = max(low, period + 1)
+
+    # Cancel the solves made moot by the results
+    for period in [p for p in running if (p < low) or (p > high)]:
+      process, conn, start = running.pop(period)
+      process.terminate()
+      process.join()
+      probes.append((period, 'cancelled', time.time() - start))
+      print ('Cancelled period ', period)
+  unresolved = sorted(p for (p, count) in failures.items() if (count >= PROBE_ATTEMPTS) and (low <= p <= high))
+  return best_period, best_solution, probes, unresolved
+
+def load_specs(dag_files, hw_spec):
+  specs = [load_spec(dag_file) for dag_file in dag_files]
+  for spec in specs:
+    spec.action_fields_limit = hw_spec.action_fields_limit
+    spec.match_unit_limit    = hw_spec.match_unit_limit
+    spec.match_unit_size     = hw_spec.match_unit_size
+    spec.action_proc_limit   = hw_spec.action_proc_limit
+    spec.match_proc_limit    = hw_spec.match_proc_limit
+  return specs
+
+if __name__ == "__main__":
+  argv, options = parse_solver_options(sys.argv)
+  if (len(argv) < 8) or (argv[2] not in ('dag', 'branches')):
+    print ("Usage: ", argv[0], " <workers> dag <HW file> <latency file> <time limit in mins> <binary_up_limit> <DAG file> [options]")
+    print ("       ", argv[0], " <workers> branches <HW file> <latency file> <time limit in mins> <binary_up_limit> <DAG files> [options]")
+    print ("dag solves one DAG with DrmtScheduleSolver, branches solves generic_branch.model_ilp")
+    print ("(the last DAG file is the combined DAG of the branches)")
+    print (options_usage())
+    exit(1)
+  workers      = int(argv[1])
+  mode         = argv[2]
+  hw_spec      = importlib.import_module(argv[3], "*")
+  latency_spec = importlib.import_module(argv[4], "*")
+  minute_limit = int(argv[5])
+  binary_up_limit = int(argv[6])
+  dag_files    = argv[7:]
+
+  # Share the cores among the workers unless --threads is given
+  if not options.threads:
+    options.threads = max(1, multiprocessing.cpu_count() // workers)
+  print ('Running ', workers, ' solves at a time with ', options.threads, ' solver threads each')
+
+  specs = load_specs(dag_files, hw_spec)
+  tpt_upper_bound = 0
+  if mode == 'dag':
+    input_spec = specs[0]
+    G = schedule_dag.ScheduleDAG()
+    G.create_dag(input_spec.nodes, input_spec.edges, latency_spec)
+    print ('{:*^80}'.format(' Input DAG '))
+    tpt_upper_bound = print_problem(G, input_spec)
+    def solve_period(period):
+      return hw_spec_iterator.DrmtScheduleSolver(G, input_spec, latency_spec, seed_rnd_sieve = False,\
+                                                 period_duration = period, minute_limit = minute_limit,\
+                                                 options = options).solve()
+  else:
+    graphs_map = {}
+    for i in range(0, len(specs)):
+      graphs_map[i] = schedule_dag_for_generic_branch.ScheduleDAG()
+      graphs_map[i].create_dag(specs[i].nodes, specs[i].edges, latency_spec)
+    for i in range(0, len(specs)-1):
+      print ('{:*^80}'.format(' Input DAG-' + str(i)))
+      tpt_upper_bound = max(tpt_upper_bound, print_problem(graphs_map[i], hw_spec))
+    def solve_period(period):
+      return generic_branch.model_ilp(graphs_map, hw_spec, period, minute_limit, options)
+  print ('\n\n')
+
+  # Same limits as the sequential searches
+  period_lower_bound = int(math.ceil((1.0) / tpt_upper_bound))
+  period_upper_bound = min(100, binary_up_limit)
+  print ('Searching between limits ', period_lower_bound, ' and ', period_upper_bound, ' cycles')
+  start = time.time()
+  best_period, best_solution, probes, unresolved = parallel_period_search(solve_period, period_lower_bound,\
+                                                              period_upper_bound, workers)
+
+  print ('\n\n')
+  print ('{:*^80}'.format(' Parallel period search '))
+  for (period, outcome, seconds) in probes:
+    print ('  period %3d %-10s %8.2f s' % (period, outcome, seconds))
+  print ('Total time = %.2f s' % (time.time() - start))
+  if unresolved:
+    print ('Solves failed at periods ', unresolved, ', a smaller period than the best found may be feasible')
+  if (best_period == None):
+    print ('No feasible period between ', period_lower_bound, ' and ', period_upper_bound)
+    exit(1)
+  print ('\nBest achieved throughput = 1 packet every %d cycles' % best_period)
+  if mode == 'dag':
+    print ('Schedule length (thread count) = %d cycles' % best_solution.length)
+    print ('{:*^80}'.format(' First scheduling period on one processor'))
+    print (timeline_str(best_solution.ops_at_time, white_space=0, timeslots_per_row=4),'\n\n')
+  else:
+    print ('Schedule length (thread count) = %d cycles' % best_solution[len(specs)-1].length)
+    print ('{:*^80}'.format(' First scheduling period on one processor'))
+    print (timeline_str(best_solution[len(specs)-1].ops_at_time, white_space=0, timeslots_per_row=4),'\n\n')
@@ -0,0 +1,108 @@
+import math
+import time
+
+from time_budget import is_unknown
+
+# Orders in which the drivers probe periods
+#   galloping : low, low + 1, low + 3, low + 7, ... until a feasible period,
+#               then bisection below it
+#   bisection : bisection of [low, high]
+SEARCHES = ('galloping', 'bisection')
+
+class PeriodSearch:
+  """ Smallest feasible period found so far, and the solves made to find it
+
+  Like the drivers, this assumes that a period above a feasible one is
+  feasible. A period that solve_period leaves undecided
+  (time_budget.UNKNOWN) is passed over like an infeasible one, so the best
+  period is always a proven feasible one, but it is reported as unknown.
+
+  Parameters
+  ----------
+  solve_period : function
+      solve_period(period, best_solution) returns a solution for period,
+      None if none was found. best_solution is the solution of the
+      smallest feasible period so far (None at first), e.g. to warm start.
+  """
+  def __init__(self, solve_period):
+    self.solve_period  = solve_period
+    self.best_period   = None
+    self.best_solution = None
+    self.probes = []  # (period, feasible, seconds) per solve, in search order, feasible is None if unknown
+
+  def probe(self, period):
+    """ Solves period, returns True if it is feasible """
+    start = time.time()
+    solution = self.solve_period(period, self.best_solution)
+    feasible = None if is_unknown(solution) else (solution != None)
+    self.probes.append((period, feasible, time.time() - start))
+    if (solution):
+      if (self.best_period == None) or (period < self.best_period):
+        self.best_period   = period
+        self.best_solution = solution
+      return True
+    return False
+
+  def bisect(self, low, high):
+    while (low <= high):
+      assert(low > 0)
+      period = int(math.ceil((low + high)/2.0))
+      if self.probe(period):
+        high = period - 1
+      else:
+        low  = period + 1
+
+  def gallop(self, low, high):
+    # Step up from low with doubling steps. A period's qr count grows with
+    # it, so the small (and likely optimal) periods are tried first.
+    step = 1
+    period = low
+    while (period <= high):
+      if self.probe(period):
+        # Periods in [low, period) are left
+        self.bisect(low, period - 1)
+        return
+      low = period + 1
+      if (period == high):
+        return
+      period = min(high, period + step)
+      step *= 2
+
+def search_period(solve_period, low, high, search='galloping'):
+  """ Searches for the smallest feasible period in [low, high]
+
+  Parameters
+  ----------
+  solve_period : function
+      See PeriodSearch
+  low, high : int
+      Limits of the search
+  search : str
+      One of SEARCHES
+
+  Returns
+  -------
+  best_period : int
+      None if no period in [low, high] is feasible
+  best_solution : object
+      What solve_period returned for best_period
+  probes : list
+      (period, feasible, seconds) per solve, in search order, feasible is
+      None if the solve was undecided
+  """
+  state = PeriodSearch(solve_period)
+  if search == 'galloping':
+    state.gallop(low, high)
+  elif search == 'bisection':
+    state.bisect(low, high)
+  else:
+    raise ValueError('Unknown search ' + search)
+  return state.best_period, state.best_solution, state.probes
+
+def probes_str(probes):
+  """ Returns a printable table of the probes of search_period """
+  verdicts = {True : 'feasible', False : 'infeasible', None : 'unknown'}
+  rows = ['  period %3d %-10s %8.2f s' % (period, verdicts[feasible], seconds)\
+          for (period, feasible, seconds) in probes]
+  rows.append('  %d solves, total %.2f s' % (len(probes), sum(seconds for (period, feasible, seconds) in probes)))
+  return '\n'.join(rows)
@@ -0,0 +1,159 @@
+import math
+
+import networkx as nx
+
+def min_bins(sizes, capacity):
+  """ Lower bound on the number of slots needed to hold items of the given sizes
+
+  This is the L2 bound of Martello and Toth for bin packing: items larger
+  than capacity - alpha each need their own slot, items larger than half a
+  slot cannot share one, and the items in [alpha, capacity / 2] have to
+  fit in what the larger items leave free.
+  """
+  sizes = [s for s in sizes if s > 0]
+  if not sizes:
+    return 0
+  best = int(math.ceil((1.0 * sum(sizes)) / capacity))
+  half = capacity / 2.0
+  for alpha in set([0] + [s for s in sizes if s <= half]):
+    large  = [s for s in sizes if s > capacity - alpha]
+    medium = [s for s in sizes if half < s <= capacity - alpha]
+    small  = [s for s in sizes if alpha <= s <= half]
+    free   = len(medium) * capacity - sum(medium)
+    bound  = len(large) + len(medium) + max(0, int(math.ceil((1.0 * (sum(small) - free)) / capacity)))
+    best   = max(best, bound)
+  return best
+
+def min_distinct_times(G, nodes):
+  """ Lower bound on the number of distinct start times of nodes in any schedule of G
+
+  Two nodes on a path of G start at different times when the delays
+  between them add up to more than zero. This returns the largest number
+  of nodes on one path such that every two of them are separated that way.
+  """
+  select = set(nodes)
+  free    = dict()  # most nodes counted on a path to v, where v could still be counted
+  blocked = dict()  # same, but the last counted node is at distance 0 from v
+  for v in nx.topological_sort(G):
+    free_in    = 0
+    blocked_in = None
+    for (u, _) in G.in_edges(v):
+      if G.edge[u][v]['delay'] > 0:
+        free_in = max([free_in, free[u]] + ([blocked[u]] if blocked[u] is not None else []))
+      else:
+        free_in = max(free_in, free[u])
+        if blocked[u] is not None:
+          blocked_in = max(blocked_in, blocked[u]) if blocked_in is not None else blocked[u]
+    free[v] = free_in
+    blocked[v] = blocked_in
+    if v in select:
+      blocked[v] = max(blocked_in, free_in + 1) if blocked_in is not None else free_in + 1
+  return max([0] + list(free.values()) + [b for b in blocked.values() if b is not None])
+
+def precheck(G, period, horizon, cumulative, processors):
+  """ Tries to prove that G cannot be scheduled with the given period
+
+  The checks are necessary conditions of the dRMT ILPs, so a period they
+  reject is infeasible, but a period they accept may still be infeasible.
+
+    * every node has a start time below horizon (Q_MAX * T) after its
+      predecessors' delays
+    * the demands of each cumulative limit fit in the T slots of the
+      ring (see min_bins)
+    * nodes of each processor limit that must start at distinct times
+      (see min_distinct_times) fit in the T slots, at most limit
+      packets per slot
+
+  Parameters
+  ----------
+  G : ScheduleDAG
+  period : int
+      Period duration T
+  horizon : int
+      Start times must be below horizon
+  cumulative : list
+      (name, demand of each node, limit per slot), as in RingResources
+  processors : list
+      (name, nodes, packets per slot), as in RingResources
+
+  Returns
+  -------
+  reason : str
+      Why the period is infeasible, None if no check could tell
+  """
+  asap, alap = G.time_windows(horizon)
+  if [v for v in G.nodes() if asap[v] > alap[v]]:
+    return 'critical path does not fit in %d cycles (Q_MAX * T)' % horizon
+
+  for (name, demand, limit) in cumulative:
+    if max(list(demand.values()) + [0]) > limit:
+      return 'a node needs more %s than the limit of %d' % (name, limit)
+    slots = min_bins(list(demand.values()), limit)
+    if slots > period:
+      return '%s need at least %d of %d slots' % (name, slots, period)
+
+  for (name, nodes, limit) in processors:
+    times = min_distinct_times(G, nodes)
+    if times > limit * period:
+      return '%d %s start at distinct times, more than %d per slot * %d slots' % (times, name, limit, period)
+  return None
+
+def dag_precheck(G, input_spec, period, horizon):
+  """ precheck with the limits of the single DAG ILP (see warm_start.add_dag_resources) """
+  match_nodes  = G.nodes(select='match')
+  action_nodes = G.nodes(select='action')
+  return precheck(G, period, horizon,\
+                  [('match units', G.compact().match_units(input_spec.match_unit_size), input_spec.match_unit_limit),\
+                   ('action fields', G.compact().fields(), input_spec.action_fields_limit)],\
+                  [('matches', match_nodes, input_spec.match_proc_limit),\
+                   ('actions', action_nodes, input_spec.action_proc_limit)])
+
+class PrecheckStats:
+  """ Counts the solver calls made unnecessary by precheck """
+  def __init__(self):
+    self.checks = 0
+    self.ilp_calls_saved = 0
+
+  def record(self, reason):
+    """ Records the outcome of the pre-checks of one solver call, returns reason """
+    self.checks += 1
+    if reason:
+      self.ilp_calls_saved += 1
+      print ('Infeasible by pre-check: ', reason)
+    return reason
+
+  def summary(self):
+    return 'Pre-checks proved %d of %d periods infeasible without a solver call' %\
+           (self.ilp_calls_saved, self.checks)
+
+# Shared by all solvers of a process
+PRECHECK_STATS = PrecheckStats()
+
+class LengthBoundStats:
+  """ Counts the length minimizations cut short by the critical path bound
+
+  No schedule starts its last node before the latency of the critical
+  path less one (ScheduleDAG.critical_path counts an extra cycle for the
+  final operation), so the solvers give that to the length variable,
+  which bounds the start times, as a lower bound
+  and stop (GRB.USER_OBJ_LIMIT, through the BestObjStop parameter) once
+  an incumbent reaches it, instead of branching to close the gap. A
+  minimization that ends at the bound was cut short by it, whether the
+  solver reports the stop or optimality.
+  """
+  def __init__(self):
+    self.solves = 0
+    self.stopped = 0
+
+  def record(self, stopped):
+    """ Records whether a length minimization ended at the bound """
+    self.solves += 1
+    if stopped:
+      self.stopped += 1
+      print ('Stopped at the critical path bound')
+
+  def summary(self):
+    return 'The critical path bound stopped %d of %d length minimizations early' % (self.stopped, self.solves)
+
+# Shared by all solvers of a process
+LENGTH_BOUND_STATS = LengthBoundStats()
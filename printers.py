@@ -81,24 +81,28 @@ def print_problem(dag, input_spec, match_selector = 'match', action_selector = '
   print ('# of actions = ', len(dag.nodes(select='action')))
   print ('Match unit size = ', input_spec.match_unit_size)
 
-  match_units = reduce(lambda acc, node: acc + math.ceil((1.0 * dag.node[node]['key_width']) / input_spec.match_unit_size),\
-                       dag.nodes(select=match_selector), 0)
+  # Widths and fields of the selected nodes, from the compact view of the DAG
+  view = dag.compact()
+  match_keys = [view.key_width[view.index[node]] for node in view.nodes(match_selector)]
+  num_fields = [view.num_fields[view.index[node]] for node in view.nodes(action_selector)]
+
+  match_units = reduce(lambda acc, key_width: acc + math.ceil((1.0 * key_width) / input_spec.match_unit_size),\
+                       match_keys, 0)
   print ('# of match units = ', match_units)
   print ('match_unit_limit = ', input_spec.match_unit_limit)
 
-  max_match_key = reduce(lambda acc, node: max(acc, dag.node[node]['key_width']),dag.nodes(select=match_selector), 0)
+  max_match_key = max(match_keys + [0])
   print ('max size of match key in program = ', max_match_key)
   print ('max size of match key in hw = ', input_spec.match_unit_size * input_spec.match_unit_limit)
   if (max_match_key > input_spec.match_unit_size * input_spec.match_unit_limit):
     print ('max match key in program is larger than can be supported by hardware')
     exit(1)
 
-  action_fields = reduce(lambda acc, node: acc + dag.node[node]['num_fields'],\
-                       dag.nodes(select=action_selector), 0)
+  action_fields = sum(num_fields)
   print ('# of action fields = ', action_fields)
   print ('action_fields_limit = ', input_spec.action_fields_limit)
 
-  max_action_fields = reduce(lambda acc, node: max(acc, dag.node[node]['num_fields']),dag.nodes(select=action_selector), 0)
+  max_action_fields = max(num_fields + [0])
   print ('max number of action fields in program = ', max_action_fields)
   print ('max number of action fields in hw = ', input_spec.action_fields_limit)
   if (max_action_fields > input_spec.action_fields_limit):
@@ -0,0 +1,117 @@
+import collections
+
+class QrIndex:
+  """ Index of the qr[v, q, r] binaries created for a dRMT model
+
+  qr[v, q, r] is 1 when t[v] leaves a quotient of q and a remainder of r
+  when divided by the period T. Without time windows every (v, q, r) is
+  created. With time windows (see ScheduleDAG.time_windows), v only gets
+  binaries for start times between its ASAP and ALAP times.
+
+  Parameters
+  ----------
+  nodes : list
+      Nodes of the DAG
+  Q_MAX : int
+      Number of scheduling periods covered by the model
+  T : int
+      Period duration
+  windows : tuple
+      Optional (asap, alap) pair of dicts
+  """
+  def __init__(self, nodes, Q_MAX, T, windows=None):
+    self.Q_MAX = Q_MAX
+    self.T     = T
+    self.keys  = []
+    self.slots = dict()                            # v -> [(q, r)]
+    self.nodes_at = collections.defaultdict(list)  # (q, r) -> [v]
+    self.empty_nodes = []                          # nodes with no feasible start time
+
+    for v in nodes:
+      if windows is None:
+        times = range(Q_MAX * T)
+      else:
+        asap, alap = windows
+        times = range(asap[v], min(alap[v], Q_MAX * T - 1) + 1)
+      self.slots[v] = [(tv // T, tv % T) for tv in times]
+      if not self.slots[v]:
+        self.empty_nodes.append(v)
+      for (q, r) in self.slots[v]:
+        self.keys.append((v, q, r))
+        self.nodes_at[q, r].append(v)
+
+    self.dense_count = len(nodes) * Q_MAX * T
+    self.eliminated  = self.dense_count - len(self.keys)
+
+  def at(self, q, r, select):
+    """ Returns the nodes in select that have a qr binary at (q, r) """
+    return [v for v in self.nodes_at[q, r] if v in select]
+
+  def summary(self):
+    return 'qr variables = %d of %d (%d eliminated by time windows)' %\
+           (len(self.keys), self.dense_count, self.eliminated)
+
+  def times(self, v):
+    """ Returns the start times q * T + r that v has a qr binary for, in increasing order """
+    return [q * self.T + r for (q, r) in self.slots[v]]
+
+  def start_expr(self, qr, v):
+    """ Returns the start time of v as a linear expression over qr """
+    return sum((q * self.T + r) * qr[v, q, r] for (q, r) in self.slots[v])
+
+  def start_time(self, qr, v):
+    """ Returns the start time of v in a solved model """
+    return int(round(sum((q * self.T + r) * qr[v, q, r].x for (q, r) in self.slots[v])))
+
+  def add_time_indexed_dependency(self, m, qr, u, v, delay, name):
+    """ Adds t[v] - t[u] >= delay without using t
+
+    Writing x[v, s] for qr[v, q, r] with s = q * T + r, v can only have
+    started by time s if u had started by time s - delay:
+      sum(x[v, s'] for s' <= s) <= sum(x[u, s'] for s' <= s - delay)
+    One row is added per start time of v, until the right-hand side
+    covers every start time of u and the rows become redundant.
+    """
+    T = self.T
+    u_times = self.times(u)
+    lhs = []
+    rhs = []
+    i = 0
+    for (q, r) in self.slots[v]:
+      s = q * T + r
+      if s - delay >= u_times[-1]:
+        break
+      lhs.append(qr[v, q, r])
+      while (i < len(u_times)) and (u_times[i] <= s - delay):
+        rhs.append(qr[(u,) + self.slots[u][i]])
+        i += 1
+      m.addConstr(sum(lhs) <= sum(rhs), '%s[%s,%s,%d]' % (name, u, v, s))
+
+def add_time_indexed_tie(m, qr_a, index_a, a, qr_b, index_b, b, offset, name):
+  """ Adds t_b[b] == t_a[a] + offset without using t
+
+  qr_a/index_a and qr_b/index_b may be the same qr family (e.g. a match
+  and its action) or the families of two branches sharing a node.
+  """
+  x_a = dict((q * index_a.T + r, qr_a[a, q, r]) for (q, r) in index_a.slots[a])
+  x_b = dict((q * index_b.T + r, qr_b[b, q, r]) for (q, r) in index_b.slots[b])
+  for s in sorted(set(x_a) | set(s - offset for s in x_b)):
+    m.addConstr(x_a.get(s, 0) - x_b.get(s + offset, 0) == 0, '%s[%s,%s,%d]' % (name, a, b, s))
+
+def add_disaggregated_any_op(m, qr, qr_index, select, any_op, name):
+  """ Ties any_op[q, r] to the qr binaries of the nodes in select
+
+  Adds qr[v, q, r] <= any_op[q, r] for every v in select, which is a
+  tighter relaxation than the single big-M row
+    sum(qr[v, q, r] for v in select) <= len(select) * any_op[q, r]
+  and any_op[q, r] <= sum(qr[v, q, r] for v in select). The latter
+  rules out the schedules that only differ in flags of idle (q, r) (and
+  fixes them to 0 where no node of select has a binary), which the
+  solver would otherwise branch over.
+  """
+  for q in range(qr_index.Q_MAX):
+    for r in range(qr_index.T):
+      at = qr_index.at(q, r, select)
+      for v in at:
+        m.addConstr(qr[v, q, r] <= any_op[q, r], '%s[%s,%d,%d]' % (name, v, q, r))
+      m.addConstr(any_op[q, r] <= sum(qr[v, q, r] for v in at), '%s_idle[%d,%d]' % (name, q, r))
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+
+# The hw fields that the dRMT models read
+HW_FIELDS = ('action_fields_limit', 'match_unit_limit', 'match_unit_size', 'action_proc_limit', 'match_proc_limit')
+
+# The options that change the model or what its solve stores (probe is a
+# separate argument of solve_key, as the drivers minimize once with probe
+# off). The backend decides the schedule found and the MIP gap stored:
+# no option sets the gap, each solver stops at its own default tolerance.
+KEY_OPTIONS = ('formulation', 'windowed', 'any_op', 'backend')
+
+# Part of every key, bumped when a change to the models changes their
+# results, so that results of the older models are not returned
+# (2: the length lower bound was one cycle too tight)
+KEY_VERSION = 2
+
+def canonical(obj):
+  """ Returns a string of obj that does not depend on dict or set order """
+  if isinstance(obj, dict):
+    return '{' + ','.join(sorted(canonical(k) + ':' + canonical(v) for (k, v) in obj.items())) + '}'
+  elif isinstance(obj, (set, frozenset)):
+    return '{' + ','.join(sorted(canonical(v) for v in obj)) + '}'
+  elif isinstance(obj, (list, tuple)):
+    return '[' + ','.join(canonical(v) for v in obj) + ']'
+  else:
+    return repr(obj)
+
+def solve_key(kind, graphs, hw_spec, period, options, probe=False, **extra):
+  """ Returns the cache key of a solve
+
+  Parameters
+  ----------
+  kind : str
+      Names the model, e.g. 'dag' for DrmtScheduleSolver
+  graphs : list
+      DAGs of the model; their nodes and edges (with the delays of the
+      latency spec) are part of the key
+  hw_spec : module
+      Any module with the HW_FIELDS, e.g. the input spec
+  period : int
+  options : SolverOptions
+      Only the KEY_OPTIONS are part of the key
+  probe : bool
+      True if the solve stops at the first schedule
+  extra :
+      Other parameters of the model, e.g. scratch_max
+  """
+  fingerprint = canonical([KEY_VERSION,\
+                           kind,\
+                           [(G.nodes(data=True), G.edges(data=True)) for G in graphs],\
+                           dict((f, getattr(hw_spec, f)) for f in HW_FIELDS),\
+                           period,\
+                           dict((o, getattr(options, o)) for o in KEY_OPTIONS),\
+                           probe,\
+                           extra])
+  return hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()
+
+class CachedResult:
+  def __init__(self, verdict, time_of_op, mip_gap, runtime, solution):
+    self.verdict    = verdict     # 'feasible' or 'infeasible'
+    self.time_of_op = time_of_op  # None if infeasible
+    self.mip_gap    = mip_gap
+    self.runtime    = runtime     # Seconds spent by the solver
+    self.solution   = solution    # What the solver returned
+
+class ResultCache:
+  """ Proven solver verdicts kept in an SQLite file across runs
+
+  Only results that another solve would repeat are stored: infeasible,
+  optimal, or the first solution of a probe. Time limited results are not.
+  On every store, entries unused for more than max_days are removed, then
+  the least recently used ones beyond max_entries.
+
+  Parameters
+  ----------
+  directory : str
+      Created if needed, holds results.sqlite
+  max_entries : int
+  max_days : float
+  """
+  def __init__(self, directory, max_entries, max_days):
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+    self.max_entries = max_entries
+    self.max_days = max_days
+    self.hits = 0
+    self.misses = 0
+    # Parallel searches write from several processes
+    self.db = sqlite3.connect(os.path.join(directory, 'results.sqlite'), timeout=60)
+    self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, verdict TEXT, time_of_op TEXT,'\
+                    ' mip_gap REAL, runtime REAL, solution BLOB, created REAL, used REAL)')
+    self.db.commit()
+
+  def lookup(self, key):
+    """ Returns the CachedResult of key, None if there is none """
+    row = self.db.execute('SELECT verdict, time_of_op, mip_gap, runtime, solution FROM results WHERE key = ?',\
+                          (key,)).fetchone()
+    if row is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.db.execute('UPDATE results SET used = ? WHERE key = ?', (time.time(), key))
+    self.db.commit()
+    (verdict, time_of_op, mip_gap, runtime, solution) = row
+    return CachedResult(verdict, json.loads(time_of_op) if time_of_op else None, mip_gap, runtime,\
+                        pickle.loads(solution) if solution else None)
+
+  def store(self, key, solution, time_of_op, mip_gap, runtime):
+    """ Stores a solver result, solution is None if the solve proved infeasibility """
+    now = time.time()
+    self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',\
+                    (key, 'feasible' if solution else 'infeasible',\
+                     json.dumps(time_of_op) if solution else None, mip_gap, runtime,\
+                     sqlite3.Binary(pickle.dumps(solution)) if solution else None, now, now))
+    self.db.execute('DELETE FROM results WHERE used < ?', (now - self.max_days * 24 * 3600,))
+    self.db.execute('DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY used DESC LIMIT ?)',\
+                    (self.max_entries,))
+    self.db.commit()
+
+  def summary(self):
+    return 'Result cache: %d hits, %d misses' % (self.hits, self.misses)
+
+# One cache per directory and process
+caches = dict()
+
+def open_cache(options):
+  """ Returns the ResultCache of options.cache, None if caching is off """
+  if not options.cache:
+    return None
+  if options.cache not in caches:
+    caches[options.cache] = ResultCache(options.cache, options.cache_max_entries, options.cache_max_days)
+  return caches[options.cache]
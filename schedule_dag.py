@@ -1,6 +1,8 @@
 import networkx as nx
 import math
 
+from compact_dag import CompactDAG
+
 # For now, assume conditions cost 1 action field
 CONDITION_COST = 1
 
@@ -8,6 +10,7 @@ CONDITION_COST = 1
 class ScheduleDAG(nx.DiGraph):
     def __init__(self):
         nx.DiGraph.__init__(self)
+        self.compact_view = None
 
     def create_dag(self, nodes, edges, latency_spec):
         """ Returns a DAG of match/action nodes
@@ -63,16 +66,22 @@ class ScheduleDAG(nx.DiGraph):
             if (dep_type == 'new_match_to_action') or (dep_type == 'new_successor_conditional_on_table_result_action_type'):
               # minimum match latency
               self.edge[u][v]['delay'] = latency_spec.dM
+              self.edge[u][v]['dep_class'] = 'dM'
             elif (dep_type == 'rmt_reverse_read') or (dep_type == 'rmt_successor'):
               # latency of dS, for now zero
               self.edge[u][v]['delay'] = latency_spec.dS
+              self.edge[u][v]['dep_class'] = 'dS'
             elif (dep_type == 'rmt_action') or (dep_type == 'rmt_match'):
               # minimum action latency
               self.edge[u][v]['delay'] = latency_spec.dA
+              self.edge[u][v]['dep_class'] = 'dA'
             else:
               print ("Unexpected dependency type: ", dep_type)
               assert(False)
 
+        # Annotations changed, the next compact() builds a new view
+        self.compact_view = None
+
     def critical_path(self):
         """Returns the critical (longest) path in the DAG, and its latency
 
@@ -89,22 +98,26 @@ class ScheduleDAG(nx.DiGraph):
             Latency of longest path
 
         """
-        dist = {}  # stores [distance, node] pair.
-        # distance is distance from root and node is predecessor on path from root
-        for node in nx.topological_sort(self):
-            # pairs of dist,node for all incoming edges
-            pairs = [(dist[v][0] + self[v][u]['delay'], v) for v,u in self.in_edges(node)]
-            if pairs:
-                dist[node] = max(pairs)
-            else:
-                dist[node] = (0, node)
-        node, (length, _) = max(dist.items(), key=lambda x: x[1])
-        latency = length + 1 # one extra cycle for final operation
-        path = []
-        while length > 0:
-            path.append(node)
-            length, node = dist[node]
-        return list(reversed(path)), latency
+        return self.compact().critical_path()
+
+    def time_windows(self, horizon):
+        """Returns the earliest (ASAP) and latest (ALAP) start time of every node
+
+        Parameters
+        ----------
+        horizon : int
+            Number of timeslots a schedule may use, i.e., start times
+            lie in [0, horizon - 1]
+
+        Returns
+        -------
+        asap : dict
+            Longest path from any root to each node
+        alap : dict
+            horizon - 1 minus the longest path from each node to any sink
+
+        """
+        return self.compact().time_windows(horizon)
 
     def nodes(self, data=False, select='*'):
         """Returns list of nodes with optional data values and selection filter
@@ -123,6 +136,9 @@ class ScheduleDAG(nx.DiGraph):
             List of nodes
 
         """
+        if (data is False) and (select != '*'):
+            # Typed node lists are kept by the compact view
+            return list(self.compact().nodes(select))
         nodelist = []
         for (u, d) in nx.DiGraph.nodes(self, data=True):
             if (select == '*') or (d['type'] == select):
@@ -131,3 +147,21 @@ class ScheduleDAG(nx.DiGraph):
                 else:
                     nodelist.append((u,d))
         return nodelist
+
+    def compact(self):
+        """Returns the CompactDAG view of the DAG, built on first use
+
+        The view is rebuilt if nodes or edges were added or removed since;
+        create_dag also drops it. Other changes to the annotations are not
+        noticed.
+
+        Returns
+        -------
+        view : CompactDAG
+
+        """
+        size = (self.number_of_nodes(), self.number_of_edges())
+        if (self.compact_view is None) or (self.compact_size != size):
+            self.compact_view = CompactDAG(self)
+            self.compact_size = size
+        return self.compact_view
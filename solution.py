@@ -6,4 +6,5 @@ class Solution:
     self.match_proc_usage    = dict()
     self.action_proc_usage   = dict()
     self.action_proc_set = dict()
-    self.match_proc_set = dict()
\ No newline at end of file
+    self.match_proc_set = dict()
+    self.mip_gap = None
@@ -0,0 +1,511 @@
+import time
+
+# The solver engines are optional, only the selected backend has to be installed
+try:
+  import gurobipy
+except ImportError:
+  gurobipy = None
+try:
+  from ortools.sat.python import cp_model
+except ImportError:
+  cp_model = None
+try:
+  from ortools.linear_solver import pywraplp
+except ImportError:
+  pywraplp = None
+
+# Backends that can build and solve the dRMT models
+#   gurobi : gurobipy (needs a Gurobi license)
+#   cpsat  : OR-Tools CP-SAT
+#   highs  : HiGHS through the OR-Tools linear solver wrapper
+#   cbc    : CBC through the OR-Tools linear solver wrapper
+BACKENDS = ('gurobi', 'cpsat', 'highs', 'cbc')
+
+if gurobipy is not None:
+  GRB = gurobipy.GRB
+else:
+  class GRB:
+    """ The gurobipy.GRB constants used by the solvers """
+    INFINITY   = 1e100
+    CONTINUOUS = 'C'
+    BINARY     = 'B'
+    INTEGER    = 'I'
+    MINIMIZE   = 1
+    MAXIMIZE   = -1
+    LESS_EQUAL    = '<'
+    GREATER_EQUAL = '>'
+    EQUAL         = '='
+    OPTIMAL        = 2
+    INFEASIBLE     = 3
+    INF_OR_UNBD    = 4
+    TIME_LIMIT     = 9
+    SOLUTION_LIMIT = 10
+    INTERRUPTED    = 11
+    USER_OBJ_LIMIT = 15
+
+    class Callback:
+      """ The gurobipy.GRB.Callback constants used by the solvers """
+      MIP           = 3
+      MIPSOL        = 4
+      MIP_OBJBST    = 3000
+      MIP_OBJBND    = 3001
+      MIP_NODCNT    = 3002
+      MIPSOL_OBJ    = 4002
+      MIPSOL_OBJBST = 4003
+      MIPSOL_OBJBND = 4004
+      MIPSOL_NODCNT = 4005
+
+# CP-SAT only has bounded integer variables, GRB.INFINITY is clipped to this
+CPSAT_INFINITY = 2 ** 40
+
+def available_backends():
+  """ Returns the backends whose solver engine is installed """
+  installed = {'gurobi' : gurobipy is not None,
+               'cpsat'  : cp_model is not None,
+               'highs'  : pywraplp is not None,
+               'cbc'    : pywraplp is not None}
+  return [backend for backend in BACKENDS if installed[backend]]
+
+def create_model(backend='gurobi'):
+  """ Returns an empty model for the given backend
+
+  The Gurobi backend returns a gurobipy Model. The others return an
+  OrToolsModel, which has the part of the gurobipy Model interface
+  used by the dRMT solvers, so the same model building code works for
+  every backend.
+
+  Parameters
+  ----------
+  backend : str
+      One of BACKENDS
+  """
+  if backend not in BACKENDS:
+    raise ValueError('Unknown backend %s, expected one of %s' % (backend, BACKENDS))
+  if backend == 'gurobi':
+    if gurobipy is None:
+      raise ImportError('gurobipy is not installed, use another backend')
+    return gurobipy.Model()
+  if (backend == 'cpsat' and cp_model is None) or (backend != 'cpsat' and pywraplp is None):
+    raise ImportError('ortools is not installed, needed by the %s backend' % backend)
+  return OrToolsModel(backend)
+
+def as_expr(value):
+  """ Returns value (a number, Var or LinExpr) as a LinExpr """
+  if isinstance(value, LinExpr):
+    return value
+  return LinExpr({}, value)
+
+class LinExpr:
+  """ Linear expression: sum(terms[i] * var i) + constant """
+  def __init__(self, terms, constant):
+    self.terms    = terms
+    self.constant = constant
+
+  def __add__(self, other):
+    other = as_expr(other)
+    terms = dict(self.terms)
+    for (i, coef) in other.terms.items():
+      terms[i] = terms.get(i, 0) + coef
+    return LinExpr(terms, self.constant + other.constant)
+
+  __radd__ = __add__
+
+  def __neg__(self):
+    return LinExpr(dict((i, -coef) for (i, coef) in self.terms.items()), -self.constant)
+
+  def __sub__(self, other):
+    return self + (-as_expr(other))
+
+  def __rsub__(self, other):
+    return as_expr(other) + (-self)
+
+  def __mul__(self, other):
+    if isinstance(other, LinExpr):
+      raise TypeError('Only linear expressions are supported')
+    return LinExpr(dict((i, coef * other) for (i, coef) in self.terms.items()), self.constant * other)
+
+  __rmul__ = __mul__
+
+  def __le__(self, other):
+    return TempConstr(self - other, '<')
+
+  def __ge__(self, other):
+    return TempConstr(self - other, '>')
+
+  def __eq__(self, other):
+    return TempConstr(self - other, '=')
+
+  __hash__ = object.__hash__
+
+class Var(LinExpr):
+  """ Model variable, .x holds its value after a solve and .start a MIP start
+
+  A Var is the expression 1 * var, so it can be used wherever a LinExpr is.
+  """
+  def __init__(self, index, lb, ub, vtype, name):
+    self.index = index
+    self.lb    = lb
+    self.ub    = ub
+    self.vtype = vtype
+    self.VarName = name
+    self.x     = None
+    self.start = None
+
+  @property
+  def terms(self):
+    return {self.index : 1}
+
+  @property
+  def constant(self):
+    return 0
+
+class TempConstr:
+  """ expr (sense) 0, as returned by the comparison operators """
+  def __init__(self, expr, sense):
+    self.expr  = expr
+    self.sense = sense
+
+class Constr:
+  """ Linear constraint: sum(terms[i] * var i) (sense) RHS
+
+  RHS (and the coefficients, see OrToolsModel.chgCoeff) may be changed
+  between calls to optimize.
+  """
+  def __init__(self, terms, sense, rhs, name):
+    self.terms = dict((i, coef) for (i, coef) in terms.items() if coef != 0)
+    self.sense = sense
+    self.RHS   = rhs
+    self.ConstrName = name
+
+class OrToolsModel:
+  """ Model with the gurobipy Model interface used by the dRMT solvers
+
+  The model is kept in memory and translated to CP-SAT or to the
+  OR-Tools linear solver wrapper (HiGHS, CBC) on every call to optimize.
+  Status, SolCount, MIPGap, NodeCount and Runtime are set as gurobipy
+  would set them. Callbacks get the MIPSOL event from CP-SAT only, the
+  linear solver wrapper has no callbacks. SolutionLimit can only be 1,
+  the first solution, which every backend stops at.
+
+  Parameters
+  ----------
+  backend : str
+      'cpsat', 'highs' or 'cbc'
+  """
+  def __init__(self, backend):
+    self.backend = backend
+    self.vars    = []
+    self.constrs = []
+    self.objective = LinExpr({}, 0)
+    self.sense     = GRB.MINIMIZE
+    # Parameters honoured by the backends, the others (e.g. LogToConsole) are ignored
+    self.params  = {'TimeLimit' : None, 'Threads' : 0, 'SolutionLimit' : None, 'BestObjStop' : None}
+    # Set when a constraint without variables does not hold
+    self.trivially_infeasible = False
+    self.Status   = None
+    self.SolCount = 0
+    self.ObjVal   = None
+    self.ObjBound = None
+    self.MIPGap   = None
+    self.Runtime  = 0.0
+    self.NodeCount = 0
+    # What cbGet returns during a callback
+    self.cb_values = dict()
+
+  @property
+  def NumVars(self):
+    return len(self.vars)
+
+  @property
+  def NumConstrs(self):
+    return len(self.constrs)
+
+  @property
+  def NumNZs(self):
+    return sum(len(c.terms) for c in self.constrs)
+
+  def setParam(self, name, value):
+    if name in self.params:
+      self.params[name] = value
+
+  def addVar(self, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=''):
+    var = Var(len(self.vars), lb, ub, vtype, name)
+    self.vars.append(var)
+    return var
+
+  def addVars(self, keys, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=''):
+    """ Returns a dict of new variables, one per key """
+    if isinstance(keys, int):
+      keys = range(keys)
+    variables = dict()
+    for key in keys:
+      label = ','.join(str(k) for k in key) if isinstance(key, tuple) else str(key)
+      variables[key] = self.addVar(lb, ub, obj, vtype, '%s[%s]' % (name, label))
+    return variables
+
+  def addConstr(self, constr, name=''):
+    if isinstance(constr, bool):
+      # Constraints without variables, e.g. an empty sum under a limit
+      self.trivially_infeasible = self.trivially_infeasible or not constr
+      return None
+    expr = constr.expr
+    c = Constr(expr.terms, constr.sense, -expr.constant, name)
+    self.constrs.append(c)
+    return c
+
+  def addConstrs(self, constrs, name=''):
+    return [self.addConstr(c, '%s[%d]' % (name, i)) for (i, c) in enumerate(constrs)]
+
+  def addMConstr(self, A, x, sense, b, name=''):
+    """ Adds A x (sense) b, as Model.addMConstr with a scipy.sparse A and
+    a list of variables x, and returns the constraints as a list """
+    A = A.tocsr()
+    columns = [var.index for var in x]
+    indices = A.indices.tolist()
+    data = A.data.tolist()
+    constrs = []
+    for (i, rhs) in enumerate(b.tolist()):
+      (start, end) = (A.indptr[i], A.indptr[i + 1])
+      terms = dict(zip([columns[j] for j in indices[start:end]], data[start:end]))
+      constrs.append(Constr(terms, sense, rhs, '%s[%d]' % (name, i)))
+    self.constrs.extend(constrs)
+    return constrs
+
+  def chgCoeff(self, constr, var, value):
+    """ Changes the coefficient of var in constr, as Model.chgCoeff """
+    if value != 0:
+      constr.terms[var.index] = value
+    else:
+      constr.terms.pop(var.index, None)
+
+  def setObjective(self, expr, sense=GRB.MINIMIZE):
+    self.objective = as_expr(expr)
+    self.sense     = sense
+
+  def update(self):
+    """ Nothing to do, unlike gurobipy the model is up to date after every change """
+    pass
+
+  def cbGet(self, what):
+    return self.cb_values[what]
+
+  def optimize(self, callback=None):
+    start = time.time()
+    for var in self.vars:
+      var.x = None
+    self.SolCount = 0
+    self.ObjVal   = None
+    self.ObjBound = None
+    self.MIPGap   = None
+    self.NodeCount = 0
+    if self.params['SolutionLimit'] not in (None, 1):
+      raise ValueError('The %s backend can only stop at the first solution, not at SolutionLimit %s' %\
+                       (self.backend, self.params['SolutionLimit']))
+    if self.trivially_infeasible:
+      self.Status = GRB.INFEASIBLE
+    elif self.backend == 'cpsat':
+      self.solve_cpsat(callback)
+    else:
+      self.solve_linear_solver()
+    self.Runtime = time.time() - start
+    if self.SolCount > 0:
+      # Relative gap as reported by Gurobi
+      if self.ObjVal == self.ObjBound:
+        self.MIPGap = 0.0
+      elif self.ObjVal == 0:
+        self.MIPGap = GRB.INFINITY
+      else:
+        self.MIPGap = abs(self.ObjBound - self.ObjVal) / abs(self.ObjVal)
+
+  def set_values(self, values):
+    for (var, value) in zip(self.vars, values):
+      # Integrality tolerances of MIP solvers leave values like 0.9999999
+      var.x = int(round(value)) if var.vtype != GRB.CONTINUOUS else value
+    self.SolCount = 1
+
+  def reached_objective_stop(self):
+    """ Returns True if the incumbent is at least as good as BestObjStop """
+    stop = self.params['BestObjStop']
+    if (stop is None) or (self.SolCount == 0):
+      return False
+    return (self.ObjVal <= stop) if self.sense == GRB.MINIMIZE else (self.ObjVal >= stop)
+
+  def solve_cpsat(self, callback=None):
+    def integral(value):
+      if value != int(value):
+        raise ValueError('The cpsat backend needs integer coefficients, got %s' % value)
+      return int(value)
+
+    def clip(bound):
+      return int(max(-CPSAT_INFINITY, min(CPSAT_INFINITY, bound)))
+
+    cp = cp_model.CpModel()
+    cp_vars = []
+    for var in self.vars:
+      if var.vtype == GRB.CONTINUOUS:
+        raise ValueError('The cpsat backend needs integer variables, %s is continuous' % var.VarName)
+      if var.vtype == GRB.BINARY:
+        cp_vars.append(cp.NewIntVar(max(int(var.lb), 0), min(int(var.ub), 1), var.VarName))
+      else:
+        cp_vars.append(cp.NewIntVar(clip(var.lb), clip(var.ub), var.VarName))
+      if var.start is not None:
+        cp.AddHint(cp_vars[-1], int(round(var.start)))
+
+    def weighted_sum(terms):
+      return cp_model.LinearExpr.WeightedSum([cp_vars[i] for i in terms], [integral(coef) for coef in terms.values()])
+
+    for c in self.constrs:
+      rhs = integral(c.RHS)
+      if c.sense == '<':
+        cp.AddLinearConstraint(weighted_sum(c.terms), -CPSAT_INFINITY, rhs)
+      elif c.sense == '>':
+        cp.AddLinearConstraint(weighted_sum(c.terms), rhs, CPSAT_INFINITY)
+      else:
+        cp.AddLinearConstraint(weighted_sum(c.terms), rhs, rhs)
+
+    objective = weighted_sum(self.objective.terms) + integral(self.objective.constant)
+    if self.sense == GRB.MINIMIZE:
+      cp.Minimize(objective)
+    else:
+      cp.Maximize(objective)
+
+    solver = cp_model.CpSolver()
+    if self.params['TimeLimit'] is not None:
+      solver.parameters.max_time_in_seconds = self.params['TimeLimit']
+    if self.params['Threads']:
+      solver.parameters.num_workers = self.params['Threads']
+    if self.params['SolutionLimit'] == 1:
+      solver.parameters.stop_after_first_solution = True
+    stop = self.params['BestObjStop']
+    on_solution = None
+    if callback is not None:
+      def on_solution(cb):
+        self.cb_values = {GRB.Callback.MIPSOL_OBJ    : cb.ObjectiveValue(),\
+                          GRB.Callback.MIPSOL_OBJBND : cb.BestObjectiveBound(),\
+                          GRB.Callback.MIPSOL_NODCNT : cb.NumBranches()}
+        callback(self, GRB.Callback.MIPSOL)
+    if (stop is not None) or (on_solution is not None):
+      ret = solver.Solve(cp, CpSatSolutionCallback(stop, self.sense, on_solution))
+    else:
+      ret = solver.Solve(cp)
+    self.NodeCount = solver.NumBranches()
+
+    if ret == cp_model.MODEL_INVALID:
+      raise ValueError('CP-SAT rejected the model: ' + cp.Validate())
+    if ret in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+      self.set_values([solver.Value(v) for v in cp_vars])
+      self.ObjVal   = solver.ObjectiveValue()
+      self.ObjBound = solver.BestObjectiveBound()
+    if ret == cp_model.OPTIMAL:
+      self.Status = GRB.OPTIMAL
+    elif ret == cp_model.INFEASIBLE:
+      self.Status = GRB.INFEASIBLE
+    elif (ret == cp_model.FEASIBLE) and self.reached_objective_stop():
+      self.Status = GRB.USER_OBJ_LIMIT
+    elif (ret == cp_model.FEASIBLE) and (self.params['SolutionLimit'] == 1):
+      self.Status = GRB.SOLUTION_LIMIT
+    else:
+      self.Status = GRB.TIME_LIMIT
+
+  def solve_linear_solver(self):
+    solver = pywraplp.Solver.CreateSolver(self.backend.upper())
+    if solver is None:
+      raise ImportError('ortools was built without the %s solver' % self.backend)
+    infinity = solver.infinity()
+
+    def bound(value):
+      return max(-infinity, min(infinity, value))
+
+    # Names are left out, the wrapper aborts on duplicate names and the
+    # solvers reuse some constraint names (e.g. constr_action_proc)
+    lp_vars = []
+    for var in self.vars:
+      if var.vtype == GRB.BINARY:
+        lp_vars.append(solver.IntVar(max(var.lb, 0), min(var.ub, 1), ''))
+      elif var.vtype == GRB.INTEGER:
+        lp_vars.append(solver.IntVar(bound(var.lb), bound(var.ub), ''))
+      else:
+        lp_vars.append(solver.NumVar(bound(var.lb), bound(var.ub), ''))
+
+    for c in self.constrs:
+      if c.sense == '<':
+        row = solver.Constraint(-infinity, c.RHS)
+      elif c.sense == '>':
+        row = solver.Constraint(c.RHS, infinity)
+      else:
+        row = solver.Constraint(c.RHS, c.RHS)
+      for (i, coef) in c.terms.items():
+        row.SetCoefficient(lp_vars[i], coef)
+
+    objective = solver.Objective()
+    for (i, coef) in self.objective.terms.items():
+      objective.SetCoefficient(lp_vars[i], coef)
+    objective.SetOffset(self.objective.constant)
+    if self.sense == GRB.MINIMIZE:
+      objective.SetMinimization()
+    else:
+      objective.SetMaximization()
+
+    if self.params['TimeLimit'] is not None:
+      solver.SetTimeLimit(int(self.params['TimeLimit'] * 1000))
+    if self.params['Threads']:
+      solver.SetNumThreads(self.params['Threads'])
+    # The wrapper has no solution limit, but a solver stops at the first
+    # solution when any gap is good enough. CBC takes the gap from the
+    # wrapper parameters, HiGHS ignores those and only takes its own.
+    # (HiGHS also has mip_max_improving_sols, but the wrapper then drops
+    # the solution it stopped at.)
+    parameters = pywraplp.MPSolverParameters()
+    first_solution = (self.params['SolutionLimit'] == 1)
+    if first_solution:
+      if self.backend == 'highs':
+        solver.SetSolverSpecificParametersAsString('mip_rel_gap = 1e30')
+      else:
+        parameters.SetDoubleParam(parameters.RELATIVE_MIP_GAP, 1e30)
+    # The HiGHS wrapper crashes on hints, so MIP starts only go to CBC
+    hinted = [(v, var.start) for (v, var) in zip(lp_vars, self.vars) if var.start is not None]
+    if hinted and self.backend == 'cbc':
+      solver.SetHint([v for (v, start) in hinted], [float(start) for (v, start) in hinted])
+    ret = solver.Solve(parameters)
+    self.NodeCount = solver.nodes()
+
+    if ret in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+      self.set_values([v.solution_value() for v in lp_vars])
+      self.ObjVal   = objective.Value()
+      proven = (ret == pywraplp.Solver.OPTIMAL) and not first_solution
+      self.ObjBound = self.ObjVal if proven else objective.BestBound()
+    if (ret in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE)) and first_solution:
+      # OPTIMAL only says the first solution was within the gap
+      self.Status = GRB.SOLUTION_LIMIT
+    elif ret == pywraplp.Solver.OPTIMAL:
+      self.Status = GRB.OPTIMAL
+    elif ret == pywraplp.Solver.INFEASIBLE:
+      self.Status = GRB.INFEASIBLE
+    elif ret == pywraplp.Solver.UNBOUNDED:
+      self.Status = GRB.INF_OR_UNBD
+    elif (ret == pywraplp.Solver.FEASIBLE) and self.reached_objective_stop():
+      # The wrapper has no callbacks to stop at BestObjStop, but the
+      # incumbent is as good as asked for
+      self.Status = GRB.USER_OBJ_LIMIT
+    else:
+      self.Status = GRB.TIME_LIMIT
+
+if cp_model is not None:
+  class CpSatSolutionCallback(cp_model.CpSolverSolutionCallback):
+    """ Calls on_solution(self) on every solution of a CP-SAT search and
+    stops it at the first one at least as good as stop (if not None), like
+    the BestObjStop parameter of Gurobi """
+    def __init__(self, stop=None, sense=GRB.MINIMIZE, on_solution=None):
+      cp_model.CpSolverSolutionCallback.__init__(self)
+      self.stop = stop
+      self.sense = sense
+      self.on_solution = on_solution
+
+    def on_solution_callback(self):
+      if self.on_solution is not None:
+        self.on_solution(self)
+      if self.stop is None:
+        return
+      value = self.ObjectiveValue()
+      if (value <= self.stop) if self.sense == GRB.MINIMIZE else (value >= self.stop):
+        self.StopSearch()
@@ -0,0 +1,131 @@
+import sys
+
+from solver_backends import BACKENDS
+from period_search import SEARCHES
+
+# Formulations of the start times and dependencies
+#   division     : integer t[v] tied to qr by t[v] = sum((q * T + r) * qr[v, q, r])
+#   time_indexed : qr only, dependencies as aggregated time-indexed rows
+FORMULATIONS = ('division', 'time_indexed')
+
+# Rows that set any_match[q, r] (and any_action[q, r]), the flags counted
+# by the processor limits
+#   big_m         : sum(qr[v, q, r] for every match v) <= len(match_nodes) * any_match[q, r]
+#   disaggregated : qr[v, q, r] <= any_match[q, r] for every match v, and
+#                   any_match[q, r] <= sum(qr[v, q, r] for every match v)
+#                   so that any_match[q, r] is 1 exactly when a match starts at (q, r)
+ANY_OP_FORMS = ('big_m', 'disaggregated')
+
+class SolverOptions:
+  """ Formulation and search options shared by the dRMT solvers
+
+  Options are given on the command line after the positional
+  arguments, as --name (for flags) or --name=value.
+  """
+  def __init__(self):
+    # Create qr[v, q, r] only inside the ASAP/ALAP window of each node
+    self.windowed = False
+    # One of FORMULATIONS
+    self.formulation = 'division'
+    # One of ANY_OP_FORMS
+    self.any_op = 'big_m'
+    # One of solver_backends.BACKENDS
+    self.backend = 'gurobi'
+    # Seed each period of a search with the last feasible schedule (see warm_start.py)
+    self.warm_start = True
+    # Solver threads per solve, 0 leaves it to the solver
+    self.threads = 0
+    # Period searches only check feasibility at each period and minimize
+    # the latency once, at the best period
+    self.probe = True
+    # Reject periods that prechecks.py proves infeasible before building a model
+    self.precheck = True
+    # One of period_search.SEARCHES
+    self.search = 'galloping'
+    # hw_spec_iterator.py skips sweep points whose verdict follows from
+    # monotonicity (see monotone_sweep)
+    self.monotone = True
+    # hw_spec_iterator.py builds one model per period and only updates the
+    # swept limit between points (see DrmtScheduleSolver.resolve)
+    self.reuse_model = True
+    # Directory of the result cache (see result_cache.py), empty to turn it off
+    self.cache = '.drmt_cache'
+    # Eviction limits of the result cache
+    self.cache_max_entries = 10000
+    self.cache_max_days = 30.0
+    # Directory of the probe journals of the drivers (see journal.py), a
+    # restarted command replays its journal. Empty to turn it off.
+    self.journal = '.drmt_journal'
+    # Period searches first give each solve initial_time_limit seconds and
+    # multiply it by time_limit_factor, up to the time limit of the driver,
+    # while the solve is undecided (see time_budget.py). 0 gives each
+    # solve the time limit of the driver.
+    self.initial_time_limit = 30.0
+    self.time_limit_factor = 4.0
+    # Wall clock budget of a period search in minutes, 0 for none
+    self.time_budget = 0.0
+    # JSON lines file of the progress (incumbent, bound, gap, nodes) of
+    # every solve (see telemetry.py), empty to turn it off
+    self.telemetry = ''
+    # Print the time, variables and nonzeros of each family of constraints
+    # of every model build (see build_profiler.py)
+    self.profile_build = False
+    # Add the regular families of constraints as sparse matrices instead
+    # of sums of variables (see matrix_builder.py), needs numpy and scipy
+    self.matrix_build = False
+
+def options_usage():
+  """ Returns a printable list of the options and their defaults """
+  options = SolverOptions()
+  return 'Options: ' + ' '.join('[--%s=%s]' % (name.replace('_', '-'), value)\
+                                for (name, value) in sorted(vars(options).items()))
+
+def parse_solver_options(argv):
+  """ Splits argv into positional arguments and solver options
+
+  Parameters
+  ----------
+  argv : list
+      Command line, typically sys.argv
+
+  Returns
+  -------
+  args : list
+      Positional arguments (including argv[0])
+  options : SolverOptions
+      Options set on the command line, defaults otherwise
+  """
+  options = SolverOptions()
+  args = []
+  for arg in argv:
+    if not arg.startswith('--'):
+      args.append(arg)
+      continue
+    name, has_value, value = arg[2:].partition('=')
+    name = name.replace('-', '_')
+    if not hasattr(options, name):
+      print ("Unknown option ", arg)
+      print (options_usage())
+      sys.exit(1)
+    default = getattr(options, name)
+    if type(default) is bool:
+      value = (not has_value) or (value.lower() in ('1', 'true', 'yes'))
+    elif type(default) is int:
+      value = int(value)
+    elif type(default) is float:
+      value = float(value)
+    setattr(options, name, value)
+
+  if options.formulation not in FORMULATIONS:
+    print ("Unknown formulation ", options.formulation, ", expected one of ", FORMULATIONS)
+    sys.exit(1)
+  if options.any_op not in ANY_OP_FORMS:
+    print ("Unknown any_op form ", options.any_op, ", expected one of ", ANY_OP_FORMS)
+    sys.exit(1)
+  if options.backend not in BACKENDS:
+    print ("Unknown backend ", options.backend, ", expected one of ", BACKENDS)
+    sys.exit(1)
+  if options.search not in SEARCHES:
+    print ("Unknown search ", options.search, ", expected one of ", SEARCHES)
+    sys.exit(1)
+  return args, options
@@ -0,0 +1,257 @@
+import hashlib
+import importlib
+import importlib.util
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from result_cache import canonical
+
+# Compiled DAG specs: MAGIC, the length of the JSON header (8 bytes,
+# little endian), the header and the columns (int32 indices and JSON
+# tables), each 8-byte aligned (see write_columns)
+SPEC_SUFFIX = '.dag'
+MAGIC = b'DRMTDAG1'
+ALIGN = 8
+
+class DagSpec:
+  """ DAG spec read from a file, with the nodes and edges of a spec module
+
+  Like spec modules, the drivers may set the hw limits on it.
+
+  Parameters
+  ----------
+  nodes : dict
+  edges : dict
+  content_hash : str
+      spec_hash of nodes and edges, None where it was not computed
+  """
+  def __init__(self, nodes, edges, content_hash):
+    self.nodes = nodes
+    self.edges = edges
+    self.content_hash = content_hash
+
+def spec_hash(spec):
+  """ Returns a hash of the nodes and edges of spec, the same for a spec
+  module and its compiled or JSON form """
+  return hashlib.sha256(canonical([spec.nodes, spec.edges]).encode('utf-8')).hexdigest()
+
+def load_spec(name):
+  """ Returns the DAG spec name: a compiled spec (.dag file), a p4-hlir
+  JSON spec (.json file) or, as the drivers always took, the name of a
+  spec module """
+  if name.endswith(SPEC_SUFFIX):
+    return read_spec(name)
+  if name.endswith('.json'):
+    return read_json_spec(name)
+  return importlib.import_module(name, "*")
+
+def read_json_spec(path):
+  """ Returns the spec of a p4-hlir JSON file, an object with the nodes
+  of a spec module and its edges as a list of [u, v, attributes] """
+  with open(path) as fp:
+    data = json.load(fp)
+  spec = DagSpec(data['nodes'], dict(((u, v), d) for (u, v, d) in data['edges']), None)
+  spec.content_hash = spec_hash(spec)
+  return spec
+
+def write_spec(spec, path):
+  """ Writes the nodes and edges of spec to path as a compiled spec
+
+  Node names and attribute dicts are interned, in one JSON table each:
+  most nodes and edges share their attributes with others (e.g. the
+  edges of one dependency type and delay). The columns hold, for every
+  node, the index of its name and of its attributes, and for every edge
+  the indices of its nodes and of its attributes.
+
+  Returns
+  -------
+  content_hash : str
+
+  Raises
+  ------
+  ValueError
+      If a value does not survive JSON (e.g. a tuple), so that the
+      compiled spec would differ from spec
+  """
+  records = Records()
+  columns = dag_columns(list(spec.nodes), spec.nodes, list(spec.edges), spec.edges, records)
+  columns.append(('records', json_column(records.records)))
+  content_hash = spec_hash(spec)
+  write_columns(path, MAGIC, {'hash' : content_hash}, columns)
+  if spec_hash(read_spec(path)) != content_hash:
+    os.remove(path)
+    raise ValueError('%s has values that do not survive JSON' % path)
+  return content_hash
+
+class Records:
+  """ Interned attribute dicts, by index """
+  def __init__(self):
+    self.records = []
+    self.ids = dict()
+
+  def intern(self, data):
+    text = json.dumps(data, sort_keys=True)
+    if text not in self.ids:
+      self.ids[text] = len(self.records)
+      self.records.append(data)
+    return self.ids[text]
+
+def dag_columns(names, nodes, edges, edge_data, records):
+  """ Returns the columns of the nodes names and the edges (with their
+  attributes in nodes and edge_data), attributes interned in records """
+  position = dict((v, i) for (i, v) in enumerate(names))
+  return [('node_data', array('i', [records.intern(nodes[v]) for v in names])),\
+          ('src',       array('i', [position[u] for (u, v) in edges])),\
+          ('dst',       array('i', [position[v] for (u, v) in edges])),\
+          ('edge_data', array('i', [records.intern(edge_data[e]) for e in edges])),\
+          ('names',     json_column(names))]
+
+def json_column(value):
+  return array('B', json.dumps(value).encode('utf-8'))
+
+def write_columns(path, magic, header, columns):
+  """ Writes magic, the length of the JSON header, the header (with the
+  byte order and the offset and length of each column) and the columns """
+  header = dict(header, byteorder=sys.byteorder, columns=dict())
+  # Offsets depend on the header size, which depends on the offsets: lay
+  # the columns out after a header of the size of the previous attempt
+  size = 0
+  while True:
+    offset = padded(len(magic) + 8 + size)
+    for (name, column) in columns:
+      header['columns'][name] = [offset, len(column)]
+      offset = padded(offset + len(column) * column.itemsize)
+    text = json.dumps(header, sort_keys=True).encode('utf-8')
+    if len(text) <= size:
+      break
+    size = len(text)
+
+  with open(path, 'wb') as fp:
+    fp.write(magic + struct.pack('<Q', size) + text.ljust(size))
+    for (name, column) in columns:
+      fp.seek(header['columns'][name][0])
+      fp.write(column.tobytes())
+
+def padded(offset):
+  return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+class MappedColumns:
+  """ Columns of a file written by write_columns, read in place from a
+  memory map until close
+
+  Parameters
+  ----------
+  path : str
+  magic : bytes
+      The magic the file was written with
+  """
+  def __init__(self, path, magic):
+    with open(path, 'rb') as fp:
+      self.mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+    self.buf = memoryview(self.mm)
+    self.views = [self.buf]
+    try:
+      if bytes(self.buf[:len(magic)]) != magic:
+        raise ValueError('%s is not a %s file' % (path, magic.decode('ascii')))
+      (size,) = struct.unpack_from('<Q', self.buf, len(magic))
+      start = len(magic) + 8
+      self.header = json.loads(bytes(self.buf[start:start + size]).decode('utf-8'))
+      if self.header['byteorder'] != sys.byteorder:
+        raise ValueError('%s was written on a %s endian machine' % (path, self.header['byteorder']))
+    except Exception:
+      self.close()
+      raise
+
+  def column(self, name, typecode='i'):
+    (offset, count) = self.header['columns'][name]
+    view = self.buf[offset:offset + count * struct.calcsize(typecode)].cast(typecode)
+    self.views.append(view)
+    return view
+
+  def json(self, name):
+    return json.loads(bytes(self.column(name, 'B')).decode('utf-8'))
+
+  def close(self):
+    for view in reversed(self.views):
+      view.release()
+    self.mm.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+def record_copies(records):
+  """ Returns a function per record that copies it, so that no two nodes
+  or edges share their attributes; the few with lists get their lists
+  copied too """
+  copy_lists = lambda d: dict((k, list(x) if isinstance(x, list) else x) for (k, x) in d.items())
+  return [copy_lists if any(isinstance(x, list) for x in data.values()) else dict for data in records]
+
+def read_spec(path):
+  """ Returns the DagSpec of a compiled spec
+
+  The file is memory-mapped and its columns read in place, without
+  parsing any Python.
+  """
+  with MappedColumns(path, MAGIC) as mapped:
+    names = mapped.json('names')
+    records = mapped.json('records')
+    copies = record_copies(records)
+    nodes = dict((v, copies[x](records[x])) for (v, x) in zip(names, mapped.column('node_data')))
+    edges = dict(((names[u], names[v]), copies[x](records[x]))\
+                 for (u, v, x) in zip(mapped.column('src'), mapped.column('dst'), mapped.column('edge_data')))
+    return DagSpec(nodes, edges, mapped.header['hash'])
+
+def startup_times(name, path, repeat):
+  """ Returns the best time over repeat runs to get the spec name as a
+  module compiled from source, as a module from its bytecode cache and
+  from the compiled spec at path """
+  times = []
+  origin = importlib.util.find_spec(name).origin if not name.endswith('.json') else None
+  loads = []
+  if origin:
+    def compile_source():
+      namespace = dict()
+      with open(origin) as fp:
+        exec(compile(fp.read(), origin, 'exec'), namespace)
+    def import_cached():
+      module_spec = importlib.util.spec_from_file_location(name, origin)
+      module_spec.loader.exec_module(importlib.util.module_from_spec(module_spec))
+    loads += [('module from source', compile_source), ('module from bytecode', import_cached)]
+  else:
+    loads.append(('JSON spec', lambda: read_json_spec(name)))
+  loads.append(('compiled spec', lambda: read_spec(path)))
+  for (label, load) in loads:
+    best = None
+    for _ in range(repeat):
+      start = time.time()
+      load()
+      elapsed = time.time() - start
+      best = elapsed if best is None else min(best, elapsed)
+    times.append((label, best))
+  return times
+
+if __name__ == "__main__":
+  if (len(sys.argv) not in (2, 3)):
+    print ("Usage: ", sys.argv[0], " <DAG file> [<output file>]")
+    print ("Compiles a DAG spec module (or p4-hlir .json file) to a " + SPEC_SUFFIX + " file that every driver accepts")
+    print ("in place of the module, <DAG file>" + SPEC_SUFFIX + " by default, and compares their load times")
+    exit(1)
+
+  name = sys.argv[1]
+  path = sys.argv[2] if len(sys.argv) == 3 else os.path.splitext(os.path.basename(name))[0] + SPEC_SUFFIX
+  spec = load_spec(name)
+  content_hash = write_spec(spec, path)
+  print ('Wrote ', path, ' (%d nodes, %d edges, %d bytes)' % (len(spec.nodes), len(spec.edges), os.path.getsize(path)))
+  print ('Content hash ', content_hash)
+
+  print ('{:*^80}'.format(' Startup time of ' + name + ' '))
+  for (label, seconds) in startup_times(name, path, 20):
+    print ('  %-22s %10.2f ms' % (label, seconds * 1000))
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import time
+
+from solver_backends import GRB
+from result_cache import canonical, HW_FIELDS
+
+def dag_hash(graphs):
+  """ Returns a short hash of the nodes and edges (with delays) of graphs """
+  return hashlib.sha256(canonical([(G.nodes(data=True), G.edges(data=True)) for G in graphs])\
+                        .encode('utf-8')).hexdigest()[:16]
+
+def relative_gap(incumbent, bound):
+  """ Returns the gap between incumbent and bound as Gurobi reports it """
+  if (incumbent is None) or (bound is None):
+    return None
+  if incumbent == bound:
+    return 0.0
+  if incumbent == 0:
+    return GRB.INFINITY
+  return abs(bound - incumbent) / abs(incumbent)
+
+class SolveTelemetry:
+  """ Progress of one solve, appended as JSON lines to a file
+
+  Every line holds the tags of the solve (kind of model, backend, DAG
+  hash, period and hw limits), an event and the seconds since the start of the
+  solve, with the incumbent, best bound, gap and node count at that time.
+  Events are
+    incumbent : a better schedule was found
+    bound     : the best bound improved
+    done      : the solve ended, with its status
+
+  Parameters
+  ----------
+  path : str
+  tags : dict
+  """
+  def __init__(self, path, tags):
+    self.path = path
+    self.tags = tags
+    self.start = time.time()
+    self.incumbent = None
+    self.bound = None
+    self.events = 0
+
+  def record(self, event, incumbent, bound, nodes, **extra):
+    record = dict(self.tags)
+    record.update({'event'     : event,\
+                   'seconds'   : round(time.time() - self.start, 3),\
+                   'incumbent' : incumbent,\
+                   'bound'     : bound,\
+                   'gap'       : relative_gap(incumbent, bound),\
+                   'nodes'     : nodes})
+    record.update(extra)
+    self.events += 1
+    # One write per line, so that the lines of concurrent solves do not mix
+    with open(self.path, 'a') as fp:
+      fp.write(json.dumps(record) + '\n')
+
+  def progress(self, incumbent, bound, nodes):
+    """ Records the incumbent and bound if either improved """
+    if (incumbent is not None) and ((self.incumbent is None) or (incumbent < self.incumbent)):
+      self.incumbent = incumbent
+      self.record('incumbent', incumbent, bound, nodes)
+    elif (bound is not None) and ((self.bound is None) or (bound > self.bound)):
+      self.record('bound', self.incumbent, bound, nodes)
+    if bound is not None:
+      self.bound = bound if (self.bound is None) else max(self.bound, bound)
+
+  def callback(self, model, where):
+    """ Solver callback, for Model.optimize """
+    if where == GRB.Callback.MIPSOL:
+      self.progress(model.cbGet(GRB.Callback.MIPSOL_OBJ), model.cbGet(GRB.Callback.MIPSOL_OBJBND),\
+                    model.cbGet(GRB.Callback.MIPSOL_NODCNT))
+    elif where == GRB.Callback.MIP:
+      incumbent = model.cbGet(GRB.Callback.MIP_OBJBST)
+      self.progress(incumbent if incumbent < GRB.INFINITY else None, model.cbGet(GRB.Callback.MIP_OBJBND),\
+                    model.cbGet(GRB.Callback.MIP_NODCNT))
+
+  def finish(self, m):
+    """ Records the end of the solve of model m """
+    incumbent = m.ObjVal if m.SolCount > 0 else None
+    bound = m.ObjBound if m.SolCount > 0 else None
+    self.record('done', incumbent, bound, m.NodeCount, status=m.Status, runtime=m.Runtime)
+
+def open_telemetry(options, kind, graphs, hw_spec, period):
+  """ Returns the SolveTelemetry of a solve, None if telemetry is off
+
+  Parameters
+  ----------
+  options : SolverOptions
+      Telemetry goes to options.telemetry
+  kind : str
+      Names the model, as in result_cache.solve_key
+  graphs : list
+      DAGs of the model
+  hw_spec : module
+      Any module with the result_cache.HW_FIELDS
+  period : int
+  """
+  if not options.telemetry:
+    return None
+  directory = os.path.dirname(options.telemetry)
+  if directory and not os.path.isdir(directory):
+    os.makedirs(directory)
+  return SolveTelemetry(options.telemetry, {'kind'    : kind,\
+                                            'backend' : options.backend,\
+                                            'dag'     : dag_hash(graphs),\
+                                            'period'  : period,\
+                                            'hw'      : dict((f, getattr(hw_spec, f)) for f in HW_FIELDS)})
+
+def optimize_with_telemetry(m, telemetry):
+  """ Solves m, recording its progress in telemetry unless it is None """
+  if telemetry is None:
+    m.optimize()
+    return
+  m.optimize(telemetry.callback)
+  telemetry.finish(m)
@@ -2,6 +2,7 @@ import sys
 import pprint
 import importlib
 import copy
+from spec_file import load_spec
 
 class Spec:
 
@@ -92,7 +93,7 @@ if __name__ == "__main__":
 
 
   # Input specification
-  input_spec_pk = importlib.import_module(input_file, "*")
+  input_spec_pk = load_spec(input_file)
   hw_spec    = importlib.import_module(hw_file, "*")
   latency_spec=importlib.import_module(latency_file, "*")
   input_spec_pk.action_fields_limit = hw_spec.action_fields_limit
@@ -0,0 +1,104 @@
+import time
+
+class Unknown:
+  """ Result of a solve that ran out of time before finding a solution or
+  proving that there is none. It is false like None, which the solvers
+  return for infeasible models, but proves nothing. """
+  def __bool__(self):
+    return False
+  __nonzero__ = __bool__
+
+  def __repr__(self):
+    return 'UNKNOWN'
+
+UNKNOWN = Unknown()
+
+def is_unknown(solution):
+  return isinstance(solution, Unknown)
+
+class TimeoutStats:
+  """ Counts the solves that hit their time limit without a solution
+
+  The solvers record() where they return None on a time limit, which is
+  how TimeBudget tells their timeouts from their proofs of infeasibility.
+  """
+  def __init__(self):
+    self.count = 0
+
+  def record(self):
+    self.count += 1
+
+SOLVE_TIMEOUTS = TimeoutStats()
+
+class TimeBudget:
+  """ Time limits of the solves of a search
+
+  A solve first gets initial_seconds. If it hits that limit without a
+  solution it is run again with factor times more time, up to
+  max_seconds, and is UNKNOWN if it is still undecided then. All limits
+  are cut to what is left of total_seconds, the wall clock budget of the
+  whole search; once it is spent, solves are UNKNOWN without running.
+
+  Parameters
+  ----------
+  max_seconds : float
+      Time limit of a single solve (the time limit of the drivers)
+  initial_seconds : float
+      First time limit of a solve, 0 to start at max_seconds
+  factor : float
+      Growth of the time limit from one attempt to the next
+  total_seconds : float
+      Wall clock budget from the creation of the TimeBudget, 0 for none
+  """
+  def __init__(self, max_seconds, initial_seconds=0, factor=4, total_seconds=0):
+    self.start = time.time()
+    self.max_seconds = max_seconds
+    self.initial_seconds = min(initial_seconds, max_seconds) if initial_seconds else max_seconds
+    self.factor = factor
+    self.total_seconds = total_seconds
+    self.escalations = 0
+    self.unknown = 0
+
+  def remaining(self):
+    if not self.total_seconds:
+      return float('inf')
+    return self.total_seconds - (time.time() - self.start)
+
+  def solve(self, solve, initial_seconds=None):
+    """ Runs solve with escalating time limits
+
+    Parameters
+    ----------
+    solve : function
+        solve(minute_limit) returns a solution, None if it found none
+    initial_seconds : float
+        First time limit, self.initial_seconds by default
+
+    Returns
+    -------
+    What solve returned once it found a solution or proved that there
+    is none, UNKNOWN otherwise
+    """
+    seconds = initial_seconds or self.initial_seconds
+    while True:
+      seconds = min(seconds, self.max_seconds, self.remaining())
+      if (seconds <= 0):
+        print ('Time budget of the search is spent')
+        self.unknown += 1
+        return UNKNOWN
+      timeouts = SOLVE_TIMEOUTS.count
+      solution = solve(seconds / 60.0)
+      if solution or (SOLVE_TIMEOUTS.count == timeouts):
+        return solution
+      if (seconds >= self.max_seconds) or (self.remaining() <= 0):
+        print ('Undecided after %.1f s' % seconds)
+        self.unknown += 1
+        return UNKNOWN
+      print ('Undecided after %.1f s, solving again with %.1f s' %\
+             (seconds, min(seconds * self.factor, self.max_seconds, self.remaining())))
+      self.escalations += 1
+      seconds *= self.factor
+
+  def summary(self):
+    return 'Time budget: %d solves escalated, %d left unknown, %.2f s spent' %\
+           (self.escalations, self.unknown, time.time() - self.start)
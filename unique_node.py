@@ -3,19 +3,21 @@ import importlib
 import sys
 
 from schedule_dag_for_generic_branch import ScheduleDAG
+from spec_file import load_spec
+from branch_overlap import BranchOverlap
 
 
 if __name__ == "__main__":
     
     branch = {}
     graphs_map = {}
-    total_branch = importlib.import_module(sys.argv[1], "*")
+    total_branch = load_spec(sys.argv[1])
     hw_spec = importlib.import_module(sys.argv[2], "*")
     latency_spec = importlib.import_module(sys.argv[3], "*")
     branch_count = int(sys.argv[4])
 
     for i in range(0,branch_count):
-        branch[i] = importlib.import_module(sys.argv[i+5], "*")
+        branch[i] = load_spec(sys.argv[i+5])
         graphs_map[i] = ScheduleDAG()
         graphs_map[i].create_dag(branch[i].nodes, branch[i].edges, latency_spec)
 
@@ -32,47 +34,17 @@ if __name__ == "__main__":
         branch_action_nodes[i] = graphs_map[i].nodes(select='action')
        # print(len(branch_match_nodes[i]), len(branch_match_nodes[i]))
 
-    common_match_nodes = []
-    common_action_nodes = []
+    # Nodes of the total DAG that are in every branch
+    common_nodes = set(BranchOverlap([graphs_map[i] for i in range(0, branch_count)]).common_nodes())
+    common_match_nodes = set(node for node in total_branch_match_nodes if node in common_nodes)
+    common_action_nodes = set(node for node in total_branch_action_nodes if node in common_nodes)
 
-    for node in total_branch_match_nodes:
-        flag = 0
-
-        for i in range(0, branch_count):
-            if node in branch_match_nodes[i]:
-                flag += 1
-        
-        if flag == branch_count:
-            common_match_nodes.append(node)
-    
-
-    for node in total_branch_action_nodes:
-        flag = 0
-
-        for i in range(0, branch_count):
-            if node in branch_action_nodes[i]:
-                flag += 1
-        
-        if flag == branch_count:
-            common_action_nodes.append(node)
-
-
-    
     branch_unique_match_nodes = {}
     branch_unique_action_nodes = {}
 
     for i in range(0, branch_count):
-        branch_unique_match_nodes[i] = []
-        for node in branch_match_nodes[i]:
-            if node not in common_match_nodes:
-                branch_unique_match_nodes[i].append(node)
-    
-
-    for i in range(0, branch_count):
-        branch_unique_action_nodes[i] = []
-        for node in branch_action_nodes[i]:
-            if node not in common_action_nodes:
-                branch_unique_action_nodes[i].append(node)
+        branch_unique_match_nodes[i] = [node for node in branch_match_nodes[i] if node not in common_match_nodes]
+        branch_unique_action_nodes[i] = [node for node in branch_action_nodes[i] if node not in common_action_nodes]
     
     for i in range(0, branch_count):
         print("branch ", i)
@@ -2,6 +2,7 @@ import sys
 import importlib
 import json
 import math
+from spec_file import load_spec
 
 def verify_schedule(nodes, edges, time_of_op, hw_spec, latency_spec, proc_count):
     
@@ -96,7 +97,7 @@ if __name__ == "__main__" :
         print("Usage: ", sys.argv[0], "<DAG_file> <HW_file> <LT_file> <JSON_file> ")
         exit(1)
     else :
-        input_graph = importlib.import_module(sys.argv[1], "*")
+        input_graph = load_spec(sys.argv[1])
         hw_spec = importlib.import_module(sys.argv[2], "*")
         latency_spec = importlib.import_module(sys.argv[3], "*")
         json_file = sys.argv[4]
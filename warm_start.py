@@ -0,0 +1,130 @@
+import collections
+
+class RingResources:
+  """ Usage of the T time slots of the ring, as limited by the dRMT ILPs
+
+  Two kinds of limits are tracked per slot r:
+    * cumulative : sum of the demands of the nodes at r (match units, action fields)
+    * processor  : number of packets (quotients q) with a node at r
+
+  Parameters
+  ----------
+  period : int
+      Period duration T
+  """
+  def __init__(self, period):
+    self.T = period
+    self.cumulative = []  # (demand of each node, limit, used per slot)
+    self.processors = []  # (nodes, limit, packets per slot)
+
+  def add_cumulative(self, demand, limit):
+    self.cumulative.append((demand, limit, collections.defaultdict(int)))
+
+  def add_processor_limit(self, nodes, limit):
+    self.processors.append((set(nodes), limit, collections.defaultdict(set)))
+
+  def clear(self):
+    for (demand, limit, used) in self.cumulative:
+      used.clear()
+    for (nodes, limit, packets) in self.processors:
+      packets.clear()
+
+  def fits(self, v, s):
+    """ Returns True if v can start at time s given the nodes placed so far """
+    q, r = s // self.T, s % self.T
+    for (demand, limit, used) in self.cumulative:
+      if v in demand and used[r] + demand[v] > limit:
+        return False
+    for (nodes, limit, packets) in self.processors:
+      if v in nodes and q not in packets[r] and len(packets[r]) >= limit:
+        return False
+    return True
+
+  def place(self, v, s):
+    q, r = s // self.T, s % self.T
+    for (demand, limit, used) in self.cumulative:
+      if v in demand:
+        used[r] += demand[v]
+    for (nodes, limit, packets) in self.processors:
+      if v in nodes:
+        packets[r].add(q)
+
+def add_dag_resources(resources, G, input_spec):
+  """ Adds the limits of the single DAG ILP (match units, action fields, processors) """
+  match_nodes  = G.nodes(select='match')
+  action_nodes = G.nodes(select='action')
+  resources.add_cumulative(G.compact().match_units(input_spec.match_unit_size), input_spec.match_unit_limit)
+  resources.add_cumulative(G.compact().fields(), input_spec.action_fields_limit)
+  resources.add_processor_limit(match_nodes, input_spec.match_proc_limit)
+  resources.add_processor_limit(action_nodes, input_spec.action_proc_limit)
+
+def repair_schedule(graphs, resources, time_of_op, horizon):
+  """ Moves a schedule found at another period onto the period of resources
+
+  The nodes are list scheduled in the order of their previous start
+  times. Each one starts at the earliest time after its predecessors'
+  delays where the ring slot still has room. Rotating a schedule this
+  way keeps most of its structure when the period changes a little.
+  If that fails, nodes are also kept no earlier than their previous
+  start times, which returns a schedule that already fits unchanged.
+
+  Parameters
+  ----------
+  graphs : list
+      DAGs whose dependencies the schedule must respect; a node shared
+      by several DAGs gets a single start time
+  resources : RingResources
+      Limits for the new period
+  time_of_op : dict
+      Start time of every node in the previous schedule
+  horizon : int
+      Start times must be below horizon (Q_MAX * T)
+
+  Returns
+  -------
+  schedule : dict
+      Start time of every node, None if some node does not fit before horizon
+  """
+  preds = collections.defaultdict(list)
+  order = []
+  for G in graphs:
+    for v in G.nodes():
+      if v not in preds:
+        preds[v] = []
+        order.append(v)
+    for (u, v) in G.edges():
+      preds[v].append((u, G.edge[u][v]['delay']))
+
+  # Zero delays may leave a node at the same time as its predecessor,
+  # so ties are broken by the number of predecessors placed before it
+  depth = dict()
+  def get_depth(v):
+    if v not in depth:
+      depth[v] = 1 + max([get_depth(u) for (u, delay) in preds[v]] + [0])
+    return depth[v]
+  order.sort(key=lambda v: (time_of_op.get(v, 0), get_depth(v)))
+
+  for keep_times in (False, True):
+    resources.clear()
+    schedule = dict()
+    for v in order:
+      s = max([schedule[u] + delay for (u, delay) in preds[v]] + [0])
+      if keep_times:
+        s = max(s, time_of_op.get(v, 0))
+      while (s < horizon) and not resources.fits(v, s):
+        s += 1
+      if s >= horizon:
+        break
+      resources.place(v, s)
+      schedule[v] = s
+    if len(schedule) == len(order):
+      return schedule
+  return None
+
+def set_mip_start(qr, qr_index, t, schedule):
+  """ Sets the MIP start of qr (and of t, unless t is None) to schedule """
+  for v in qr_index.slots:
+    for (q, r) in qr_index.slots[v]:
+      qr[v, q, r].start = 1 if (q * qr_index.T + r == schedule[v]) else 0
+    if t is not None:
+      t[v].start = schedule[v]